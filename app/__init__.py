@@ -3,6 +3,8 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
 from config import Config
+from route_logic.cache import configure_spatial_keys, enable_disk_cache, \
+    enable_shared_cache
 from dotenv import load_dotenv
 import os
 
@@ -19,10 +21,76 @@ def create_app():
     app.config.from_object(Config)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    from .logging_setup import init_logging
+    init_logging(app)
+
     db.init_app(app)
     migrate.init_app(app, db)
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///default.db')
 
+    configure_spatial_keys(
+        uv=app.config['CACHE_RESOLUTION_UV'],
+        weather=app.config['CACHE_RESOLUTION_WEATHER'],
+        robot_advice=app.config['CACHE_RESOLUTION_ADVICE']
+    )
+
+    if app.config['DISK_CACHE_ENABLED']:
+        enable_disk_cache(
+            app.config['CACHE_DB_PATH'] or os.path.join(
+                app.instance_path, 'upstream_cache.sqlite3'
+            ),
+            app.config['CACHE_MAX_BYTES']
+        )
+
+    if app.config['SHARED_CACHE_ENABLED']:
+        shared_dir = '/dev/shm' if os.path.isdir('/dev/shm') else app.instance_path
+        os.makedirs(shared_dir, exist_ok=True)
+        enable_shared_cache(
+            app.config['SHARED_CACHE_PATH'] or os.path.join(
+                shared_dir, 'uv-clothing-advisor.cache'
+            ),
+            app.config['SHARED_CACHE_SLOTS']
+        )
+
+    from route_logic.advice_table import DEFAULT_TABLE_PATH, load_advice_table
+    load_advice_table(app.config['ADVICE_TABLE_PATH'] or DEFAULT_TABLE_PATH)
+
+    from route_logic.advice_worker import advice_pool
+    advice_pool.start(
+        app.config['ADVICE_WORKERS'], app.config['ADVICE_QUEUE_SIZE']
+    )
+
+    from route_logic.live_updates import location_updates
+    location_updates.configure(
+        app.config['LIVE_UPDATE_INTERVAL'], app.config['FETCH_BUDGET_SECONDS'],
+        app.config['EVENTS_MAX_CONNECTIONS']
+    )
+
+    from route_logic.sharding import parse_nodes, shard_router
+    shard_router.configure(
+        app.config['SHARD_SELF_URL'], parse_nodes(app.config['SHARD_NODES']),
+        app.config['SHARD_TOKEN'], app.config['SHARD_HEALTH_INTERVAL']
+    )
+
+    from route_logic.prefetch import prefetcher
+    prefetcher.configure(app.config['FETCH_BUDGET_SECONDS'])
+
+    from route_logic.bot_advice import advice_client, \
+        configure_structured_output, structured_client
+    configure_structured_output(app.config['LLM_STRUCTURED_OUTPUT'])
+
+    if app.config['OLLAMA_WARMUP']:
+        if app.config['LLM_STRUCTURED_OUTPUT']:
+            structured_client.warm_up_in_background()
+        else:
+            advice_client.warm_up_in_background()
+
+    from .fragments import init_templates
+    init_templates(app)
+
+    from .profiling import init_profiling
+    init_profiling(app)
+
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -43,6 +111,9 @@ def create_app():
     from .auth.auth_bp import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
 
+    from .api.api_bp import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
     @app.context_processor
     def inject_user():
         return dict(current_user=current_user)
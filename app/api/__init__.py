@@ -0,0 +1,2 @@
+# api/__init__.py
+from .api_bp import api_bp
@@ -0,0 +1,6 @@
+# api_bp.py
+from flask import Blueprint
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+from . import api_routes
@@ -0,0 +1,456 @@
+# app/api/api_routes.py
+import json
+
+from flask import current_app, request, Response
+
+from route_logic.advice_worker import advice_pool
+from route_logic.cache_stats import cache_stats
+from route_logic.location_advice import get_multiple_location_advice
+from route_logic.logs import structured_logging
+from route_logic.pipeline import CONTEXT_FIELDS, FetchPipeline
+from route_logic.sharding import INTERNAL_TOKEN_HEADER, shard_router
+from .api_bp import api_bp
+from ..asgi import async_view
+from ..profiling import profiling_settings
+from ..routes import run_async
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+# Maximum number of locations accepted in a single batch request
+MAX_BATCH_LOCATIONS = 25
+
+# How long clients may reuse a response before asking again (seconds)
+CLIENT_MAX_AGE = 60
+
+
+def json_response(payload, status=200):
+	"""
+	Serialize payload with orjson when installed, falling back to the
+	standard library encoder with compact separators.
+	"""
+	if orjson is not None:
+		body = orjson.dumps(payload)
+	else:
+		body = json.dumps(payload, separators=(',', ':'))
+	return Response(body, status=status, mimetype='application/json')
+
+
+def error_response(message, status=400):
+	"""Return a JSON error body in the same shape as /set_location."""
+	return json_response({'status': 'error', 'message': message}, status)
+
+
+def parse_coordinate(lat, lon):
+	"""
+	Convert a latitude/longitude pair to floats and range-check it.
+
+	Raises:
+		ValueError: If either value is missing, not numeric or out of range
+	"""
+	if lat is None or lon is None:
+		raise ValueError('Latitude or longitude missing')
+
+	try:
+		lat = float(lat)
+		lon = float(lon)
+	except (TypeError, ValueError):
+		raise ValueError('Latitude and longitude must be numbers') from None
+	if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+		raise ValueError('Latitude or longitude out of range')
+	return lat, lon
+
+
+def parse_locations(data):
+	"""
+	Extract the list of coordinates from a JSON body or query string.
+
+	Accepts:
+		- {"lat": .., "lon": ..} or ?lat=..&lon=.. for a single location
+		- {"locations": [{"lat": .., "lon": ..}, [lat, lon], ...]}
+		- ?locations=lat,lon;lat,lon
+
+	Returns:
+		list: (lat, lon) float tuples
+
+	Raises:
+		ValueError: If no valid locations are supplied
+	"""
+	raw_locations = data.get('locations')
+
+	if raw_locations is None:
+		return [parse_coordinate(data.get('lat'), data.get('lon'))]
+
+	if isinstance(raw_locations, str):
+		raw_locations = [pair.split(',') for pair in raw_locations.split(';')
+		                 if pair.strip()]
+
+	if not isinstance(raw_locations, list) or not raw_locations:
+		raise ValueError('No locations supplied')
+
+	if len(raw_locations) > MAX_BATCH_LOCATIONS:
+		raise ValueError(
+				f'Too many locations (maximum {MAX_BATCH_LOCATIONS})'
+		)
+
+	locations = []
+	for location in raw_locations:
+		if isinstance(location, dict):
+			locations.append(
+					parse_coordinate(location.get('lat'), location.get('lon'))
+			)
+		elif isinstance(location, (list, tuple)) and len(location) == 2:
+			locations.append(parse_coordinate(*location))
+		else:
+			raise ValueError('Invalid location format')
+	return locations
+
+
+def parse_fields(data):
+	"""
+	Return the tuple of context fields the client asked for.
+
+	Fields may be given as a list or a comma-separated string. Unknown
+	field names raise ValueError; omitting fields returns every field.
+	"""
+	fields = data.get('fields')
+	if not fields:
+		return CONTEXT_FIELDS
+
+	if isinstance(fields, str):
+		fields = [field.strip() for field in fields.split(',') if
+		          field.strip()]
+
+	unknown = [field for field in fields if field not in CONTEXT_FIELDS]
+	if unknown:
+		raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+	return tuple(fields)
+
+
+@api_bp.route('/advice', methods=['GET', 'POST'])
+def advice():
+	"""
+	Stateless JSON advice for one or many locations.
+
+	Unlike the HTML index route this does not read or write the session,
+	so widgets and mobile clients can fetch several locations in one round
+	trip. Locations are fetched concurrently and share the process-wide
+	location cache with the HTML routes.
+
+	Request (GET query string or POST JSON body):
+		lat, lon: Single location, or
+		locations: Batch of locations (see parse_locations)
+		fields: Optional subset of context fields to return. Without
+				robot_advice no advice is looked up or generated, e.g.
+				"uv_index,advice"
+
+	Returns:
+		JSON response with status and a results list holding lat, lon and the
+		selected fields for each requested location, in request order
+
+	Error responses:
+		400: Missing, invalid or too many locations, or unknown fields
+	"""
+	parsed = parse_advice_request()
+	if not isinstance(parsed, tuple):
+		return parsed
+	locations, fields = parsed
+
+	contexts = run_async(
+			get_multiple_location_advice(
+					locations,
+					budget=current_app.config['FETCH_BUDGET_SECONDS'],
+					fields=fields
+			)
+	)
+	return advice_response(locations, fields, contexts)
+
+
+@async_view('api.advice')
+async def advice_async():
+	"""Coroutine version of advice() served on the ASGI event loop."""
+	parsed = parse_advice_request()
+	if not isinstance(parsed, tuple):
+		return parsed
+	locations, fields = parsed
+
+	contexts = await get_multiple_location_advice(
+			locations, budget=current_app.config['FETCH_BUDGET_SECONDS'],
+			fields=fields
+	)
+	return advice_response(locations, fields, contexts)
+
+
+def parse_advice_request():
+	"""
+	Read the locations and fields of an /api/advice request.
+
+	Returns:
+		tuple: (locations, fields), or an error response
+	"""
+	if request.method == 'POST':
+		data = request.get_json(silent=True)
+		if not isinstance(data, dict):
+			return error_response('No JSON body received')
+	else:
+		data = request.args
+
+	try:
+		return parse_locations(data), parse_fields(data)
+	except (TypeError, ValueError) as e:
+		return error_response(str(e))
+
+
+def advice_response(locations, fields, contexts):
+	"""Build the /api/advice response from one context per location."""
+	results = []
+	for (lat, lon), context in zip(locations, contexts):
+		result = {'lat': lat, 'lon': lon}
+		result.update({field: context.get(field) for field in fields})
+		results.append(result)
+
+	response = json_response({'status': 'success', 'results': results})
+	response.headers['Cache-Control'] = f'private, max-age={CLIENT_MAX_AGE}'
+	return response
+
+
+def stats_token_sent():
+	"""
+	Whether the request may read the operator statistics endpoints: the
+	X-Profile header equals PROFILING_TOKEN or the X-Internal-Token header
+	equals SHARD_TOKEN. Always False when neither token is configured.
+	"""
+	return profiling_settings.token_sent() or internal_token_valid()
+
+
+@api_bp.route('/advice/workers', methods=['GET'])
+def advice_workers():
+	"""
+	Report the advice worker pool's queue length, wait times and job
+	outcomes, for monitoring LLM load.
+
+	Requires the same token as /api/cache/stats.
+
+	Error responses:
+		403: Token not configured or not matching
+	"""
+	if not stats_token_sent():
+		return error_response('Statistics token required', 403)
+
+	return json_response({'status': 'success', 'workers': advice_pool.stats()})
+
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def cache_statistics():
+	"""
+	Report location cache hit rates by data type, spatial resolution and key.
+
+	The key listing reveals where recent users are, so this requires the
+	X-Profile header to equal PROFILING_TOKEN or X-Internal-Token to equal
+	SHARD_TOKEN.
+
+	Query parameters:
+		top (int): Number of keys to list, most looked up first (default 20)
+
+	Error responses:
+		400: top is not a non-negative integer
+		403: Token not configured or not matching
+	"""
+	if not stats_token_sent():
+		return error_response('Statistics token required', 403)
+
+	try:
+		top = int(request.args.get('top', 20))
+		if top < 0:
+			raise ValueError
+	except ValueError:
+		return error_response('top must be a non-negative integer')
+
+	return json_response({'status': 'success', 'cache': cache_stats.report(top)})
+
+
+@api_bp.route('/logging/stats', methods=['GET'])
+def logging_statistics():
+	"""
+	Report this worker process's log queue: records enqueued, written,
+	dropped because the queue was full or sampled out, and the time each
+	record costs the logging thread versus the background writer.
+
+	Requires the same token as /api/cache/stats.
+
+	Error responses:
+		403: Token not configured or not matching
+	"""
+	if not stats_token_sent():
+		return error_response('Statistics token required', 403)
+
+	return json_response(
+			{'status': 'success', 'logging': structured_logging.stats()}
+	)
+
+
+@api_bp.route('/profiling', methods=['GET', 'POST'])
+def profiling():
+	"""
+	Show or change the request profiler's sample rate at runtime.
+
+	Requires the X-Profile header to equal PROFILING_TOKEN. POST a JSON body
+	with sample_rate (0 to 1) to change it; the change applies to this
+	worker process only.
+
+	Error responses:
+		400: sample_rate missing or outside 0-1
+		403: Profiling token not configured or not matching
+	"""
+	if not profiling_settings.token_sent():
+		return error_response('Profiling token required', 403)
+
+	if request.method == 'POST':
+		data = request.get_json(silent=True) or {}
+		try:
+			sample_rate = float(data['sample_rate'])
+			if not 0 <= sample_rate <= 1:
+				raise ValueError
+		except (KeyError, TypeError, ValueError):
+			return error_response('sample_rate must be a number from 0 to 1')
+		profiling_settings.sample_rate = sample_rate
+
+	return json_response(
+			{
+				'status':    'success',
+				'profiling': {
+					'sample_rate': profiling_settings.sample_rate,
+					'interval':    profiling_settings.interval,
+					'directory':   profiling_settings.directory,
+				}
+			}
+	)
+
+
+def internal_token_valid():
+	"""Whether the request carries SHARD_TOKEN (never true without one)."""
+	return shard_router.token_valid(request.headers.get(INTERNAL_TOKEN_HEADER))
+
+
+@api_bp.route('/internal/location', methods=['GET'])
+def internal_location():
+	"""
+	Run the fetch pipeline for a location this node owns, on behalf of a
+	peer node (see ShardRouter). The result is never forwarded again, so
+	nodes that briefly disagree about ownership cannot bounce a request.
+
+	Query parameters:
+		lat, lon: Location
+		budget (float): Seconds the caller can wait, capped at
+						FETCH_BUDGET_SECONDS
+		fields: Optional context fields the caller needs (see advice())
+
+	Returns:
+		JSON response with the PipelineResult's context, stages, durations
+		and elapsed time
+
+	Error responses:
+		400: Missing or invalid location, budget or fields
+		403: SHARD_TOKEN not configured or not matching
+	"""
+	parsed = parse_internal_location()
+	if not isinstance(parsed, tuple):
+		return parsed
+	lat, lon, budget, fields = parsed
+
+	result = run_async(
+			FetchPipeline(
+					lat, lon, budget=budget, forward=False, fields=fields
+			).run()
+	)
+	return internal_location_response(result)
+
+
+@async_view('api.internal_location')
+async def internal_location_async():
+	"""Coroutine version of internal_location() served on the ASGI event loop."""
+	parsed = parse_internal_location()
+	if not isinstance(parsed, tuple):
+		return parsed
+	lat, lon, budget, fields = parsed
+
+	result = await FetchPipeline(
+			lat, lon, budget=budget, forward=False, fields=fields
+	).run()
+	return internal_location_response(result)
+
+
+def parse_internal_location():
+	"""
+	Read the location, budget and fields of an /internal/location request.
+
+	Returns:
+		tuple: (lat, lon, budget, fields), or an error response
+	"""
+	if not internal_token_valid():
+		return error_response('Internal token required', 403)
+
+	max_budget = current_app.config['FETCH_BUDGET_SECONDS']
+	try:
+		lat, lon = parse_coordinate(
+				request.args.get('lat'), request.args.get('lon')
+		)
+		budget = float(request.args.get('budget', max_budget))
+		fields = parse_fields(request.args)
+	except (TypeError, ValueError) as e:
+		return error_response(str(e))
+	return lat, lon, min(max(budget, 0.0), max_budget), fields
+
+
+def internal_location_response(result):
+	shard_router.served()
+	return json_response(
+			{
+				'status': 'success',
+				'result': {
+					'context':   result.context, 'stages': result.stages,
+					'durations': result.durations, 'elapsed': result.elapsed,
+				}
+			}
+	)
+
+
+@api_bp.route('/internal/health', methods=['GET'])
+def internal_health():
+	"""Liveness check used by peer nodes to keep this node on their ring."""
+	if not internal_token_valid():
+		return error_response('Internal token required', 403)
+	return json_response({'status': 'success'})
+
+
+@api_bp.route('/internal/ring', methods=['GET', 'POST'])
+def internal_ring():
+	"""
+	Show this node's shard ring and forwarding counters.
+
+	POST a JSON body with nodes (list of base URLs) to replace the ring
+	membership when a node joins or leaves; send it to every node. Like
+	every internal endpoint this requires SHARD_TOKEN to be configured and
+	sent in the X-Internal-Token header.
+
+	Error responses:
+		400: nodes missing or not a list of URLs
+		403: Token not configured or not matching
+	"""
+	if request.method == 'POST':
+		if not internal_token_valid():
+			return error_response('Internal token required', 403)
+		data = request.get_json(silent=True) or {}
+		nodes = data.get('nodes')
+		if not isinstance(nodes, list) or not all(
+				isinstance(node, str) and node.startswith(('http://', 'https://'))
+				for node in nodes
+		):
+			return error_response('nodes must be a list of http(s) URLs')
+		shard_router.set_nodes(nodes)
+	elif not internal_token_valid():
+		return error_response('Internal token required', 403)
+
+	return json_response({'status': 'success', 'ring': shard_router.stats()})
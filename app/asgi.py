@@ -0,0 +1,341 @@
+import asyncio
+import contextvars
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Coroutine views by Flask endpoint name, registered with @async_view
+async_views = {}
+
+# Threads serving the routes that stay synchronous under ASGI
+DEFAULT_WSGI_THREADS = 32
+
+
+class ClientDisconnected(OSError):
+	"""The client closed the connection before the response was complete."""
+
+
+def async_view(endpoint):
+	"""
+	Register a coroutine as the ASGI implementation of a Flask endpoint.
+
+	The coroutine is awaited on the event loop inside a normal Flask request
+	context, so request, session, g and current_user behave exactly as in the
+	synchronous view, which keeps serving the endpoint under WSGI. It may
+	return a Response whose body is an async iterable of str or bytes, which
+	is streamed until it ends or the client disconnects.
+	"""
+
+	def register(view):
+		async_views[endpoint] = view
+		return view
+
+	return register
+
+
+def build_environ(scope, body):
+	"""Translate an ASGI HTTP scope and its body into a WSGI environ."""
+	server = scope.get('server') or ('localhost', 80)
+	client = scope.get('client') or ('', 0)
+	environ = {
+		'REQUEST_METHOD':    scope['method'],
+		'SCRIPT_NAME':       scope.get('root_path', ''),
+		'PATH_INFO':         scope['path'].encode('utf-8').decode('latin-1'),
+		'QUERY_STRING':      scope.get('query_string', b'').decode('latin-1'),
+		'SERVER_NAME':       server[0],
+		'SERVER_PORT':       str(server[1]),
+		'SERVER_PROTOCOL':   f"HTTP/{scope.get('http_version', '1.1')}",
+		'REMOTE_ADDR':       client[0],
+		'REMOTE_PORT':       str(client[1]),
+		'wsgi.version':      (1, 0),
+		'wsgi.url_scheme':   scope.get('scheme', 'http'),
+		'wsgi.input':        io.BytesIO(body),
+		'wsgi.errors':       sys.stderr,
+		'wsgi.multithread':  True,
+		'wsgi.multiprocess': True,
+		'wsgi.run_once':     False,
+	}
+	for name, value in scope.get('headers', []):
+		name = name.decode('latin-1').upper().replace('-', '_')
+		value = value.decode('latin-1')
+		if name == 'CONTENT_TYPE':
+			environ['CONTENT_TYPE'] = value
+		elif name == 'CONTENT_LENGTH':
+			# Replaced below by the length of the body actually received
+			continue
+		else:
+			key = f"HTTP_{name}"
+			environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+	# The body is read in full up front, chunked uploads included
+	environ['CONTENT_LENGTH'] = str(len(body))
+	return environ
+
+
+async def read_body(receive):
+	body = bytearray()
+	while True:
+		message = await receive()
+		if message['type'] == 'http.disconnect':
+			break
+		body += message.get('body', b'')
+		if not message.get('more_body'):
+			break
+	return bytes(body)
+
+
+async def wait_for_disconnect(receive):
+	"""Return once the client disconnects. Call after the body is read."""
+	while True:
+		message = await receive()
+		if message['type'] == 'http.disconnect':
+			return
+
+
+async def _unless_disconnected(awaitable, disconnected):
+	"""
+	Await awaitable on its own task, cancelling it if the client disconnects
+	first.
+
+	Raises:
+		ClientDisconnected: If the client disconnected first
+	"""
+	task = asyncio.ensure_future(awaitable)
+	try:
+		await asyncio.wait(
+				{task, disconnected}, return_when=asyncio.FIRST_COMPLETED
+		)
+	finally:
+		if not task.done():
+			task.cancel()
+			await asyncio.gather(task, return_exceptions=True)
+	if task.cancelled():
+		raise ClientDisconnected("Client disconnected")
+	return task.result()
+
+
+def _encode_headers(headers):
+	return [(name.lower().encode('latin-1'), value.encode('latin-1')) for
+	        name, value in headers]
+
+
+class FlaskASGI:
+	"""
+	ASGI front end for the Flask app.
+
+	Endpoints with a registered @async_view (the home page, /events,
+	/set_location, /prefetch and /api/advice) run as coroutines on the
+	server's event loop, so a single worker process serves many requests
+	waiting on NIWA, OpenWeather, the LLM or live updates at once without a
+	thread each. Every other route runs unchanged through the WSGI app on a
+	thread pool.
+
+	After reading the request body a task watches receive() for
+	http.disconnect. Coroutine views and streams are cancelled as soon as
+	their client goes away; a synchronous route cannot be interrupted, so
+	only its body stops being read.
+
+	Both paths use the same session cookie, Flask-Login and request hooks.
+
+	Usage (see asgi.py):
+		app = FlaskASGI(create_app())
+		uvicorn asgi:app
+	"""
+
+	def __init__(self, app, wsgi_threads=DEFAULT_WSGI_THREADS):
+		self.app = app
+		self._executor = ThreadPoolExecutor(
+				max_workers=wsgi_threads, thread_name_prefix='wsgi'
+		)
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] == 'lifespan':
+			await self._lifespan(receive, send)
+			return
+		if scope['type'] != 'http':
+			return
+
+		environ = build_environ(scope, await read_body(receive))
+		disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+		try:
+			view = self._match_async_view(environ)
+			if view is None:
+				await self._call_wsgi(environ, send, disconnected)
+			else:
+				await self._call_async(view, environ, send, disconnected)
+		finally:
+			disconnected.cancel()
+
+	async def _lifespan(self, receive, send):
+		while True:
+			message = await receive()
+			if message['type'] == 'lifespan.startup':
+				await send({'type': 'lifespan.startup.complete'})
+			elif message['type'] == 'lifespan.shutdown':
+				self._executor.shutdown(wait=False)
+				await send({'type': 'lifespan.shutdown.complete'})
+				return
+
+	def _match_async_view(self, environ):
+		adapter = self.app.url_map.bind_to_environ(environ)
+		try:
+			endpoint, _ = adapter.match()
+		except HTTPException:
+			# 404s, redirects and 405s are answered by the WSGI app
+			return None
+		return async_views.get(endpoint)
+
+	async def _call_async(self, view, environ, send, disconnected):
+		"""
+		Serve one request with a coroutine view, following the steps of
+		Flask.full_dispatch_request().
+
+		The view is cancelled if the client disconnects before it returns,
+		which stops its upstream fetches and cancels its advice jobs, and
+		no response is sent.
+		"""
+		app = self.app
+		with app.request_context(environ):
+			try:
+				try:
+					rv = app.preprocess_request()
+					if rv is None:
+						rv = await _unless_disconnected(view(), disconnected)
+				except ClientDisconnected:
+					raise
+				except Exception as err:
+					rv = app.handle_user_exception(err)
+				response = app.finalize_request(rv)
+			except ClientDisconnected as err:
+				logger.info(f"ASGI client disconnected: {err}")
+				return
+			except Exception as err:
+				response = app.handle_exception(err)
+
+			await send(
+					{
+						'type':    'http.response.start',
+						'status':  response.status_code,
+						'headers': _encode_headers(response.headers.items()),
+					}
+			)
+			body = response.response
+			try:
+				if hasattr(body, '__aiter__'):
+					await self._stream_async(body, send, disconnected)
+				else:
+					await send(
+							{
+								'type': 'http.response.body',
+								'body': response.get_data()
+							}
+					)
+			except OSError as err:
+				logger.info(f"ASGI client disconnected: {err}")
+			finally:
+				response.close()
+
+	async def _stream_async(self, body, send, disconnected):
+		"""Send an async iterable body until it ends or the client leaves."""
+		chunks = aiter(body)
+		try:
+			while True:
+				try:
+					chunk = await _unless_disconnected(
+							anext(chunks), disconnected
+					)
+				except StopAsyncIteration:
+					break
+				if isinstance(chunk, str):
+					chunk = chunk.encode()
+				await send(
+						{
+							'type':      'http.response.body', 'body': chunk,
+							'more_body': True
+						}
+				)
+			await send({'type': 'http.response.body', 'body': b''})
+		finally:
+			aclose = getattr(body, 'aclose', None)
+			if aclose is not None:
+				await aclose()
+
+	async def _call_wsgi(self, environ, send, disconnected):
+		"""
+		Run the WSGI app on the thread pool, streaming its body.
+
+		Each step may run on a different pool thread, so all of them run in
+		one copied context: a request context pushed by a streaming body
+		(stream_with_context) is then still there when the body is closed.
+		"""
+		loop = asyncio.get_running_loop()
+		context = contextvars.copy_context()
+		started = {}
+
+		def start_response(status, headers, exc_info=None):
+			started['status'] = int(status.split(' ', 1)[0])
+			started['headers'] = headers
+			return lambda data: None
+
+		def run():
+			iterable = self.app.wsgi_app(environ, start_response)
+			return iterable, iter(iterable)
+
+		iterable, chunks = await loop.run_in_executor(
+				self._executor, context.run, run
+		)
+		try:
+			first = await self._next_chunk(chunks, context, disconnected)
+			await send(
+					{
+						'type':    'http.response.start',
+						'status':  started['status'],
+						'headers': _encode_headers(started['headers']),
+					}
+			)
+			chunk = first
+			while chunk is not None:
+				await send(
+						{
+							'type':      'http.response.body', 'body': chunk,
+							'more_body': True
+						}
+				)
+				chunk = await self._next_chunk(chunks, context, disconnected)
+			await send({'type': 'http.response.body', 'body': b''})
+		except OSError as err:
+			# The client went away mid-stream
+			logger.info(f"ASGI client disconnected: {err}")
+		finally:
+			close = getattr(iterable, 'close', None)
+			if close is not None:
+				await loop.run_in_executor(self._executor, context.run, close)
+
+	async def _next_chunk(self, chunks, context, disconnected):
+		"""
+		Read the next body chunk on the thread pool, or None at the end.
+
+		Raises:
+			ClientDisconnected: If the client disconnected. A pool thread
+				cannot be interrupted, so a read already running finishes
+				first (for /events within one keep-alive interval) and the
+				body is then closed instead of read further.
+		"""
+		if disconnected.done():
+			raise ClientDisconnected("Client disconnected")
+		loop = asyncio.get_running_loop()
+		pending = loop.run_in_executor(
+				self._executor, context.run, next, chunks, None
+		)
+		await asyncio.wait(
+				{pending, disconnected}, return_when=asyncio.FIRST_COMPLETED
+		)
+		if not pending.done():
+			await asyncio.wait({pending})
+			raise ClientDisconnected("Client disconnected")
+		return pending.result()
@@ -1,40 +1,34 @@
 # app/auth/auth_routes.py
+import logging
+
 from flask import render_template, redirect, url_for, flash, request, session
 from flask_login import login_user, logout_user, current_user, login_required
 from .auth_bp import auth_bp
 from .forms import LoginForm, RegistrationForm
 from .models import get_user_by_username, create_user
 
+logger = logging.getLogger(__name__)
+
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
-	print(
-			f"Login route called, current_user.is_authenticated: {current_user.is_authenticated}"
-	)
-	print(f"Request method: {request.method}")
-
 	# If user is already logged in, redirect to home
 	if current_user.is_authenticated:
-		print("User already authenticated, redirecting to home")
+		logger.debug("Already authenticated, redirecting to home")
 		return redirect(url_for('main.index'))
 
 	form = LoginForm()
-	print(f"Form validation result: {form.validate_on_submit()}")
-
 	if form.validate_on_submit():
 		username = form.username.data
 		password = form.password.data
-		print(f"Login attempt - username: {username}")
 
 		# Get user from database
 		user = get_user_by_username(username)
-		print(f"User found: {user is not None}")
 
 		if user and user.check_password(password):
-			print("Password correct, logging in user")
 			# Log in with Flask-Login
 			login_user(user, remember=form.remember_me.data)
-			print("FLASHING SUCCESS MESSAGE")
+			logger.info("Login succeeded", extra={"username": username})
 			flash("Logged in successfully!", "success")
 
 			# Handle next parameter for redirects after login
@@ -44,46 +38,47 @@ def login():
 			else:
 				return redirect(url_for('main.index'))
 		else:
-			print("FLASHING ERROR MESSAGE")
-			print("Invalid username or password")
+			logger.warning(
+					"Login failed", extra={
+						"username": username, "user_exists": user is not None
+					}
+			)
 			flash("Invalid username or password.", "error")
+	elif form.errors:
+		logger.debug("Login form invalid", extra={"errors": form.errors})
 
-	print("Rendering login template")
 	return render_template("auth/login.html", form=form)
 
 
 @auth_bp.route("/register", methods=["GET", "POST"])
 def register():
-	print(
-			f"Register route called, current_user.is_authenticated: {current_user.is_authenticated}"
-	)
-
 	if current_user.is_authenticated:
-		print("User already logged in, redirecting to home")
+		logger.debug("Already authenticated, redirecting to home")
 		return redirect(url_for('main.index'))
 
 	form = RegistrationForm()
-	print(f"Form validation result: {form.validate_on_submit()}")
-
 	if form.validate_on_submit():
 		username = form.username.data
 		email = form.email.data
 		password = form.password.data
-		print(f"Form data - username: {username}, email: {email}")
 
 		user = create_user(username, email, password)
-		print(f"create_user returned: {user}")
 
 		if user:
-			print("User created successfully, redirecting to login")
+			logger.info("User registered", extra={"username": username})
 			flash("Registration successful! You can now log in.", "success")
 			return redirect(url_for('auth.login'))
 		else:
-			print("User creation failed")
+			logger.warning(
+					"Registration failed, username taken",
+					extra={"username": username}
+			)
 			flash(
 					"Username already exists. Please choose a different one.",
 					"error"
 			)
+	elif form.errors:
+		logger.debug("Registration form invalid", extra={"errors": form.errors})
 
 	return render_template("auth/register.html", form=form)
 
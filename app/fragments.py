@@ -0,0 +1,88 @@
+import os
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, pass_context
+from markupsafe import Markup
+
+from route_logic.cache import TTLCache
+
+# Context fields cached fragments read by default. Fragments are keyed on
+# the values of their fields only, so they must not use anything else from
+# the page context (current_user, flashed messages, the session).
+FRAGMENT_FIELDS = (
+	"uv_index", "advice", "robot_advice", "cloud_index", "location_name",
+	"weather_icon", "uv_source"
+)
+
+# Rendered fragments kept per process, and for how long (seconds)
+FRAGMENT_CACHE_ENTRIES = 512
+FRAGMENT_TTL = 300
+
+
+class FragmentCache:
+	"""
+	Per-process cache of rendered template fragments.
+
+	A fragment is keyed on its template name and a digest of the
+	FRAGMENT_FIELDS it is rendered with, so every request showing the same
+	conditions, whichever user or session it comes from, reuses one
+	rendering. The per-user parts of the page (navbar, flash messages) are
+	still rendered on every request.
+	"""
+
+	def __init__(self, enabled=True):
+		self.enabled = enabled
+		self._cache = TTLCache(FRAGMENT_TTL, FRAGMENT_CACHE_ENTRIES)
+
+	def render(self, template_name, context, fields=FRAGMENT_FIELDS):
+		"""
+		Render template_name with the given fields (names of context
+		variables, FRAGMENT_FIELDS by default) taken from context.
+		"""
+		values = {field: context.get(field) for field in fields}
+		if not self.enabled:
+			return self._render(template_name, values)
+
+		# Context values are plain scalars, so the key is hashed directly
+		key = (template_name, tuple(values.items()))
+		html = self._cache.get(key)
+		if html is None:
+			html = self._render(template_name, values)
+			self._cache.set(key, html)
+		return html
+
+	@staticmethod
+	def _render(template_name, values):
+		template = current_app.jinja_env.get_template(template_name)
+		return Markup(template.render(**values))
+
+	def clear(self):
+		self._cache.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+@pass_context
+def cached_fragment(context, template_name, fields=FRAGMENT_FIELDS):
+	"""
+	Template global rendering a shared fragment, e.g.
+	{{ cached_fragment('partials/header.html', ['weather_icon']) }}. The
+	fragment may only use the listed context variables.
+	"""
+	return fragment_cache.render(template_name, context, fields)
+
+
+def init_templates(app):
+	"""
+	Register cached_fragment() and keep compiled templates in a persistent
+	bytecode cache, so new worker processes skip compiling them again.
+	"""
+	fragment_cache.enabled = app.config['FRAGMENT_CACHE_ENABLED']
+	app.jinja_env.globals['cached_fragment'] = cached_fragment
+
+	cache_dir = app.config['TEMPLATE_CACHE_DIR'] or os.path.join(
+			app.instance_path, 'jinja_cache'
+	)
+	os.makedirs(cache_dir, exist_ok=True)
+	app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
@@ -0,0 +1,51 @@
+import re
+import uuid
+
+from flask import g, request
+
+from route_logic.logs import parse_levels, request_id, structured_logging
+
+# Header carrying the correlation ID in and out. A well-formed incoming
+# value (e.g. from a proxy) is reused, otherwise a new one is generated.
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+def _start_request():
+	incoming = request.headers.get(REQUEST_ID_HEADER, '')
+	if _VALID_REQUEST_ID.fullmatch(incoming):
+		g.request_id = incoming
+	else:
+		g.request_id = uuid.uuid4().hex[:16]
+	request_id.set(g.request_id)
+
+
+def _tag_response(response):
+	request_id_value = g.get('request_id')
+	if request_id_value is not None:
+		response.headers[REQUEST_ID_HEADER] = request_id_value
+	return response
+
+
+def _end_request(exc):
+	# WSGI threads are reused; don't let the ID leak into the next request
+	request_id.set(None)
+
+
+def init_logging(app):
+	"""
+	Configure queue-based structured logging from the app config and give
+	every request a correlation ID, attached to its log records and
+	returned in the X-Request-ID response header.
+	"""
+	structured_logging.configure(
+			level=app.config['LOG_LEVEL'],
+			module_levels=parse_levels(app.config['LOG_LEVELS']),
+			fmt=app.config['LOG_FORMAT'],
+			debug_sample_rate=app.config['LOG_DEBUG_SAMPLE_RATE'],
+			queue_size=app.config['LOG_QUEUE_SIZE']
+	)
+
+	app.before_request(_start_request)
+	app.after_request(_tag_response)
+	app.teardown_request(_end_request)
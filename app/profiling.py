@@ -0,0 +1,264 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that may be profiled; auth.* covers every auth route
+PROFILED_ENDPOINTS = ('main.index', 'main.set_location')
+PROFILED_PREFIXES = ('auth.',)
+
+# Request header that forces profiling; its value must match PROFILING_TOKEN
+PROFILE_HEADER = 'X-Profile'
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+
+# Selector methods an idle event loop blocks in; samples ending here are
+# waiting on I/O
+_SELECT_FUNCTIONS = {'select', 'poll'}
+
+
+def _frame_label(frame):
+	code = frame.f_code
+	return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame):
+	"""Stack from the outermost frame to frame, one label per frame."""
+	stack = []
+	while frame is not None:
+		stack.append(_frame_label(frame))
+		frame = frame.f_back
+	stack.reverse()
+	return stack
+
+
+def _running_loop(frame):
+	"""The asyncio event loop driving this stack, if any."""
+	while frame is not None:
+		owner = frame.f_locals.get('self') if frame.f_code.co_name in (
+			'run_forever', 'run_until_complete', '_run_once') else None
+		if isinstance(owner, asyncio.AbstractEventLoop):
+			return owner
+		frame = frame.f_back
+	return None
+
+
+def _await_stacks(loop):
+	"""Collapsed await chains of the loop's pending tasks."""
+	try:
+		tasks = list(asyncio.all_tasks(loop))
+	except RuntimeError:
+		# The task set changed under us; skip this sample's await view
+		return []
+
+	stacks = []
+	for task in tasks:
+		coro = task.get_coro()
+		labels = [f"task {task.get_name()}"]
+		while coro is not None:
+			frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+			if frame is None:
+				break
+			labels.append(_frame_label(frame))
+			coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+		stacks.append(';'.join(labels))
+	return stacks
+
+
+class SamplingProfiler:
+	"""
+	Wall-clock sampling profiler for one thread.
+
+	A daemon thread reads the target thread's stack from
+	sys._current_frames() every interval seconds and counts each distinct
+	stack. When the target is blocked in an event loop's select, the await
+	chain of every pending task is counted as well, so time spent awaiting
+	upstream calls shows up per coroutine rather than as one opaque select.
+
+	Both views are written in collapsed-stack format ("frame;frame count"),
+	which flamegraph.pl, speedscope and inferno read directly.
+	"""
+
+	def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+		self.thread_id = thread_id
+		self.interval = interval
+		self.samples = Counter()
+		self.await_samples = Counter()
+		self._stopped = threading.Event()
+		self._thread = None
+
+	def start(self):
+		self._thread = threading.Thread(
+				target=self._run, name='request-profiler', daemon=True
+		)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		if self._thread is not None:
+			self._stopped.set()
+			self._thread.join()
+			self._thread = None
+
+	def _run(self):
+		while not self._stopped.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is None:
+				continue
+
+			stack = _collapse(frame)
+			self.samples[';'.join(stack)] += 1
+
+			if frame.f_code.co_name in _SELECT_FUNCTIONS:
+				loop = _running_loop(frame)
+				if loop is not None:
+					for await_stack in _await_stacks(loop):
+						self.await_samples[await_stack] += 1
+			del frame
+
+	@staticmethod
+	def collapsed(samples):
+		return ''.join(f"{stack} {count}\n" for stack, count in
+		               samples.most_common())
+
+
+class ProfilingSettings:
+	"""Runtime-adjustable profiling state, seeded from the app config."""
+
+	def __init__(self):
+		self.sample_rate = 0.0
+		self.interval = DEFAULT_INTERVAL
+		self.directory = None
+		self.token = None
+
+	@property
+	def active(self):
+		return self.sample_rate > 0 or bool(self.token)
+
+	def token_sent(self):
+		"""
+		Whether the request's X-Profile header equals the configured token,
+		compared in constant time. Always False without a token.
+		"""
+		if not self.token:
+			return False
+		sent = request.headers.get(PROFILE_HEADER, '')
+		return hmac.compare_digest(sent.encode(), self.token.encode())
+
+	def should_profile(self):
+		"""Decide whether the current request is profiled."""
+		endpoint = request.endpoint or ''
+		if endpoint not in PROFILED_ENDPOINTS and not endpoint.startswith(
+				PROFILED_PREFIXES
+		):
+			return False
+		if self.token_sent():
+			return True
+		return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+profiling_settings = ProfilingSettings()
+
+
+def _start_profile():
+	if not profiling_settings.active or not profiling_settings.should_profile():
+		return
+	g.profiler = SamplingProfiler(
+			threading.get_ident(), profiling_settings.interval
+	).start()
+	g.profile_started = time.perf_counter()
+
+
+def _finish_profile(response):
+	profiler = g.pop('profiler', None)
+	if profiler is None:
+		return response
+	profiler.stop()
+	elapsed = time.perf_counter() - g.pop('profile_started')
+
+	try:
+		write_profile(profiler, elapsed, response.status_code)
+	except OSError as err:
+		logger.error(f"Could not write request profile: {err}")
+	return response
+
+
+def _abandon_profile(exc):
+	# Requests that raised never reach after_request
+	profiler = g.pop('profiler', None)
+	if profiler is not None:
+		profiler.stop()
+
+
+def write_profile(profiler, elapsed, status_code):
+	"""
+	Write one request's profile to the profiling directory.
+
+	Produces <name>.folded (wall-clock stacks of the request thread),
+	<name>.await.folded (await chains of pending asyncio tasks) and
+	<name>.json (request metadata plus fetch pipeline stage timings).
+
+	Returns:
+		str: Path of the metadata file
+	"""
+	directory = profiling_settings.directory
+	os.makedirs(directory, exist_ok=True)
+	now = time.time()
+	name = (f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}"
+	        f"{int(now * 1000) % 1000:03d}-{request.endpoint}-"
+	        f"{threading.get_ident() % 100000:05d}")
+	base = os.path.join(directory, name)
+
+	with open(f"{base}.folded", 'w') as f:
+		f.write(profiler.collapsed(profiler.samples))
+	if profiler.await_samples:
+		with open(f"{base}.await.folded", 'w') as f:
+			f.write(profiler.collapsed(profiler.await_samples))
+
+	metadata = {
+		'method':        request.method, 'path': request.path,
+		'endpoint':      request.endpoint, 'status': status_code,
+		'request_id':    g.get('request_id'),
+		'wall_seconds':  elapsed, 'interval': profiler.interval,
+		'samples':       sum(profiler.samples.values()),
+		'await_samples': sum(profiler.await_samples.values()),
+	}
+	result = g.get('fetch_result')
+	if result is not None:
+		metadata['pipeline'] = {
+			'elapsed': result.elapsed, 'stages': result.stages,
+			'durations': result.durations,
+		}
+	with open(f"{base}.json", 'w') as f:
+		json.dump(metadata, f, indent=2)
+	return f"{base}.json"
+
+
+def init_profiling(app):
+	"""
+	Install the profiling hooks and load their settings from the app config.
+
+	With PROFILING_SAMPLE_RATE at 0 and no PROFILING_TOKEN the hooks cost one
+	attribute check per request.
+	"""
+	profiling_settings.sample_rate = app.config['PROFILING_SAMPLE_RATE']
+	profiling_settings.interval = app.config['PROFILING_INTERVAL']
+	profiling_settings.token = app.config['PROFILING_TOKEN']
+	profiling_settings.directory = app.config['PROFILING_DIR'] or os.path.join(
+			app.instance_path, 'profiles'
+	)
+
+	app.before_request(_start_profile)
+	app.after_request(_finish_profile)
+	app.teardown_request(_abandon_profile)
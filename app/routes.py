@@ -1,18 +1,31 @@
 import asyncio
+import json
+import logging
 import time
 from flask import Blueprint, render_template, jsonify, session, request, \
-	redirect, url_for, flash
+	redirect, url_for, flash, current_app, Response, stream_with_context, g
 
-from route_logic.bot_advice import get_dynamic_advice_async, get_dynamic_advice
-from route_logic.uv_service import get_uv_data
-from route_logic.advice import get_clothing_advice
-from route_logic.weather_service import is_cloudy_async
+from route_logic.cache import get_location_key
+from route_logic.live_updates import LIVE_FIELDS, SubscriberLimitReached, \
+	location_updates
+from route_logic.pipeline import FetchPipeline
+from route_logic.prefetch import prefetcher
+from .asgi import async_view
+from .fragments import fragment_cache
 
 main_bp = Blueprint('main', __name__)
 
+logger = logging.getLogger(__name__)
+
 # Cache duration in seconds (5 minutes)
 CACHE_DURATION = 300
 
+# Seconds between keep-alive comments on idle event streams
+EVENT_KEEPALIVE = 15
+
+# Seconds a client refused by the stream limit is asked to wait
+EVENT_RETRY_AFTER = 30
+
 
 def run_async(coro):
 	"""
@@ -42,11 +55,6 @@ def run_async(coro):
 		return asyncio.run(coro)
 
 
-def get_location_key(lat, lon):
-	"""Generate a cache key for the given coordinates."""
-	return f"{round(lat, 4)}_{round(lon, 4)}"
-
-
 def is_cache_valid(cache_timestamp):
 	"""Check if cached data is still valid based on timestamp."""
 	return cache_timestamp and (time.time() - cache_timestamp) < CACHE_DURATION
@@ -75,6 +83,126 @@ def should_fetch_new_data(lat, lon):
 	return False, "cache_valid"
 
 
+def _use_prefetched(lat, lon, result):
+	"""Whether a joined prefetch result can be served as it is."""
+	if result is not None and result.complete:
+		logger.debug(
+				"Using prefetched data",
+				extra={"location_key": get_location_key(lat, lon)}
+		)
+		return True
+	return False
+
+
+def _share_result(result):
+	# Joined results are shared between requests
+	result.context = dict(result.context)
+	g.fetch_result = result
+	return result
+
+
+def _follow_up_budget(started, result):
+	"""
+	Budget for fetching again after joining a prefetch: what is left of the
+	page's FETCH_BUDGET_SECONDS since started, so waiting on the prefetch and
+	fetching again never take longer than the budget together.
+
+	Returns:
+		float: Seconds for a new pipeline run, or None when the joined
+			   (incomplete) result must be served as it is
+	"""
+	elapsed = time.monotonic() - started
+	budget = max(0.0, current_app.config['FETCH_BUDGET_SECONDS'] - elapsed)
+	if budget <= 0 and result is not None:
+		return None
+	return budget
+
+
+def fetch_location(lat, lon):
+	"""
+	Return the PipelineResult for lat/lon, joining the prefetch started by
+	/set_location when there is one. Incomplete prefetches are fetched again
+	with the rest of the page's budget, their finished stages served from
+	the location cache; with no budget left the partial result is served.
+	"""
+	started = time.monotonic()
+	result = prefetcher.join(
+			lat, lon, timeout=current_app.config['FETCH_BUDGET_SECONDS']
+	)
+	if not _use_prefetched(lat, lon, result):
+		budget = _follow_up_budget(started, result)
+		if budget is not None:
+			result = run_async(FetchPipeline(lat, lon, budget=budget).run())
+	return _share_result(result)
+
+
+async def fetch_location_async(lat, lon):
+	"""fetch_location() for views running on the ASGI event loop."""
+	started = time.monotonic()
+	result = await prefetcher.join_async(
+			lat, lon, timeout=current_app.config['FETCH_BUDGET_SECONDS']
+	)
+	if not _use_prefetched(lat, lon, result):
+		budget = _follow_up_budget(started, result)
+		if budget is not None:
+			result = await FetchPipeline(lat, lon, budget=budget).run()
+	return _share_result(result)
+
+
+def _cached_page(lat, lon):
+	"""
+	Render the page from the session cache, or return None (after logging
+	why) when the data has to be fetched. The session copy is dropped once
+	live updates have pushed different data for the location, e.g. the
+	nighttime layout at sunset.
+	"""
+	# Check if we need to fetch new data
+	should_fetch, reason = should_fetch_new_data(lat, lon)
+
+	# Try to use cached data if available and valid
+	if not should_fetch:
+		cached_context = session.get('cached_context')
+		snapshot = location_updates.snapshot(lat, lon)
+		if snapshot is not None and isinstance(cached_context, dict) and any(
+				cached_context.get(field) != value for field, value in
+				snapshot.items()
+		):
+			session.pop('cached_context', None)
+			cached_context = None
+			reason = "live_update"
+		if cached_context and isinstance(cached_context, dict):
+			# Add a flag to indicate this is cached data (optional, for debugging)
+			cached_context['from_cache'] = True
+			return render_template("home.html", **cached_context)
+
+	# If we reach here, we need fresh data
+	logger.debug("Fetching fresh data", extra={"reason": reason})
+	return None
+
+
+def _fetched_page(lat, lon, result):
+	"""Publish and session-cache a fresh result, then render it."""
+	context = result.context
+	logger.info(
+			"Fetch pipeline finished", extra={
+				"elapsed": round(result.elapsed, 3), "stages": result.stages
+			}
+	)
+
+	# Other open pages for this location pick up the fresh data
+	location_updates.publish(lat, lon, context, result.complete)
+
+	# Only cache complete results so a timed-out stage is retried next visit
+	if result.complete:
+		location_key = get_location_key(lat, lon)
+		session['cached_location_key'] = location_key
+		session['cache_timestamp'] = time.time()
+		session[
+			'cached_context'] = context.copy()  # Store a copy to avoid reference issues
+
+	return render_template("home.html", **context)
+
+
 @main_bp.route("/")
 def index():
 	"""
@@ -83,7 +211,11 @@ def index():
 	Now includes intelligent caching:
 	- Only makes API calls when location changes or cache expires
 	- Stores cached data in session with timestamps
-	- Falls back to fresh API calls if cache is corrupted
+	- Fetches through a single deadline-bound FetchPipeline, so a slow
+	  upstream returns partial data instead of multiplying page latency
+	- Partial results are rendered but not cached in the session
+
+	Under ASGI (asgi.py) index_async() serves this route instead.
 
 	Session variables:
 		lat (float): Latitude coordinate (defaults to Auckland: -36.8485)
@@ -107,168 +239,187 @@ def index():
 	lat = session.get('lat', -36.8485)
 	lon = session.get('lon', 174.7633)
 
-	# Check if we need to fetch new data
-	should_fetch, reason = should_fetch_new_data(lat, lon)
+	page = _cached_page(lat, lon)
+	if page is not None:
+		return page
+	return _fetched_page(lat, lon, fetch_location(lat, lon))
 
-	# Try to use cached data if available and valid
-	if not should_fetch:
-		cached_context = session.get('cached_context')
-		if cached_context and isinstance(cached_context, dict):
-			# Add a flag to indicate this is cached data (optional, for debugging)
-			cached_context['from_cache'] = True
-			return render_template("home.html", **cached_context)
 
-	# If we reach here, we need fresh data
-	print(f"Fetching fresh data - reason: {reason}")
-
-	async def fetch_everything_smart():
-		"""
-		Concurrent data fetching strategy:
-		1. Start UV and Weather API calls simultaneously
-		2. Check if it's nighttime from weather data
-		3. Only generate AI advice during daytime
-
-		Returns:
-			tuple: (uv_data, cloudy, robot_advice, is_nighttime) or (None, None, None, False) on error
-		"""
-		# Start UV and weather requests concurrently
-		uv_task = get_uv_data()
-		weather_task = is_cloudy_async(lat, lon)
+@async_view('main.index')
+async def index_async():
+	"""Coroutine version of index() served on the ASGI event loop."""
+	lat = session.get('lat', -36.8485)
+	lon = session.get('lon', 174.7633)
+
+	page = _cached_page(lat, lon)
+	if page is not None:
+		return page
+	return _fetched_page(lat, lon, await fetch_location_async(lat, lon))
+
+
+def format_event(event, data):
+	"""Encode one server-sent event."""
+	return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
 
+
+@main_bp.route('/conditions')
+def conditions():
+	"""
+	The home page's conditions block for the session's location, rendered
+	from the latest live update. Pages swap it in when an update switches
+	between the conditions and the "unavailable" layout (e.g. at sunset),
+	instead of reloading and getting the session-cached page back.
+	"""
+	lat = session.get('lat', -36.8485)
+	lon = session.get('lon', 174.7633)
+	context = location_updates.snapshot(lat, lon)
+	if context is None:
+		# This worker process has no stream for the location
+		context = fetch_location(lat, lon).context
+	return fragment_cache.render('partials/conditions.html', context)
+
+
+def _subscribe_session():
+	"""
+	Subscribe to the session's location.
+
+	Returns:
+		tuple: (lat, lon, subscription), or (lat, lon, None) after logging
+			   when the stream limit is reached
+	"""
+	lat = session.get('lat', -36.8485)
+	lon = session.get('lon', 174.7633)
+	try:
+		return lat, lon, location_updates.subscribe(lat, lon)
+	except SubscriberLimitReached as err:
+		logger.warning(f"Refusing event stream: {err}")
+		return lat, lon, None
+
+
+def _event_response(stream):
+	"""Wrap an event stream, or answer 503 when stream is None."""
+	if stream is None:
+		return Response(
+				status=503, headers={'Retry-After': str(EVENT_RETRY_AFTER)}
+		)
+	response = Response(stream, mimetype='text/event-stream')
+	response.headers['Cache-Control'] = 'no-cache'
+	response.headers['X-Accel-Buffering'] = 'no'
+	return response
+
+
+@main_bp.route('/events')
+def events():
+	"""
+	Server-sent event stream of data changes for the session's location.
+
+	The first event is a full "snapshot" of the fields shown on the home
+	page, followed by "update" events carrying only the fields that changed.
+	Every page showing the same location cell is served from one fetch.
+	Clients reconnect after /set_location to follow the new location.
+
+	Each open stream holds this server thread, so once the hub's
+	max_subscribers streams are open further clients get a 503 and keep the
+	data their page was rendered with.
+
+	Under ASGI (asgi.py) events_async() serves this route instead.
+	"""
+	lat, lon, subscription = _subscribe_session()
+	if subscription is None:
+		return _event_response(None)
+
+	@stream_with_context
+	def stream():
 		try:
-			# Wait for both API calls to complete
-			uv_data, cloudy = await asyncio.gather(
-					uv_task, weather_task, return_exceptions=True
-			)
-
-			# Handle API errors
-			if isinstance(uv_data, Exception):
-				uv_data = {"clear_sky_max": None, "cloudy_sky_max": None}
-
-			if isinstance(cloudy, Exception):
-				cloudy = None
-
-			# Check if it's nighttime first to avoid unnecessary AI calls
-			is_nighttime = False
-			robot_advice = None
-
-			if cloudy and isinstance(cloudy, (tuple, list)) and len(
-					cloudy
-			) >= 7:
-				# Unpack weather data: (cloud_index, location_name, weather_main, weather_description, weather_icon, sunrise, sunset)
-				cloud_index, location_name, weather_main, weather_description, weather_icon, sunrise, sunset = cloudy
-
-				# Check if it's nighttime using sunrise/sunset data
-				if sunrise and sunset:
-					now = time.time()
-					is_nighttime = not (sunrise <= now <= sunset)
-
-				# Only generate AI advice during daytime
-				if not is_nighttime and uv_data:
-					sunny_max = uv_data.get("clear_sky_max")
-					cloudy_max = uv_data.get("cloudy_sky_max")
-
-					uv_index = cloudy_max if cloud_index >= 50 else sunny_max
-
-					if uv_index is not None:
-						try:
-							robot_advice = await get_dynamic_advice_async(
-									uv_index, lat, lon, weather_main,
-									weather_description
-							)
-						except Exception as e:
-							robot_advice = f"Error calling language model: {e}"
-
-			return uv_data, cloudy, robot_advice, is_nighttime
-
-		except Exception:
-			return None, None, None, False
-
-	# Execute async operations
-	result = run_async(fetch_everything_smart())
-
-	# Fallback to sync operations if async failed
-	if result[0] is None:
-		uv_data = run_async(get_uv_data())
-		cloudy = run_async(is_cloudy_async(lat, lon))
-		robot_advice = None
-		is_nighttime = False
-	else:
-		uv_data, cloudy, robot_advice, is_nighttime = result
-
-	# Initialize default context
-	context = {
-		"uv_index":            None, "advice": "No data available.",
-		"cloud_index":         None, "location_name": None,
-		"weather_main":        None, "weather_description": None,
-		"weather_icon":        None, "robot_advice": None,
-		"is_nighttime":        is_nighttime, "from_cache": False
-	}
-
-	# Process weather and UV data (works for both day and night)
-	if cloudy and isinstance(cloudy, (tuple, list)) and len(cloudy) >= 7:
-		# Unpack weather data: (cloud_index, location_name, weather_main, weather_description, weather_icon, sunrise, sunset)
-		cloud_index, location_name, weather_main, weather_description, weather_icon, sunrise, sunset = cloudy
-
-		if is_nighttime:
-			# Nighttime: Show weather data but no UV advice or AI advice
-			context.update(
-					{
-						"location_name":       location_name,
-						"weather_main":        weather_main,
-						"weather_description": weather_description,
-						"weather_icon":        weather_icon,
-						"advice":              "It's nighttime! No UV protection needed.",
-						"robot_advice":        "Enjoy your evening! UV levels are not a concern during nighttime hours."
-					}
-			)
-		else:
-			# Daytime: Process UV data and show full advice
-			sunny_max = uv_data.get("clear_sky_max") if uv_data else None
-			cloudy_max = uv_data.get("cloudy_sky_max") if uv_data else None
-
-			if sunny_max is None and cloudy_max is None:
-				advice = "Could not fetch UV data. Please try again later."
-				uv_index = None
-			else:
-				uv_index = cloudy_max if cloud_index >= 50 else sunny_max
-				# Pass the first 5 elements to get_clothing_advice (it expects 5)
-				advice = get_clothing_advice(uv_index, cloudy[:5])
-
-				# Get sync AI advice if async failed and we don't have it yet
-				if robot_advice is None and uv_index is not None:
-					try:
-						robot_advice = get_dynamic_advice(
-								uv_index, lat, lon, weather_main,
-								weather_description
-						)
-					except Exception as e:
-						robot_advice = f"Error calling language model: {e}"
-
-			context.update(
-					{
-						"uv_index":            uv_index, "advice": advice,
-						"cloud_index":         cloud_index,
-						"location_name":       location_name,
-						"weather_main":        weather_main,
-						"weather_description": weather_description,
-						"weather_icon":        weather_icon,
-						"robot_advice":        robot_advice,
-					}
-			)
-	else:
-		# No valid weather data available
-		context[
-			"advice"] = "Could not fetch weather data. Please try again later."
+			# Nobody has published this cell yet: fetch it for this client
+			if not subscription.has_snapshot:
+				result = fetch_location(lat, lon)
+				location_updates.publish(
+						lat, lon, result.context, result.complete
+				)
+
+			while True:
+				event = subscription.get(timeout=EVENT_KEEPALIVE)
+				if event is None:
+					yield ": keep-alive\n\n"
+				else:
+					yield format_event(*event)
+		finally:
+			location_updates.unsubscribe(subscription)
+
+	return _event_response(stream())
+
+
+@async_view('main.events')
+async def events_async():
+	"""
+	Coroutine version of events(): the stream waits for events on the event
+	loop, so open pages hold no thread. It ends as soon as the client
+	disconnects.
+	"""
+	lat, lon, subscription = _subscribe_session()
+	if subscription is None:
+		return _event_response(None)
 
-	# Cache the context data for future requests
-	location_key = get_location_key(lat, lon)
-	session['cached_location_key'] = location_key
-	session['cache_timestamp'] = time.time()
-	session[
-		'cached_context'] = context.copy()  # Store a copy to avoid reference issues
+	async def stream():
+		try:
+			if not subscription.has_snapshot:
+				result = await fetch_location_async(lat, lon)
+				location_updates.publish(
+						lat, lon, result.context, result.complete
+				)
 
-	return render_template("home.html", **context)
+			while True:
+				event = await subscription.get_async(timeout=EVENT_KEEPALIVE)
+				if event is None:
+					yield ": keep-alive\n\n"
+				else:
+					yield format_event(*event)
+		finally:
+			location_updates.unsubscribe(subscription)
+
+	return _event_response(stream())
+
+
+def _set_json_location(data, old_lat, old_lon):
+	"""
+	Store the location from a JSON /set_location body and start prefetching.
+	Nothing is stored unless lat and lon are numbers within range.
+
+	Returns:
+		tuple: (error response, None) or (None, response dict without data)
+	"""
+	# Imported here: the API blueprint imports this module
+	from .api.api_routes import parse_coordinate
+
+	if not data or not isinstance(data, dict):
+		return (jsonify(
+				{
+					'status': 'error', 'message': 'No JSON body received'
+				}
+		), 400), None
+
+	try:
+		lat, lon = parse_coordinate(data.get('lat'), data.get('lon'))
+	except ValueError as err:
+		return (jsonify({'status': 'error', 'message': str(err)}), 400), None
+
+	# Check if location actually changed before clearing cache
+	if old_lat != lat or old_lon != lon:
+		# Clear cache when location changes
+		session.pop('cached_location_key', None)
+		session.pop('cache_timestamp', None)
+		session.pop('cached_context', None)
+
+	session['lat'] = lat
+	session['lon'] = lon
+
+	# Start fetching now so the next page load is a cache hit
+	prefetcher.start(lat, lon)
+	response = {'status': 'success', 'lat': lat, 'lon': lon}
+	if not data.get('wait'):
+		response['prefetch'] = url_for('main.prefetch_result')
+	return None, response
 
 
 @main_bp.route('/set_location', methods=['POST'])
@@ -281,9 +432,13 @@ def set_location():
 	2. Form data with 'lat_lon' field containing comma-separated coordinates
 
 	Stores location coordinates in the user's session and clears cache if location changed.
+	Starts fetching the new location's data in the background right away, so
+	the page load that follows finds it ready.
 
 	Returns:
-		For JSON requests: JSON response with status and coordinates
+		For JSON requests: JSON response with status and coordinates, plus
+			either data (the home page fields, when the body sets "wait": true)
+			or prefetch (URL that waits for the background fetch)
 		For form requests: Redirect to index with flash message
 
 	Error responses:
@@ -296,33 +451,15 @@ def set_location():
 	# Handle JSON data from JavaScript geolocation API
 	if request.is_json:
 		data = request.get_json()
-		if not data:
-			return jsonify(
-					{
-						'status': 'error', 'message': 'No JSON body received'
-					}
-			), 400
-
-		lat = data.get('lat')
-		lon = data.get('lon')
-		if lat is None or lon is None:
-			return jsonify(
-					{
-						'status':  'error',
-						'message': 'Latitude or longitude missing'
-					}
-			), 400
-
-		# Check if location actually changed before clearing cache
-		if old_lat != lat or old_lon != lon:
-			# Clear cache when location changes
-			session.pop('cached_location_key', None)
-			session.pop('cache_timestamp', None)
-			session.pop('cached_context', None)
+		error, response = _set_json_location(data, old_lat, old_lon)
+		if error is not None:
+			return error
 
-		session['lat'] = lat
-		session['lon'] = lon
-		return jsonify({'status': 'success', 'lat': lat, 'lon': lon})
+		if data.get('wait'):
+			result = prefetcher.join(response['lat'], response['lon'])
+			if result is not None:
+				response['data'] = live_payload(result.context)
+		return jsonify(response)
 
 	# Handle form data from dropdown selection
 	else:
@@ -348,10 +485,79 @@ def set_location():
 
 		session['lat'] = lat
 		session['lon'] = lon
+		prefetcher.start(lat, lon)
 		flash('Location set successfully!', 'success')
 		return redirect(url_for('main.index'))
 
 
+@async_view('main.set_location')
+async def set_location_async():
+	"""Coroutine version of set_location() served on the ASGI event loop."""
+	# Only a JSON body asking to wait for the data blocks
+	if not request.is_json:
+		return set_location()
+	data = request.get_json()
+	if not isinstance(data, dict) or not data.get('wait'):
+		return set_location()
+
+	error, response = _set_json_location(
+			data, session.get('lat'), session.get('lon')
+	)
+	if error is not None:
+		return error
+
+	result = await prefetcher.join_async(response['lat'], response['lon'])
+	if result is not None:
+		response['data'] = live_payload(result.context)
+	return jsonify(response)
+
+
+def live_payload(context):
+	"""Select the fields shown on the home page from a pipeline context."""
+	return {field: context.get(field) for field in LIVE_FIELDS}
+
+
+@main_bp.route('/prefetch')
+def prefetch_result():
+	"""
+	Wait for the fetch /set_location started for the session's location and
+	return its data, for clients that want the payload without a reload.
+
+	Returns:
+		JSON response with status and data (the home page fields)
+
+	Error responses:
+		404: No prefetch running or recently finished for this location
+		504: The prefetch failed or did not finish within the budget
+	"""
+	lat = session.get('lat', -36.8485)
+	lon = session.get('lon', 174.7633)
+	if prefetcher.pending(lat, lon) is None:
+		return jsonify(
+				{'status': 'error', 'message': 'No prefetch for this location'}
+		), 404
+
+	return _prefetch_response(prefetcher.join(lat, lon))
+
+
+@async_view('main.prefetch_result')
+async def prefetch_result_async():
+	"""Coroutine version of prefetch_result() for the ASGI event loop."""
+	lat = session.get('lat', -36.8485)
+	lon = session.get('lon', 174.7633)
+	if prefetcher.pending(lat, lon) is None:
+		return prefetch_result()
+	return _prefetch_response(await prefetcher.join_async(lat, lon))
+
+
+def _prefetch_response(result):
+	if result is None:
+		return jsonify(
+				{'status': 'error', 'message': 'Prefetch did not complete'}
+		), 504
+	return jsonify({'status': 'success', 'data': live_payload(result.context)})
+
+
 @main_bp.route('/clear_cache', methods=['POST'])
 def clear_cache():
 	"""
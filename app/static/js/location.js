@@ -40,6 +40,118 @@ function updateLocationButton(state, message) {
     }
 }
 
+// Live updates: the server pushes a snapshot, then only changed fields
+let liveSource = null;
+let locationChanged = false;
+const liveState = {};
+// Milliseconds before reopening a stream the server refused
+const LIVE_RETRY_MS = 30000;
+// Pending request for the conditions block, while its layout is swapped
+let conditionsRequest = null;
+
+function uvCategory(uv) {
+    if (uv < 3) return ['uv-low', 'Low'];
+    if (uv < 6) return ['uv-moderate', 'Moderate'];
+    if (uv < 8) return ['uv-high', 'High'];
+    if (uv < 11) return ['uv-very-high', 'Very High'];
+    return ['uv-extreme', 'Extreme'];
+}
+
+function liveHasUv() {
+    return liveState.uv_index !== null && liveState.uv_index !== undefined;
+}
+
+function applyLiveData(data) {
+    Object.assign(liveState, data);
+
+    const hasUv = liveHasUv();
+    if (Boolean(document.getElementById('uvValue')) !== hasUv) {
+        // Switching between the conditions and the "unavailable" layout
+        // (nighttime, upstream down) needs the server-rendered block
+        swapConditions();
+    } else if (hasUv) {
+        updateConditions(data);
+    }
+}
+
+function swapConditions() {
+    if (conditionsRequest) {
+        return;
+    }
+    conditionsRequest = fetch('/conditions', { credentials: 'same-origin' })
+        .then(response => response.ok ? response.text() : null)
+        .then(html => {
+            if (html !== null) {
+                document.getElementById('conditions').innerHTML = html;
+            }
+        })
+        .catch(() => {})
+        .finally(() => {
+            conditionsRequest = null;
+            // Catch up on updates that arrived meanwhile; a block still in
+            // the other layout waits for the next update, never loops
+            if (liveHasUv() && document.getElementById('uvValue')) {
+                updateConditions(liveState);
+            }
+        });
+}
+
+function updateConditions(data) {
+    const uvValue = document.getElementById('uvValue');
+
+    if ('location_name' in data) {
+        document.getElementById('locationName').textContent =
+            data.location_name || 'Unknown Location';
+    }
+    if ('uv_index' in data && data.uv_index !== null) {
+        const uv = parseFloat(data.uv_index);
+        const [uvClass, label] = uvCategory(uv);
+        const indicator = document.getElementById('uvIndicator');
+        uvValue.textContent = uv.toFixed(1);
+        indicator.className = `uv-indicator ${uvClass}`;
+        indicator.textContent = label;
+    }
+    if ('uv_source' in data) {
+        document.getElementById('uvSource').hidden = data.uv_source !== 'estimate';
+    }
+    if ('cloud_index' in data) {
+        document.getElementById('cloudValue').textContent = `${data.cloud_index}%`;
+    }
+    if ('robot_advice' in data || 'advice' in data) {
+        document.getElementById('adviceContent').textContent =
+            liveState.robot_advice || liveState.advice || '';
+    }
+}
+
+function connectLiveUpdates() {
+    if (!window.EventSource) {
+        window.location.reload();
+        return;
+    }
+    if (liveSource) {
+        liveSource.close();
+    }
+
+    liveSource = new EventSource('/events');
+    liveSource.addEventListener('snapshot', event => {
+        applyLiveData(JSON.parse(event.data));
+        if (locationChanged) {
+            locationChanged = false;
+            document.getElementById('locationStatus').textContent = 'Weather data updated';
+        }
+    });
+    liveSource.addEventListener('update', event => {
+        applyLiveData(JSON.parse(event.data));
+    });
+    liveSource.addEventListener('error', () => {
+        // A refused stream (server at its connection limit) is not retried
+        // by the browser; try again later, keeping the rendered data
+        if (liveSource.readyState === EventSource.CLOSED) {
+            setTimeout(connectLiveUpdates, LIVE_RETRY_MS);
+        }
+    });
+}
+
 // Geolocation fetch and send location to server
 function getLocationAndSend() {
     if (!navigator.geolocation) {
@@ -63,7 +175,9 @@ function getLocationAndSend() {
             .then(data => {
                 if (data.status === 'success') {
                     updateLocationButton('success', 'Refreshing weather data...');
-                    setTimeout(() => window.location.reload(), 1500);
+                    // The stream follows the session's location, so reconnect
+                    locationChanged = true;
+                    connectLiveUpdates();
                 } else {
                     updateLocationButton('error', data.message || 'Server error');
                 }
@@ -127,6 +241,11 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Only the home page shows live data
+    if (document.getElementById('locationBtn')) {
+        connectLiveUpdates();
+    }
+
    const locationName = window.locationName || "";
 
    const hasLocation = locationName !== "" && locationName !== "Unknown Location";
@@ -0,0 +1,7 @@
+# asgi.py
+
+from app import create_app
+from app.asgi import FlaskASGI
+
+flask_app = create_app()
+app = FlaskASGI(flask_app, flask_app.config['ASGI_WSGI_THREADS'])
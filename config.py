@@ -7,3 +7,84 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Total time budget for fetching UV, weather and AI advice per request
+    FETCH_BUDGET_SECONDS = float(os.getenv("FETCH_BUDGET_SECONDS", "10"))
+
+    # Persistent upstream cache shared by all worker processes. Defaults to
+    # upstream_cache.sqlite3 in the Flask instance folder when unset.
+    DISK_CACHE_ENABLED = os.getenv("DISK_CACHE_ENABLED", "true").lower() == "true"
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH")
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Hot cache in shared memory, mapped by every worker process. Defaults to
+    # /dev/shm when available, otherwise the Flask instance folder.
+    SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+    SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+    SHARED_CACHE_SLOTS = int(os.getenv("SHARED_CACHE_SLOTS", "4096"))
+
+    # Cache grid cell size in degrees per data type; requests within one cell
+    # share cached data
+    CACHE_RESOLUTION_UV = float(os.getenv("CACHE_RESOLUTION_UV", "0.25"))
+    CACHE_RESOLUTION_WEATHER = float(os.getenv("CACHE_RESOLUTION_WEATHER", "0.05"))
+    CACHE_RESOLUTION_ADVICE = float(os.getenv("CACHE_RESOLUTION_ADVICE", "1.0"))
+
+    # Generate AI advice as validated JSON rather than parsing free text
+    LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+    # Load the Ollama model and evaluate the advice system prompt at startup
+    OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "true").lower() == "true"
+
+    # Worker threads that run LLM advice jobs off the request threads, and
+    # the number of jobs that may wait for them. 0 workers runs inference
+    # on the request thread.
+    ADVICE_WORKERS = int(os.getenv("ADVICE_WORKERS", "2"))
+    ADVICE_QUEUE_SIZE = int(os.getenv("ADVICE_QUEUE_SIZE", "32"))
+
+    # Seconds between refreshes of locations watched by open pages (/events)
+    LIVE_UPDATE_INTERVAL = float(os.getenv("LIVE_UPDATE_INTERVAL", "60"))
+
+    # Open /events streams per process. Each synchronous stream holds a
+    # server thread, so keep this below the WSGI server's thread count.
+    EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "64"))
+
+    # Sampling profiler for the page and auth routes. A fraction of requests
+    # (0 disables sampling) is profiled, plus any request carrying an
+    # X-Profile header equal to PROFILING_TOKEN. Profiles default to
+    # instance/profiles.
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+    PROFILING_DIR = os.getenv("PROFILING_DIR")
+    PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+
+    # Reuse the rendered conditions block across requests with the same data,
+    # and keep compiled templates in a bytecode cache (defaults to
+    # instance/jinja_cache)
+    FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "true").lower() == "true"
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+
+    # Threads running the synchronous routes when served through asgi.py
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+
+    # Structured logging through a background queue. LOG_LEVELS sets levels
+    # per module, e.g. "route_logic.bot_advice=DEBUG,werkzeug=WARNING";
+    # LOG_DEBUG_SAMPLE_RATE is the fraction of DEBUG records kept.
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    # Location sharding across app nodes. SHARD_NODES lists the base URLs of
+    # every node (the same list on all of them) and SHARD_SELF_URL is this
+    # node's entry. Without SHARD_NODES each node fetches every location
+    # itself. SHARD_TOKEN protects the /api/internal endpoints, which are
+    # closed without it, and is required with SHARD_NODES.
+    SHARD_NODES = os.getenv("SHARD_NODES", "")
+    SHARD_SELF_URL = os.getenv("SHARD_SELF_URL")
+    SHARD_TOKEN = os.getenv("SHARD_TOKEN")
+    SHARD_HEALTH_INTERVAL = float(os.getenv("SHARD_HEALTH_INTERVAL", "10"))
+
+    # Precomputed advice table built by `python -m route_logic.advice_table build`.
+    # Defaults to route_logic/data/advice_table.bin when unset.
+    ADVICE_TABLE_PATH = os.getenv("ADVICE_TABLE_PATH")
@@ -1,14 +1,12 @@
-def get_clothing_advice(uv_index, is_cloudy=None):
+def get_clothing_advice(uv_index, weather=None):
+	# weather is a WeatherRecord; only its cloud cover matters here
 	if uv_index is None:
 		return "UV data unavailable."
 
-	if is_cloudy is None:
+	if weather is None:
 		return "Weather data unavailable."
 
-	# Unpack the tuple into cloud_index and location_name
-	cloud_index, location_name, weather_main, weather_description, weather_icon = is_cloudy
-
-	if cloud_index >= 50:
+	if weather.cloud_index >= 50:
 		if uv_index <= 2:
 			return "Low UV: Minimal sun risk. Regular clothing is fine."
 		elif uv_index <= 5:
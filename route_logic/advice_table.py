@@ -0,0 +1,368 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+
+import aiohttp
+
+from route_logic.bot_advice import STRUCTURED_SYSTEM_MSG, StructuredAdvice, \
+	get_structured_advice_async, structured_client
+
+logger = logging.getLogger(__name__)
+
+# Bump when the file layout below changes
+FORMAT_VERSION = 1
+
+MAGIC = b"UVADVTB1"
+
+# Header: magic, format version, grid hash, UV buckets, conditions, built at
+HEADER = struct.Struct("<8sIQHHd")
+
+# One index entry per (UV bucket, condition) cell: pool offset, text length
+INDEX_ENTRY = struct.Struct("<IH")
+
+# Separator between the three advice fields in the string pool
+FIELD_SEPARATOR = "\x1f"
+
+# UV buckets: 0 to 11.5 in half-steps, plus a final bucket for 12 and above
+UV_STEP = 0.5
+UV_BUCKETS = 25
+
+# OpenWeatherMap's weather_main/description vocabulary
+# (https://openweathermap.org/weather-conditions)
+CONDITIONS = (
+	("Thunderstorm", "thunderstorm with light rain"),
+	("Thunderstorm", "thunderstorm with rain"),
+	("Thunderstorm", "thunderstorm with heavy rain"),
+	("Thunderstorm", "light thunderstorm"),
+	("Thunderstorm", "thunderstorm"),
+	("Thunderstorm", "heavy thunderstorm"),
+	("Thunderstorm", "ragged thunderstorm"),
+	("Thunderstorm", "thunderstorm with light drizzle"),
+	("Thunderstorm", "thunderstorm with drizzle"),
+	("Thunderstorm", "thunderstorm with heavy drizzle"),
+	("Drizzle", "light intensity drizzle"),
+	("Drizzle", "drizzle"),
+	("Drizzle", "heavy intensity drizzle"),
+	("Drizzle", "light intensity drizzle rain"),
+	("Drizzle", "drizzle rain"),
+	("Drizzle", "heavy intensity drizzle rain"),
+	("Drizzle", "shower rain and drizzle"),
+	("Drizzle", "heavy shower rain and drizzle"),
+	("Drizzle", "shower drizzle"),
+	("Rain", "light rain"),
+	("Rain", "moderate rain"),
+	("Rain", "heavy intensity rain"),
+	("Rain", "very heavy rain"),
+	("Rain", "extreme rain"),
+	("Rain", "freezing rain"),
+	("Rain", "light intensity shower rain"),
+	("Rain", "shower rain"),
+	("Rain", "heavy intensity shower rain"),
+	("Rain", "ragged shower rain"),
+	("Snow", "light snow"),
+	("Snow", "snow"),
+	("Snow", "heavy snow"),
+	("Snow", "sleet"),
+	("Snow", "light shower sleet"),
+	("Snow", "shower sleet"),
+	("Snow", "light rain and snow"),
+	("Snow", "rain and snow"),
+	("Snow", "light shower snow"),
+	("Snow", "shower snow"),
+	("Snow", "heavy shower snow"),
+	("Mist", "mist"),
+	("Smoke", "smoke"),
+	("Haze", "haze"),
+	("Dust", "sand/dust whirls"),
+	("Dust", "dust"),
+	("Fog", "fog"),
+	("Sand", "sand"),
+	("Ash", "volcanic ash"),
+	("Squall", "squalls"),
+	("Tornado", "tornado"),
+	("Clear", "clear sky"),
+	("Clouds", "few clouds"),
+	("Clouds", "scattered clouds"),
+	("Clouds", "broken clouds"),
+	("Clouds", "overcast clouds"),
+)
+
+CONDITION_INDEX = {
+	(main.lower(), description.lower()): index for index, (main, description)
+	in enumerate(CONDITIONS)
+}
+
+# Default location of the generated table, next to this module
+DEFAULT_TABLE_PATH = os.path.join(
+		os.path.dirname(os.path.abspath(__file__)), "data", "advice_table.bin"
+)
+
+# Concurrent LLM requests while building the table
+BUILD_CONCURRENCY = 2
+
+
+def uv_bucket(uv_index):
+	"""Map a UV index to its half-step bucket (0 .. UV_BUCKETS - 1)."""
+	return min(max(int(round(uv_index / UV_STEP)), 0), UV_BUCKETS - 1)
+
+
+def bucket_uv(bucket):
+	"""Return the representative UV index for a bucket."""
+	return bucket * UV_STEP
+
+
+def grid_hash():
+	"""
+	Fingerprint of everything the table's content depends on: the model,
+	the structured system prompt and the grid itself. A table whose hash
+	differs from the running code is stale and must be regenerated.
+	"""
+	digest = hashlib.blake2b(digest_size=8)
+	for part in (str(FORMAT_VERSION), structured_client.model,
+	             STRUCTURED_SYSTEM_MSG, str(UV_STEP), str(UV_BUCKETS),
+	             repr(CONDITIONS)):
+		digest.update(part.encode())
+		digest.update(b"\0")
+	return int.from_bytes(digest.digest(), "little")
+
+
+class AdviceTable:
+	"""
+	Read-only, memory-mapped table of precomputed advice.
+
+	Holds one StructuredAdvice per (UV bucket, weather condition) cell,
+	generated offline by build_table(). Lookups are a dict hit on the
+	condition plus one fixed-size index read, with no inference cost.
+
+	Usage:
+		table = AdviceTable.open(path)
+		advice = table.lookup(6.2, "Clouds", "broken clouds")
+	"""
+
+	def __init__(self, path, mm, built_at, table_hash):
+		self.path = path
+		self._mm = mm
+		self.built_at = built_at
+		self.table_hash = table_hash
+
+	@classmethod
+	def open(cls, path):
+		"""
+		Map the table at path.
+
+		Raises:
+			OSError: If the file cannot be read
+			ValueError: If the file is not a table for the current grid, or
+						is truncated
+		"""
+		with open(path, "rb") as f:
+			mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			table_hash, built_at = cls._check(path, mm)
+		except ValueError:
+			mm.close()
+			raise
+		return cls(path, mm, built_at, table_hash)
+
+	@staticmethod
+	def _check(path, mm):
+		"""
+		Validate the header and index of a mapped table, so lookups never
+		read past the end of the file.
+
+		Returns:
+			tuple: (table hash, built at)
+		"""
+		if len(mm) < HEADER.size:
+			raise ValueError(f"{path} is not an advice table")
+		magic, version, table_hash, n_uv, n_conditions, built_at = \
+			HEADER.unpack_from(mm, 0)
+		if magic != MAGIC or version != FORMAT_VERSION:
+			raise ValueError(f"{path} is not an advice table")
+		if (table_hash, n_uv, n_conditions) != (grid_hash(), UV_BUCKETS,
+		                                        len(CONDITIONS)):
+			raise ValueError(
+					f"{path} is stale; regenerate it with "
+					f"'python -m route_logic.advice_table build'"
+			)
+
+		pool_start = HEADER.size + UV_BUCKETS * len(CONDITIONS) * INDEX_ENTRY.size
+		if len(mm) < pool_start:
+			raise ValueError(f"{path} is truncated")
+		for offset, length in INDEX_ENTRY.iter_unpack(mm[HEADER.size:pool_start]):
+			if length and (offset < pool_start or offset + length > len(mm)):
+				raise ValueError(f"{path} is corrupt: advice entry out of bounds")
+		return table_hash, built_at
+
+	def lookup(self, uv_index, weather_main, weather_description):
+		"""
+		Return the precomputed StructuredAdvice for the conditions, or None if
+		the condition is not in the vocabulary or its cell failed to build.
+		"""
+		if uv_index is None or not weather_main or not weather_description:
+			return None
+
+		condition = CONDITION_INDEX.get(
+				(weather_main.lower(), weather_description.lower())
+		)
+		if condition is None:
+			return None
+
+		cell = uv_bucket(uv_index) * len(CONDITIONS) + condition
+		offset, length = INDEX_ENTRY.unpack_from(
+				self._mm, HEADER.size + cell * INDEX_ENTRY.size
+		)
+		if not length:
+			return None
+
+		fields = self._mm[offset:offset + length].decode().split(
+				FIELD_SEPARATOR
+		)
+		return StructuredAdvice(*fields)
+
+	def close(self):
+		self._mm.close()
+
+
+def write_table(path, cells):
+	"""
+	Write a table file atomically.
+
+	Args:
+		path (str): Destination file
+		cells (list): UV_BUCKETS * len(CONDITIONS) entries in bucket-major
+					  order, each a StructuredAdvice or None
+	"""
+	pool = bytearray()
+	index = bytearray()
+	pool_start = HEADER.size + len(cells) * INDEX_ENTRY.size
+	for advice in cells:
+		if advice is None:
+			index += INDEX_ENTRY.pack(0, 0)
+			continue
+		encoded = FIELD_SEPARATOR.join(advice).encode()
+		index += INDEX_ENTRY.pack(pool_start + len(pool), len(encoded))
+		pool += encoded
+
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+	tmp_path = f"{path}.tmp"
+	with open(tmp_path, "wb") as f:
+		f.write(
+				HEADER.pack(
+						MAGIC, FORMAT_VERSION, grid_hash(), UV_BUCKETS,
+						len(CONDITIONS), time.time()
+				)
+		)
+		f.write(index)
+		f.write(pool)
+	os.replace(tmp_path, path)
+
+
+async def build_table(path, concurrency=BUILD_CONCURRENCY):
+	"""
+	Run the LLM once over every (UV bucket, condition) cell and write the
+	table to path. Cells whose generation fails are left empty and fall back
+	to live inference at runtime.
+
+	Returns:
+		tuple: (filled cells, total cells)
+	"""
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def generate(session, bucket, main, description):
+		async with semaphore:
+			return await get_structured_advice_async(
+					bucket_uv(bucket), None, None, main, description, session
+			)
+
+	await asyncio.to_thread(structured_client.warm_up)
+	timeout = aiohttp.ClientTimeout(total=120)
+	async with aiohttp.ClientSession(timeout=timeout) as session:
+		cells = await asyncio.gather(
+				*(generate(session, bucket, main, description) for bucket in
+				  range(UV_BUCKETS) for main, description in CONDITIONS)
+		)
+
+	write_table(path, cells)
+	return sum(cell is not None for cell in cells), len(cells)
+
+
+# Table used by the fetch pipeline, set by load_advice_table()
+_advice_table = None
+
+
+def load_advice_table(path=DEFAULT_TABLE_PATH):
+	"""
+	Open the table at path for runtime lookups.
+
+	A missing or stale table is logged and ignored, so advice falls back to
+	live inference.
+
+	Returns:
+		bool: True if the table was loaded
+	"""
+	global _advice_table
+	try:
+		_advice_table = AdviceTable.open(path)
+	except FileNotFoundError:
+		logger.info(f"No precomputed advice table at {path}")
+		return False
+	except (OSError, ValueError, struct.error) as err:
+		logger.warning(f"Precomputed advice table not loaded: {err}")
+		return False
+	return True
+
+
+def lookup_precomputed_advice(uv_index, weather_main, weather_description):
+	"""Return precomputed StructuredAdvice, or None if unavailable."""
+	if _advice_table is None:
+		return None
+	return _advice_table.lookup(uv_index, weather_main, weather_description)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(
+			description="Build or inspect the precomputed advice table"
+	)
+	parser.add_argument("command", choices=("build", "info"))
+	parser.add_argument(
+			"--path", default=os.getenv("ADVICE_TABLE_PATH", DEFAULT_TABLE_PATH)
+	)
+	parser.add_argument(
+			"--concurrency", type=int, default=BUILD_CONCURRENCY
+	)
+	args = parser.parse_args(argv)
+
+	if args.command == "build":
+		total = UV_BUCKETS * len(CONDITIONS)
+		print(f"Generating {total} cells with model {structured_client.model}...")
+		started = time.time()
+		filled, total = asyncio.run(build_table(args.path, args.concurrency))
+		print(
+				f"Wrote {args.path}: {filled}/{total} cells in "
+				f"{time.time() - started:.0f}s"
+		)
+		return 0
+
+	try:
+		table = AdviceTable.open(args.path)
+	except (OSError, ValueError, struct.error) as err:
+		print(f"Table unusable: {err}")
+		return 1
+
+	print(
+			f"{args.path}: built {time.ctime(table.built_at)}, "
+			f"version {table.table_hash:016x}, current"
+	)
+	table.close()
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,278 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Job priorities; lower runs first. Interactive page loads jump ahead of
+# background cache warming.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_WARMING = 10
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 32
+
+# Per-call limit for the workers' aiohttp sessions; callers apply their own
+# (usually shorter) deadline on top
+WORKER_TIMEOUT = 30
+
+# Number of recent queue waits kept for the wait-time metrics
+WAIT_WINDOW = 256
+
+
+class AdviceQueueFull(Exception):
+	"""Raised when a job is submitted while the queue is at capacity."""
+
+
+class AdviceJob:
+	"""
+	Handle for one job submitted to the AdviceWorkerPool.
+
+	future is a concurrent.futures.Future resolved with the coroutine's
+	result. cancel() works whether the job is still queued or already
+	running on a worker.
+	"""
+
+	def __init__(self, func, args, priority):
+		self.func = func
+		self.args = args
+		self.priority = priority
+		self.future = concurrent.futures.Future()
+		# Runs in the submitter's context, so logs keep its request_id
+		self.context = contextvars.copy_context()
+		self.submitted_at = time.monotonic()
+		self.started_at = None
+		self._lock = threading.Lock()
+		self._loop = None
+		self._task = None
+		self._cancel_requested = False
+
+	def _attach(self, loop, task):
+		"""Record the running task; returns False if cancel() came first."""
+		with self._lock:
+			if self._cancel_requested:
+				return False
+			self._loop = loop
+			self._task = task
+			return True
+
+	def cancel(self):
+		"""
+		Cancel the job: drop it if still queued, otherwise cancel its task
+		on the worker's event loop.
+		"""
+		with self._lock:
+			self._cancel_requested = True
+			if self.future.cancel():
+				return
+			if self._task is not None:
+				self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+class AdviceWorkerPool:
+	"""
+	Dedicated worker threads for LLM advice generation.
+
+	Request threads hand advice jobs to a bounded priority queue instead of
+	waiting on Ollama themselves. Each worker runs its own event loop and
+	aiohttp session and processes one job at a time, so the number of
+	concurrent LLM calls is capped at the worker count however many web
+	requests arrive. When the queue is full, submit() fails immediately and
+	the caller falls back to the rule-based advice.
+
+	Until start() is called, run() simply awaits the job in the caller's
+	event loop, so the pool is optional.
+
+	Usage:
+		advice_pool.start(workers=2, queue_size=32)
+		advice = await advice_pool.run(get_structured_advice_async, uv, ...)
+		advice_pool.stats()   # queue length, wait times, outcomes
+	"""
+
+	def __init__(self):
+		self._queue = None
+		self._threads = []
+		self._sequence = itertools.count()
+		self._stats_lock = threading.Lock()
+		self._waits = deque(maxlen=WAIT_WINDOW)
+		self._running_jobs = 0
+		self._counts = dict.fromkeys(
+				("submitted", "completed", "failed", "cancelled", "rejected"), 0
+		)
+
+	@property
+	def running(self):
+		return bool(self._threads)
+
+	def start(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+		"""Start the worker threads. Calling start() again has no effect."""
+		if self.running or workers <= 0:
+			return
+		self._queue = queue.PriorityQueue(maxsize=queue_size)
+		for index in range(workers):
+			thread = threading.Thread(
+					target=self._work, name=f"advice-worker-{index}", daemon=True
+			)
+			thread.start()
+			self._threads.append(thread)
+		logger.info(
+				f"Started {workers} advice workers (queue size {queue_size})"
+		)
+
+	def shutdown(self, wait=True):
+		"""Stop the workers once the jobs already queued have run."""
+		if not self.running:
+			return
+		for _ in self._threads:
+			# Sentinels sort after every real job
+			self._queue.put((float("inf"), next(self._sequence), None))
+		if wait:
+			for thread in self._threads:
+				thread.join()
+		self._threads = []
+
+	def _count(self, outcome):
+		with self._stats_lock:
+			self._counts[outcome] += 1
+
+	def submit(self, func, *args, priority=PRIORITY_INTERACTIVE):
+		"""
+		Queue func(*args, session=<worker session>) to run on a worker.
+
+		Args:
+			func (coroutine function): Accepts a session keyword argument
+			*args: Positional arguments for func
+			priority (int): PRIORITY_INTERACTIVE or PRIORITY_WARMING
+
+		Returns:
+			AdviceJob: Handle with the result future
+
+		Raises:
+			AdviceQueueFull: If the queue is at capacity
+			RuntimeError: If the pool has not been started
+		"""
+		if not self.running:
+			raise RuntimeError("Advice worker pool is not running")
+
+		job = AdviceJob(func, args, priority)
+		try:
+			self._queue.put_nowait((priority, next(self._sequence), job))
+		except queue.Full:
+			self._count("rejected")
+			raise AdviceQueueFull(
+					f"Advice queue is full ({self._queue.maxsize} jobs)"
+			) from None
+		self._count("submitted")
+		return job
+
+	async def run(
+			self, func, *args, priority=PRIORITY_INTERACTIVE, session=None
+			):
+		"""
+		Submit a job and await its result. Cancelling the awaiting task (for
+		example when the caller's deadline passes) cancels the job too.
+
+		Without running workers func is awaited directly with session.
+		"""
+		if not self.running:
+			return await func(*args, session=session)
+
+		job = self.submit(func, *args, priority=priority)
+		try:
+			return await asyncio.wrap_future(job.future)
+		except asyncio.CancelledError:
+			job.cancel()
+			raise
+
+	def _work(self):
+		loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(loop)
+		session = loop.run_until_complete(self._open_session())
+		try:
+			while True:
+				_, _, job = self._queue.get()
+				if job is None:
+					break
+				self._run_job(loop, session, job)
+		finally:
+			loop.run_until_complete(session.close())
+			loop.close()
+
+	@staticmethod
+	async def _open_session():
+		return aiohttp.ClientSession(
+				timeout=aiohttp.ClientTimeout(total=WORKER_TIMEOUT)
+		)
+
+	def _run_job(self, loop, session, job):
+		if not job.future.set_running_or_notify_cancel():
+			self._count("cancelled")
+			return
+
+		job.started_at = time.monotonic()
+		with self._stats_lock:
+			self._waits.append(job.started_at - job.submitted_at)
+			self._running_jobs += 1
+
+		task = job.context.run(
+				loop.create_task, job.func(*job.args, session=session)
+		)
+		if not job._attach(loop, task):
+			task.cancel()
+
+		outcome, value = "completed", None
+		try:
+			value = loop.run_until_complete(task)
+		except asyncio.CancelledError:
+			outcome, value = "cancelled", concurrent.futures.CancelledError()
+		except Exception as err:
+			job.context.run(
+					logger.error, f"Advice job {job.func.__name__} failed: {err}"
+			)
+			outcome, value = "failed", err
+
+		# Update the metrics before the caller can observe the result
+		with self._stats_lock:
+			self._running_jobs -= 1
+			self._counts[outcome] += 1
+		if outcome == "completed":
+			job.future.set_result(value)
+		else:
+			job.future.set_exception(value)
+
+	def stats(self):
+		"""
+		Snapshot of the pool's metrics.
+
+		Returns:
+			dict: workers, queue_length, queue_capacity, running, outcome
+				  counters since start, and mean/max queue wait in seconds
+				  over the last WAIT_WINDOW jobs
+		"""
+		with self._stats_lock:
+			waits = list(self._waits)
+			stats = dict(self._counts)
+			stats["running"] = self._running_jobs
+
+		stats.update(
+				{
+					"workers":        len(self._threads),
+					"queue_length":   self._queue.qsize() if self._queue else 0,
+					"queue_capacity": self._queue.maxsize if self._queue else 0,
+					"wait_mean":      sum(waits) / len(waits) if waits else 0.0,
+					"wait_max":       max(waits, default=0.0),
+				}
+		)
+		return stats
+
+
+# Pool used by the fetch pipeline, started by create_app()
+advice_pool = AdviceWorkerPool()
@@ -1,28 +1,24 @@
 import aiohttp
 import asyncio
 import logging
+from typing import NamedTuple, Optional
 
+from route_logic.llm_client import OllamaClient
 
-async def get_dynamic_advice_async(
-		uv_index, lat, lon, weather_main, weather_description, session=None
-		):
-	"""
-	Asynchronously get dynamic advice from a local LLM (Ollama).
+logger = logging.getLogger(__name__)
 
-	Args:
-		uv_index (float): UV index value (0-11+)
-		lat (float): Latitude coordinate
-		lon (float): Longitude coordinate
-		weather_main (str): Main weather condition (e.g., "Clear", "Rain")
-		weather_description (str): Detailed weather description
-		session (aiohttp.ClientSession, optional): Existing aiohttp session.
-												   If None, creates a new one.
+# Use JSON-format generation for the advice shown on the home page; set from
+# LLM_STRUCTURED_OUTPUT by configure_structured_output()
+STRUCTURED_OUTPUT = True
 
-	Returns:
-		str: AI-generated advice formatted with UV Summary, Clothing, and Sun Protection
-			 sections, or error message if request fails
-	"""
-	system_msg = """You are a helpful assistant that gives sun safety advice based on UV index and weather. 
+# Keys of the structured advice object and the labels used when rendering it
+ADVICE_FIELDS = ("uv_summary", "clothing", "sun_protection")
+ADVICE_LABELS = ("UV Summary", "Clothing", "Sun Protection")
+
+# Longest accepted section; anything longer is treated as a bad generation
+MAX_FIELD_LENGTH = 240
+
+SYSTEM_MSG = """You are a helpful assistant that gives sun safety advice based on UV index and weather. 
 Format your responses like this:
 
 UV Summary: <brief UV risk level>
@@ -49,20 +45,149 @@ UV Summary: Low UV risk.
 Clothing: Wear a hat and comfortable, light-colored clothing.
 Sun Protection: Sunscreen is optional but recommended if outside for long periods."""
 
-	user_msg = f"""Based on the current UV index and weather condition, give brief and practical clothing and sun safety advice.
+STRUCTURED_SYSTEM_MSG = """You are a helpful assistant that gives sun safety advice based on UV index and weather.
+Respond with a single JSON object with exactly these string fields:
+
+{"uv_summary": "<brief UV risk level>", "clothing": "<short clothing advice>", "sun_protection": "<short sunscreen and shade advice>"}
+
+Examples:
+
+Input:
+- UV Index: 5.5
+- Weather: Sunny
+- Location: Latitude -36.85, Longitude 174.76
+Output:
+{"uv_summary": "Moderate UV risk.", "clothing": "Wear a wide-brimmed hat and lightweight, long-sleeved clothing.", "sun_protection": "Apply broad-spectrum sunscreen SPF 30+, reapply every 2 hours."}
+
+Input:
+- UV Index: 1.2
+- Weather: Cloudy
+- Location: Latitude -36.85, Longitude 174.76
+Output:
+{"uv_summary": "Low UV risk.", "clothing": "Wear a hat and comfortable, light-colored clothing.", "sun_protection": "Sunscreen is optional but recommended if outside for long periods."}"""
+
+# Shared clients so the warmed-up model context is reused by every request
+advice_client = OllamaClient.from_env(SYSTEM_MSG)
+structured_client = OllamaClient.from_env(STRUCTURED_SYSTEM_MSG)
+
+
+class StructuredAdvice(NamedTuple):
+	"""
+	Parsed AI advice with the three sections the prompt asks for.
+
+	A plain tuple, so it stores compactly in the JSON-backed caches and can be
+	rebuilt with StructuredAdvice(*cached_value).
+	"""
+	uv_summary: str
+	clothing: str
+	sun_protection: str
+
+	def format(self):
+		"""Render the advice as the three labelled lines shown to users."""
+		return "\n".join(
+				f"{label}: {value}" for label, value in
+				zip(ADVICE_LABELS, self)
+		)
+
+
+def configure_structured_output(enabled):
+	"""Choose JSON-format (True) or free-text (False) advice generation."""
+	global STRUCTURED_OUTPUT
+	STRUCTURED_OUTPUT = bool(enabled)
+
+
+def validate_advice(data):
+	"""
+	Build a StructuredAdvice from a dict keyed by ADVICE_FIELDS.
+
+	Returns:
+		StructuredAdvice, or None if a field is missing, empty, not a string
+		or longer than MAX_FIELD_LENGTH
+	"""
+	if not isinstance(data, dict):
+		return None
+
+	values = []
+	for field in ADVICE_FIELDS:
+		value = data.get(field)
+		if not isinstance(value, str):
+			return None
+		value = " ".join(value.split())
+		if not value or len(value) > MAX_FIELD_LENGTH:
+			return None
+		values.append(value)
+	return StructuredAdvice(*values)
+
+
+def is_complete_advice(data):
+	"""True when every advice field holds a non-empty string."""
+	return all(
+			isinstance(data.get(field), str) and data[field].strip() for field
+			in ADVICE_FIELDS
+	)
+
+
+def parse_advice_text(text):
+	"""
+	Parse free-text advice in the "UV Summary: / Clothing: / Sun Protection:"
+	format into a StructuredAdvice.
+
+	Returns:
+		StructuredAdvice, or None if any section is missing (e.g. for the
+		error strings returned by get_dynamic_advice_async)
+	"""
+	if not isinstance(text, str):
+		return None
+
+	sections = {}
+	for line in text.splitlines():
+		label, _, value = line.partition(":")
+		label = label.strip()
+		if label in ADVICE_LABELS and value.strip():
+			sections[ADVICE_FIELDS[ADVICE_LABELS.index(label)]] = value.strip()
+	return validate_advice(sections)
+
+
+def build_user_prompt(uv_index, lat, lon, weather_main, weather_description):
+	"""
+	Build the per-request prompt describing the current conditions.
+
+	The location line is left out when lat and lon are None, which is how
+	location-independent advice (e.g. the precomputed table) is generated.
+	"""
+	location = "" if lat is None or lon is None else \
+		f"\n- Location: Latitude {lat}, Longitude {lon}"
+	return f"""Based on the current UV index and weather condition, give brief and practical clothing and sun safety advice.
 
 Input:
 - UV Index: {uv_index}
-- Weather: {weather_main}, {weather_description}
-- Location: Latitude {lat}, Longitude {lon}
+- Weather: {weather_main}, {weather_description}{location}
 
 Output:"""
 
-	payload = {
-		"model":  "openhermes", "system": system_msg, "prompt": user_msg,
-		"stream": False, "temperature": 0.2
-	}
 
+async def get_dynamic_advice_async(
+		uv_index, lat, lon, weather_main, weather_description, session=None
+		):
+	"""
+	Asynchronously get dynamic advice from a local LLM (Ollama).
+
+	Uses the shared advice_client, which reuses the warmed-up system prompt
+	context and caps output length.
+
+	Args:
+		uv_index (float): UV index value (0-11+)
+		lat (float): Latitude coordinate
+		lon (float): Longitude coordinate
+		weather_main (str): Main weather condition (e.g., "Clear", "Rain")
+		weather_description (str): Detailed weather description
+		session (aiohttp.ClientSession, optional): Existing aiohttp session.
+												   If None, creates a new one.
+
+	Returns:
+		str: AI-generated advice formatted with UV Summary, Clothing, and Sun Protection
+			 sections, or error message if request fails
+	"""
 	# Use the provided session or create a new one with longer timeout for LLM requests
 	close_session = session is None
 	if session is None:
@@ -70,29 +195,28 @@ Output:"""
 		session = aiohttp.ClientSession(timeout=timeout)
 
 	try:
-		async with session.post(
-				"http://localhost:11434/api/generate", json=payload
-				) as response:
-			response.raise_for_status()
-			data = await response.json()
-			return data.get('response', 'No advice returned.')
+		return await advice_client.generate(
+				build_user_prompt(
+						uv_index, lat, lon, weather_main, weather_description
+				), session
+		)
 
 	except aiohttp.ClientResponseError as http_err:
-		logging.error(
+		logger.error(
 			f"HTTP error occurred: {http_err}. Status: {http_err.status}"
 			)
 		return f"Error connecting to local LLM: HTTP {http_err.status}"
 	except aiohttp.ClientConnectionError as conn_err:
-		logging.error(f"Connection error occurred: {conn_err}")
+		logger.error(f"Connection error occurred: {conn_err}")
 		return "Error connecting to local LLM: Connection failed"
 	except asyncio.TimeoutError as timeout_err:
-		logging.error(f"Timeout error occurred: {timeout_err}")
+		logger.error(f"Timeout error occurred: {timeout_err}")
 		return "Error: LLM request timed out"
 	except ValueError as json_err:
-		logging.error(f"JSON parsing error: {json_err}")
+		logger.error(f"JSON parsing error: {json_err}")
 		return "Error: Invalid JSON received from LLM"
 	except Exception as err:
-		logging.error(f"Unexpected error occurred: {err}")
+		logger.error(f"Unexpected error occurred: {err}")
 		return f"Error connecting to local LLM: {err}"
 
 	finally:
@@ -119,38 +243,73 @@ def get_dynamic_advice(uv_index, lat, lon, weather_main, weather_description):
 	"""
 	import requests
 
-	system_msg = """You are a helpful assistant that gives sun safety advice based on UV index and weather. 
-Format your responses like this:
+	try:
+		return advice_client.generate_sync(
+				build_user_prompt(
+						uv_index, lat, lon, weather_main, weather_description
+				)
+		)
 
-UV Summary: <brief UV risk level>
-Clothing: <short clothing advice>
-Sun Protection: <short sunscreen and shade advice>"""
+	except requests.exceptions.RequestException as e:
+		logger.error(f"Request error: {e}")
+		return f"Error connecting to local LLM: {e}"
+	except ValueError as e:
+		logger.error(f"JSON parsing error: {e}")
+		return "Error: Invalid JSON received from LLM"
 
-	user_msg = f"""Based on the current UV index and weather condition, give brief and practical clothing and sun safety advice.
 
-Input:
-- UV Index: {uv_index}
-- Weather: {weather_main}, {weather_description}
-- Location: Latitude {lat}, Longitude {lon}
+async def get_structured_advice_async(
+		uv_index, lat, lon, weather_main, weather_description, session=None
+		) -> Optional[StructuredAdvice]:
+	"""
+	Get validated advice from the local LLM as a StructuredAdvice.
 
-Output:"""
+	With STRUCTURED_OUTPUT enabled the model generates a JSON object and
+	generation stops as soon as all three fields are filled; otherwise the
+	free-text response is parsed. Either way, connection errors, timeouts
+	and malformed output return None instead of an error string, so callers
+	can fall back to get_clothing_advice and only cache real advice.
 
-	payload = {
-		"model":  "openhermes", "system": system_msg, "prompt": user_msg,
-		"stream": False, "temperature": 0.2
-	}
+	Args:
+		uv_index (float): UV index value (0-11+)
+		lat (float): Latitude coordinate
+		lon (float): Longitude coordinate
+		weather_main (str): Main weather condition (e.g., "Clear", "Rain")
+		weather_description (str): Detailed weather description
+		session (aiohttp.ClientSession, optional): Existing aiohttp session.
+												   If None, creates a new one.
+
+	Returns:
+		StructuredAdvice, or None if no valid advice could be generated
+	"""
+	if not STRUCTURED_OUTPUT:
+		return parse_advice_text(
+				await get_dynamic_advice_async(
+						uv_index, lat, lon, weather_main, weather_description,
+						session
+				)
+		)
+
+	close_session = session is None
+	if session is None:
+		timeout = aiohttp.ClientTimeout(total=30)
+		session = aiohttp.ClientSession(timeout=timeout)
 
 	try:
-		response = requests.post(
-				"http://localhost:11434/api/generate", json=payload, timeout=20
+		data = await structured_client.generate_json(
+				build_user_prompt(
+						uv_index, lat, lon, weather_main, weather_description
+				), session, is_complete_advice
 		)
-		response.raise_for_status()
-		data = response.json()
-		return data.get('response', 'No advice returned.')
+	except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+		logger.error(f"Structured LLM advice failed: {err}")
+		return None
+	finally:
+		# Only close session if we created it
+		if close_session:
+			await session.close()
 
-	except requests.exceptions.RequestException as e:
-		logging.error(f"Request error: {e}")
-		return f"Error connecting to local LLM: {e}"
-	except ValueError as e:
-		logging.error(f"JSON parsing error: {e}")
-		return "Error: Invalid JSON received from LLM"
+	advice = validate_advice(data)
+	if advice is None:
+		logger.error(f"LLM returned invalid structured advice: {data}")
+	return advice
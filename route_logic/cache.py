@@ -0,0 +1,278 @@
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live for cached entries in seconds (5 minutes)
+DEFAULT_TTL = 300
+
+# Upper bound on entries held per process before the oldest are evicted
+DEFAULT_MAX_ENTRIES = 2048
+
+
+# Grid cell size in degrees used to key each kind of cached data. UV varies
+# slowly over tens of kilometres, weather over a few, and LLM advice mostly
+# depends on the UV and conditions, so nearby requests share an entry even
+# with GPS jitter.
+SPATIAL_RESOLUTIONS = {
+	"uv":           0.25,  # ~28 km
+	"weather":      0.05,  # ~5.5 km
+	"robot_advice": 1.0,  # ~110 km
+}
+
+
+def get_location_key(lat, lon):
+	"""Generate a cache key for the given coordinates."""
+	return f"{round(lat, 4)}_{round(lon, 4)}"
+
+
+def configure_spatial_keys(**resolutions):
+	"""
+	Override grid cell sizes, e.g. configure_spatial_keys(uv=0.5). Values
+	that are None are left unchanged.
+
+	Raises:
+		ValueError: For an unknown data type or a non-positive size
+	"""
+	for kind, resolution in resolutions.items():
+		if resolution is None:
+			continue
+		if kind not in SPATIAL_RESOLUTIONS:
+			raise ValueError(f"Unknown cache data type: {kind}")
+		if resolution <= 0:
+			raise ValueError(f"Cache resolution for {kind} must be positive")
+		SPATIAL_RESOLUTIONS[kind] = resolution
+
+
+def get_spatial_key(kind, lat, lon):
+	"""
+	Cache key for the grid cell of size SPATIAL_RESOLUTIONS[kind] containing
+	the coordinates, named after the cell centre.
+	"""
+	resolution = SPATIAL_RESOLUTIONS[kind]
+	cell_lat = (math.floor(lat / resolution) + 0.5) * resolution
+	cell_lon = (math.floor(lon / resolution) + 0.5) * resolution
+	return f"{round(cell_lat, 6)}_{round(cell_lon, 6)}"
+
+
+class TTLCache:
+	"""
+	Thread-safe in-process cache with per-entry expiry and LRU eviction.
+
+	Shared by every request handled by the worker process, so identical
+	locations requested by different users (or by one batch request) are
+	fetched from the upstream APIs only once per TTL window.
+	"""
+
+	def __init__(self, default_ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+		self.default_ttl = default_ttl
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get_entry(self, key):
+		"""
+		Return (expires_at, value) for key, or None if missing or expired.
+		"""
+		now = time.time()
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+
+			if entry[0] <= now:
+				del self._entries[key]
+				return None
+
+			self._entries.move_to_end(key)
+			return entry
+
+	def get(self, key, default=None):
+		"""
+		Return the cached value for key, or default if missing or expired.
+		"""
+		entry = self.get_entry(key)
+		return default if entry is None else entry[1]
+
+	def set(self, key, value, ttl=None):
+		"""
+		Store value under key for ttl seconds (defaults to default_ttl).
+		"""
+		ttl = self.default_ttl if ttl is None else ttl
+		with self._lock:
+			self._entries[key] = (time.time() + ttl, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def delete(self, key):
+		"""Remove key from the cache if present."""
+		with self._lock:
+			self._entries.pop(key, None)
+
+	def clear(self):
+		"""Remove every entry from the cache."""
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		with self._lock:
+			return len(self._entries)
+
+
+class TieredCache:
+	"""
+	Read-through stack of caches, fastest first.
+
+	get() checks each tier in order and copies a hit back into the faster
+	tiers above it for the entry's remaining lifetime; set() writes to every
+	tier. Tiers must provide get_entry(key), set(key, value, ttl), delete(key)
+	and clear().
+
+	Tiers with a true blocking attribute (the SQLite disk tier) may wait on
+	file locks. Coroutines use get_async() and set_async(), which call those
+	tiers on the loop's default executor instead of on the event loop.
+	"""
+
+	def __init__(self, tiers, default_ttl=DEFAULT_TTL):
+		self.tiers = list(tiers)
+		self.default_ttl = default_ttl
+
+	def add_tier(self, tier):
+		"""Append a slower tier below the existing ones."""
+		self.tiers.append(tier)
+
+	def get_entry(self, key):
+		"""
+		Return (expires_at, value) from the fastest tier holding key, or None.
+		"""
+		for index, tier in enumerate(self.tiers):
+			entry = tier.get_entry(key)
+			if entry is not None:
+				for faster in self.tiers[:index]:
+					self._promote(faster, key, entry)
+				return entry
+		return None
+
+	async def get_entry_async(self, key):
+		"""get_entry() for coroutines; blocking tiers run on the executor."""
+		for index, tier in enumerate(self.tiers):
+			entry = await self._call(tier, tier.get_entry, key)
+			if entry is not None:
+				for faster in self.tiers[:index]:
+					await self._call(faster, self._promote, faster, key, entry)
+				return entry
+		return None
+
+	@staticmethod
+	def _promote(tier, key, entry):
+		expires_at, value = entry
+		remaining = expires_at - time.time()
+		if remaining > 0:
+			tier.set(key, value, remaining)
+
+	@staticmethod
+	async def _call(tier, func, *args):
+		if not getattr(tier, "blocking", False):
+			return func(*args)
+		# Copied context keeps the request ID on the tier's log records
+		context = contextvars.copy_context()
+		return await asyncio.get_running_loop().run_in_executor(
+				None, context.run, func, *args
+		)
+
+	def get(self, key, default=None):
+		"""
+		Return the cached value for key, or default if no tier holds it.
+		"""
+		entry = self.get_entry(key)
+		return default if entry is None else entry[1]
+
+	async def get_async(self, key, default=None):
+		"""get() for coroutines; blocking tiers run on the executor."""
+		entry = await self.get_entry_async(key)
+		return default if entry is None else entry[1]
+
+	def set(self, key, value, ttl=None):
+		"""Store value under key in every tier for ttl seconds."""
+		ttl = self.default_ttl if ttl is None else ttl
+		for tier in self.tiers:
+			tier.set(key, value, ttl)
+
+	async def set_async(self, key, value, ttl=None):
+		"""set() for coroutines; blocking tiers run on the executor."""
+		ttl = self.default_ttl if ttl is None else ttl
+		for tier in self.tiers:
+			await self._call(tier, tier.set, key, value, ttl)
+
+	def delete(self, key):
+		"""Remove key from every tier."""
+		for tier in self.tiers:
+			tier.delete(key)
+
+	def clear(self):
+		"""Remove every entry from every tier."""
+		for tier in self.tiers:
+			tier.clear()
+
+
+# Process-wide cache shared by the HTML routes and the JSON API
+location_cache = TieredCache([TTLCache()])
+
+
+def enable_disk_cache(path, max_bytes=None):
+	"""
+	Add a persistent SQLite tier below the in-memory location cache.
+
+	Safe to call once per process; later calls are ignored.
+
+	Args:
+		path (str): SQLite database file shared by all worker processes
+		max_bytes (int, optional): Size bound for the disk tier
+	"""
+	from route_logic.disk_cache import DiskCache, DEFAULT_MAX_BYTES
+
+	if any(isinstance(tier, DiskCache) for tier in location_cache.tiers):
+		return
+
+	location_cache.add_tier(
+			DiskCache(path, max_bytes or DEFAULT_MAX_BYTES)
+	)
+
+
+def enable_shared_cache(path, slots=None):
+	"""
+	Replace the per-process memory tier with a shared-memory tier.
+
+	Every worker process maps the same table, so an entry fetched by one
+	worker serves all of them and memory stays flat as workers are added.
+	Falls back to the per-process tier on platforms without fcntl.
+
+	Args:
+		path (str): Backing file, preferably on tmpfs (e.g. /dev/shm)
+		slots (int, optional): Number of fixed-size records in the table
+
+	Returns:
+		bool: True if the shared tier is active
+	"""
+	from route_logic.shared_cache import SharedMemoryCache, DEFAULT_SLOTS
+
+	if any(isinstance(tier, SharedMemoryCache) for tier in location_cache.tiers):
+		return True
+
+	try:
+		shared = SharedMemoryCache(path, slots or DEFAULT_SLOTS)
+	except (OSError, RuntimeError) as err:
+		logger.warning(f"Shared memory cache unavailable, using per-process cache: {err}")
+		return False
+
+	location_cache.tiers = [
+		tier for tier in location_cache.tiers if not isinstance(tier, TTLCache)
+	]
+	location_cache.tiers.insert(0, shared)
+	return True
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+from route_logic.cache import SPATIAL_RESOLUTIONS
+
+# Most recently used keys tracked individually; older keys are dropped from
+# the per-key table but still count towards the per-type totals
+MAX_TRACKED_KEYS = 1000
+
+
+def _rates(hits, misses):
+	lookups = hits + misses
+	return {
+		"hits":     hits, "misses": misses, "lookups": lookups,
+		"hit_rate": hits / lookups if lookups else None
+	}
+
+
+class CacheStats:
+	"""
+	Hit/miss counters for location cache lookups, by data type, by spatial
+	resolution and by key.
+
+	The fetch pipeline records every stage lookup, so the hit rate each
+	SPATIAL_RESOLUTIONS setting achieves can be compared against how fresh
+	the data needs to be. Counters are per process and reset on restart.
+	"""
+
+	def __init__(self, max_keys=MAX_TRACKED_KEYS):
+		self.max_keys = max_keys
+		self._lock = threading.Lock()
+		self._by_type = {}
+		self._by_key = OrderedDict()
+
+	def record(self, kind, key, hit):
+		"""Count one lookup of key for data type kind."""
+		index = 0 if hit else 1
+		with self._lock:
+			counts = self._by_type.setdefault(kind, [0, 0])
+			counts[index] += 1
+
+			counts = self._by_key.get(key)
+			if counts is None:
+				counts = self._by_key[key] = [0, 0]
+				if len(self._by_key) > self.max_keys:
+					self._by_key.popitem(last=False)
+			else:
+				self._by_key.move_to_end(key)
+			counts[index] += 1
+
+	def report(self, top=20):
+		"""
+		Summarize the counters.
+
+		Args:
+			top (int): Number of keys to list, most looked up first
+
+		Returns:
+			dict: by_type (with each type's current resolution in degrees),
+				  by_resolution and by_key hit rates
+		"""
+		with self._lock:
+			by_type = {kind: list(counts) for kind, counts in
+			           self._by_type.items()}
+			by_key = [(key, list(counts)) for key, counts in
+			          self._by_key.items()]
+
+		by_resolution = {}
+		for kind, (hits, misses) in by_type.items():
+			resolution = str(SPATIAL_RESOLUTIONS.get(kind))
+			totals = by_resolution.setdefault(resolution, [0, 0])
+			totals[0] += hits
+			totals[1] += misses
+
+		by_key.sort(key=lambda item: sum(item[1]), reverse=True)
+		return {
+			"by_type":       {
+				kind: dict(
+						_rates(*counts),
+						resolution=SPATIAL_RESOLUTIONS.get(kind)
+				) for kind, counts in by_type.items()
+			},
+			"by_resolution": {
+				resolution: _rates(*counts) for resolution, counts in
+				by_resolution.items()
+			},
+			"by_key":        [
+				dict(_rates(*counts), key=key) for key, counts in by_key[:top]
+			],
+		}
+
+	def reset(self):
+		with self._lock:
+			self._by_type.clear()
+			self._by_key.clear()
+
+
+# Counters fed by the fetch pipeline
+cache_stats = CacheStats()
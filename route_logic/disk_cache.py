@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default upper bound on the total size of cached values (64 MB)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# How often (in writes) to check the size bound and purge expired rows
+EVICTION_CHECK_INTERVAL = 50
+
+# Milliseconds a writer waits for another process's lock before giving up
+BUSY_TIMEOUT_MS = 5000
+
+# Seconds between accessed_at updates for an entry. Reads of entries
+# touched more recently write nothing, so hot entries do not turn every
+# read into a write; eviction order is only this coarse.
+ACCESS_UPDATE_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+	key TEXT PRIMARY KEY,
+	value TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	expires_at REAL NOT NULL,
+	accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at);
+"""
+
+
+class DiskCache:
+	"""
+	Persistent SQLite cache for upstream payloads and LLM output.
+
+	Sits below the in-memory TTLCache so that restarted or newly spawned
+	gunicorn workers start warm instead of hitting NIWA, OpenWeatherMap and
+	Ollama all at once. The database runs in WAL mode with a busy timeout,
+	which makes it safe to share between worker processes: readers never
+	block, and writers serialize on SQLite's own file lock.
+
+	Values must be JSON-serializable; tuples come back as lists. Calls may
+	wait up to BUSY_TIMEOUT_MS on another process's lock, so the tier is
+	marked blocking and coroutines reach it through TieredCache's async
+	methods, off the event loop.
+
+	Args:
+		path (str): SQLite database file, created if missing
+		max_bytes (int): Size bound; least recently read entries are evicted
+						 once the total size of stored values exceeds it
+	"""
+
+	blocking = True
+
+	def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+		self.path = path
+		self.max_bytes = max_bytes
+		self._local = threading.local()
+		self._writes = 0
+		self._writes_lock = threading.Lock()
+
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		self._connect().executescript(SCHEMA)
+
+	def _connect(self):
+		"""Return this thread's connection, opening it on first use."""
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			conn = sqlite3.connect(
+					self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+					isolation_level=None, check_same_thread=False
+			)
+			conn.execute("PRAGMA journal_mode=WAL")
+			conn.execute("PRAGMA synchronous=NORMAL")
+			conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+			self._local.conn = conn
+		return conn
+
+	def get_entry(self, key):
+		"""
+		Return (expires_at, value) for key, or None if missing or expired.
+		"""
+		now = time.time()
+		try:
+			conn = self._connect()
+			row = conn.execute(
+					"SELECT value, expires_at, accessed_at FROM cache_entries "
+					"WHERE key = ?", (key,)
+			).fetchone()
+			if row is None:
+				return None
+
+			value, expires_at, accessed_at = row
+			if expires_at <= now:
+				conn.execute(
+						"DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?",
+						(key, now)
+				)
+				return None
+
+			if now - accessed_at >= ACCESS_UPDATE_INTERVAL:
+				conn.execute(
+						"UPDATE cache_entries SET accessed_at = ? WHERE key = ?",
+						(now, key)
+				)
+			return expires_at, json.loads(value)
+		except (sqlite3.Error, ValueError) as err:
+			logger.error(f"Disk cache read failed for {key}: {err}")
+			return None
+
+	def get(self, key, default=None):
+		"""Return the cached value for key, or default if missing or expired."""
+		entry = self.get_entry(key)
+		return default if entry is None else entry[1]
+
+	def set(self, key, value, ttl):
+		"""Store value under key for ttl seconds."""
+		now = time.time()
+		try:
+			encoded = json.dumps(value, separators=(',', ':'))
+			self._connect().execute(
+					"INSERT OR REPLACE INTO cache_entries "
+					"(key, value, size, expires_at, accessed_at) "
+					"VALUES (?, ?, ?, ?, ?)",
+					(key, encoded, len(encoded), now + ttl, now)
+			)
+		except (sqlite3.Error, TypeError, ValueError) as err:
+			logger.error(f"Disk cache write failed for {key}: {err}")
+			return
+
+		with self._writes_lock:
+			self._writes += 1
+			check = self._writes % EVICTION_CHECK_INTERVAL == 0
+		if check:
+			self.evict()
+
+	def delete(self, key):
+		"""Remove key from the cache if present."""
+		try:
+			self._connect().execute(
+					"DELETE FROM cache_entries WHERE key = ?", (key,)
+			)
+		except sqlite3.Error as err:
+			logger.error(f"Disk cache delete failed for {key}: {err}")
+
+	def clear(self):
+		"""Remove every entry from the cache."""
+		try:
+			self._connect().execute("DELETE FROM cache_entries")
+		except sqlite3.Error as err:
+			logger.error(f"Disk cache clear failed: {err}")
+
+	def evict(self):
+		"""
+		Purge expired entries, then drop least recently read entries until
+		the stored size is within max_bytes.
+		"""
+		try:
+			conn = self._connect()
+			conn.execute(
+					"DELETE FROM cache_entries WHERE expires_at <= ?",
+					(time.time(),)
+			)
+			total = conn.execute(
+					"SELECT COALESCE(SUM(size), 0) FROM cache_entries"
+			).fetchone()[0]
+			if total <= self.max_bytes:
+				return
+
+			excess = total - self.max_bytes
+			freed = 0
+			stale_keys = []
+			for key, size in conn.execute(
+					"SELECT key, size FROM cache_entries ORDER BY accessed_at"
+			):
+				stale_keys.append((key,))
+				freed += size
+				if freed >= excess:
+					break
+			conn.executemany(
+					"DELETE FROM cache_entries WHERE key = ?", stale_keys
+			)
+		except sqlite3.Error as err:
+			logger.error(f"Disk cache eviction failed: {err}")
+
+	def items(self, prefix=""):
+		"""
+		Yield (key, value, expires_at) for stored entries whose key starts
+		with prefix, including expired entries not yet purged.
+		"""
+		try:
+			rows = self._connect().execute(
+					"SELECT key, value, expires_at FROM cache_entries "
+					"WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+			).fetchall()
+		except sqlite3.Error as err:
+			logger.error(f"Disk cache scan failed: {err}")
+			return
+
+		for key, value, expires_at in rows:
+			try:
+				yield key, json.loads(value), expires_at
+			except ValueError:
+				continue
+
+	def __len__(self):
+		return self._connect().execute(
+				"SELECT COUNT(*) FROM cache_entries WHERE expires_at > ?",
+				(time.time(),)
+		).fetchone()[0]
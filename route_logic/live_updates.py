@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import queue
+import threading
+
+import aiohttp
+
+from route_logic.advice_worker import PRIORITY_WARMING
+from route_logic.cache import get_location_key
+from route_logic.pipeline import DEFAULT_BUDGET, FetchPipeline
+
+logger = logging.getLogger(__name__)
+
+# Context fields pushed to open pages
+LIVE_FIELDS = (
+	"uv_index", "advice", "robot_advice", "cloud_index", "location_name",
+	"weather_main", "weather_description", "weather_icon", "is_nighttime",
+	"uv_source"
+)
+
+# Seconds between background refreshes of every subscribed location
+DEFAULT_REFRESH_INTERVAL = 60
+
+# Events buffered per subscriber before it is resynced with a snapshot
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Open streams per process. Under WSGI each one holds a server thread.
+DEFAULT_MAX_SUBSCRIBERS = 64
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_UPDATE = "update"
+
+
+class SubscriberLimitReached(Exception):
+	"""Raised when subscribing while max_subscribers streams are open."""
+
+
+class Subscription:
+	"""
+	One open page listening for updates to a location cell.
+
+	Events are (event, data) tuples: a full EVENT_SNAPSHOT first, then
+	EVENT_UPDATE deltas holding only the fields that changed.
+	"""
+
+	def __init__(self, lat, lon):
+		self.lat = lat
+		self.lon = lon
+		self.key = get_location_key(lat, lon)
+		self.has_snapshot = False
+		self._events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+		# Set by get_async(): the loop to wake when an event is delivered
+		self._loop = None
+		self._ready = None
+
+	def get(self, timeout=None):
+		"""Return the next event, or None if none arrives within timeout."""
+		try:
+			return self._events.get(timeout=timeout)
+		except queue.Empty:
+			return None
+
+	async def get_async(self, timeout=None):
+		"""
+		get() for coroutines: waits on the event loop instead of blocking a
+		thread. Use either get() or get_async() for one subscription.
+		"""
+		if self._ready is None:
+			self._ready = asyncio.Event()
+			self._loop = asyncio.get_running_loop()
+		deadline = None if timeout is None else self._loop.time() + timeout
+		while True:
+			self._ready.clear()
+			try:
+				return self._events.get_nowait()
+			except queue.Empty:
+				pass
+			remaining = None if deadline is None else deadline - self._loop.time()
+			if remaining is not None and remaining <= 0:
+				return None
+			try:
+				await asyncio.wait_for(self._ready.wait(), remaining)
+			except asyncio.TimeoutError:
+				return None
+
+	def _deliver(self, event, data, snapshot):
+		try:
+			self._events.put_nowait((event, data))
+		except queue.Full:
+			# A subscriber this far behind only needs the latest state
+			self._drain()
+			self._events.put_nowait((EVENT_SNAPSHOT, snapshot))
+		if self._loop is not None:
+			try:
+				self._loop.call_soon_threadsafe(self._ready.set)
+			except RuntimeError:
+				# The stream's event loop has closed
+				pass
+
+	def _drain(self):
+		while True:
+			try:
+				self._events.get_nowait()
+			except queue.Empty:
+				return
+
+
+class LocationUpdates:
+	"""
+	Publish/subscribe hub pushing location data changes to open pages.
+
+	Subscribers are grouped by location cell (the location cache key), so
+	one fetch fans out to every page showing that cell. While a cell has
+	subscribers a background thread re-runs the FetchPipeline for it every
+	refresh_interval seconds at warming priority; stages still fresh in the
+	location cache cost nothing, and subscribers only hear about fields that
+	actually changed. Pipelines run for page requests publish here too.
+
+	Subscribers are per process; every worker process refreshes the cells
+	its own subscribers watch, sharing fetched data through the location
+	cache. A synchronous /events stream blocks a server thread for as long
+	as the page stays open, so subscribe() refuses new subscribers once
+	max_subscribers are open rather than let streams take every thread.
+
+	Usage:
+		subscription = location_updates.subscribe(lat, lon)
+		event, data = subscription.get(timeout=15)
+		location_updates.unsubscribe(subscription)
+	"""
+
+	def __init__(
+			self, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+			budget=DEFAULT_BUDGET, max_subscribers=DEFAULT_MAX_SUBSCRIBERS
+			):
+		self.refresh_interval = refresh_interval
+		self.budget = budget
+		self.max_subscribers = max_subscribers
+		self._lock = threading.Lock()
+		self._subscribers = {}
+		self._snapshots = {}
+		self._wake = threading.Event()
+		self._thread = None
+
+	def configure(
+			self, refresh_interval, budget,
+			max_subscribers=DEFAULT_MAX_SUBSCRIBERS
+			):
+		self.refresh_interval = refresh_interval
+		self.budget = budget
+		self.max_subscribers = max_subscribers
+
+	def subscribe(self, lat, lon):
+		"""
+		Register a subscriber for the cell containing lat/lon. If the cell
+		already has data, the subscriber receives it as its first snapshot.
+
+		Raises:
+			SubscriberLimitReached: If max_subscribers are already open
+		"""
+		subscription = Subscription(lat, lon)
+		with self._lock:
+			open_count = sum(map(len, self._subscribers.values()))
+			if open_count >= self.max_subscribers:
+				raise SubscriberLimitReached(
+						f"{open_count} live update streams are open"
+				)
+			self._subscribers.setdefault(subscription.key, set()).add(
+					subscription
+			)
+			snapshot = self._snapshots.get(subscription.key)
+			if snapshot is not None:
+				subscription.has_snapshot = True
+				subscription._deliver(EVENT_SNAPSHOT, snapshot, snapshot)
+		self._ensure_refresher()
+		return subscription
+
+	def unsubscribe(self, subscription):
+		with self._lock:
+			subscribers = self._subscribers.get(subscription.key)
+			if subscribers is None:
+				return
+			subscribers.discard(subscription)
+			if not subscribers:
+				del self._subscribers[subscription.key]
+				self._snapshots.pop(subscription.key, None)
+
+	def subscriber_count(self, lat=None, lon=None):
+		"""Subscribers of one cell, or of every cell when lat/lon are None."""
+		with self._lock:
+			if lat is None or lon is None:
+				return sum(map(len, self._subscribers.values()))
+			return len(self._subscribers.get(get_location_key(lat, lon), ()))
+
+	def snapshot(self, lat, lon):
+		"""Latest snapshot sent for the cell of lat/lon, or None."""
+		with self._lock:
+			snapshot = self._snapshots.get(get_location_key(lat, lon))
+		return None if snapshot is None else dict(snapshot)
+
+	def publish(self, lat, lon, context, complete=True):
+		"""
+		Send the changes in context to the cell's subscribers.
+
+		Subscribers that have no snapshot yet always receive one, so a new
+		page shows the location even at night or while an upstream is down.
+		Results with timed-out or failed stages (complete=False) are not
+		sent as updates and do not replace the last complete snapshot, so a
+		transient upstream failure does not blank open pages.
+
+		Returns:
+			int: Number of subscribers notified
+		"""
+		key = get_location_key(lat, lon)
+		snapshot = {field: context.get(field) for field in LIVE_FIELDS}
+		with self._lock:
+			subscribers = self._subscribers.get(key)
+			if not subscribers:
+				return 0
+
+			previous = self._snapshots.get(key)
+			if complete or previous is None:
+				self._snapshots[key] = snapshot
+			else:
+				snapshot = previous
+			delta = {
+				field: value for field, value in snapshot.items() if
+				(previous or {}).get(field) != value
+			} if complete else {}
+
+			notified = 0
+			for subscription in subscribers:
+				if not subscription.has_snapshot:
+					subscription.has_snapshot = True
+					subscription._deliver(EVENT_SNAPSHOT, snapshot, snapshot)
+				elif delta:
+					subscription._deliver(EVENT_UPDATE, delta, snapshot)
+				else:
+					continue
+				notified += 1
+			return notified
+
+	def _ensure_refresher(self):
+		with self._lock:
+			if self._thread is not None and self._thread.is_alive():
+				return
+			self._thread = threading.Thread(
+					target=self._refresh_loop, name="location-updates",
+					daemon=True
+			)
+			self._thread.start()
+
+	def _refresh_loop(self):
+		while True:
+			self._wake.wait(self.refresh_interval)
+			self._wake.clear()
+
+			with self._lock:
+				cells = [next(iter(subscribers)) for subscribers in
+				         self._subscribers.values() if subscribers]
+			if not cells:
+				continue
+
+			try:
+				asyncio.run(self._refresh(cells))
+			except Exception as err:
+				logger.error(f"Live update refresh failed: {err}")
+
+	async def _refresh(self, cells):
+		timeout = aiohttp.ClientTimeout(total=self.budget)
+		async with aiohttp.ClientSession(timeout=timeout) as session:
+			results = await asyncio.gather(
+					*(FetchPipeline(
+							cell.lat, cell.lon, budget=self.budget,
+							session=session, priority=PRIORITY_WARMING
+					).run() for cell in cells), return_exceptions=True
+			)
+		for cell, result in zip(cells, results):
+			if isinstance(result, Exception):
+				logger.error(
+						f"Live update fetch for {cell.key} failed: {result}"
+				)
+				continue
+			self.publish(cell.lat, cell.lon, result.context, result.complete)
+
+	def refresh_now(self):
+		"""Wake the refresher immediately instead of at the next interval."""
+		self._wake.set()
+
+
+# Hub used by the page routes, configured by create_app()
+location_updates = LocationUpdates()
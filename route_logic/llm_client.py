@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Defaults match the settings documented in the README
+DEFAULT_BASE_URL = "http://localhost:11434"
+DEFAULT_MODEL = "openhermes"
+
+# How long Ollama keeps the model loaded after the last request
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Upper bound on generated tokens; the three advice lines fit well within it
+DEFAULT_NUM_PREDICT = 160
+
+# Prompt sent with the system prompt at warm-up; its reply is discarded
+PRIMING_PROMPT = "Reply with OK."
+
+
+class OllamaClient:
+	"""
+	Client for Ollama's /api/generate endpoint tuned for repeated short calls.
+
+	- warm_up() loads the model ahead of the first request and evaluates the
+	  system prompt once
+	- every request sends the same system prompt ahead of its own prompt, so
+	  Ollama reuses the evaluated system prompt from its prompt cache instead
+	  of re-evaluating the long few-shot examples on every call
+	- every request sets keep_alive so the model (and with it that cache) is
+	  not unloaded while idle, and num_predict to cap output length
+
+	The client works the same without a warm-up; the first call then pays
+	for loading the model.
+
+	Args:
+		system (str): System prompt shared by every request
+		base_url (str): Ollama server URL
+		model (str): Ollama model name
+		keep_alive (str): Ollama keep_alive duration, e.g. "30m"
+		num_predict (int): Maximum tokens to generate per call
+		temperature (float): Sampling temperature
+	"""
+
+	def __init__(
+			self, system, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL,
+			keep_alive=DEFAULT_KEEP_ALIVE, num_predict=DEFAULT_NUM_PREDICT,
+			temperature=0.2
+			):
+		self.system = system
+		self.base_url = base_url.rstrip("/")
+		self.model = model
+		self.keep_alive = keep_alive
+		self.num_predict = num_predict
+		self.temperature = temperature
+		self._warm = False
+		self._warm_lock = threading.Lock()
+
+	@classmethod
+	def from_env(cls, system):
+		"""Build a client from OLLAMA_* environment variables."""
+		return cls(
+				system, base_url=os.getenv("OLLAMA_BASE_URL", DEFAULT_BASE_URL),
+				model=os.getenv("OLLAMA_MODEL", DEFAULT_MODEL),
+				keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE),
+				num_predict=int(
+						os.getenv("OLLAMA_NUM_PREDICT", DEFAULT_NUM_PREDICT)
+				)
+		)
+
+	@property
+	def generate_url(self):
+		return f"{self.base_url}/api/generate"
+
+	@property
+	def is_warm(self):
+		"""True once warm_up() has loaded the model."""
+		return self._warm
+
+	def build_payload(self, prompt, num_predict=None, **extra):
+		"""Build a /api/generate payload for prompt under the system prompt."""
+		payload = {
+			"model":      self.model, "system": self.system, "prompt": prompt,
+			"stream":     False, "keep_alive": self.keep_alive, "options": {
+				"temperature": self.temperature,
+				"num_predict": num_predict or self.num_predict,
+			}
+		}
+		payload.update(extra)
+		return payload
+
+	def _priming_payload(self):
+		return {
+			"model":      self.model, "system": self.system,
+			"prompt":     PRIMING_PROMPT, "stream": False,
+			"keep_alive": self.keep_alive,
+			"options":    {"temperature": 0, "num_predict": 1}
+		}
+
+	async def generate(self, prompt, session):
+		"""
+		Generate a completion for prompt.
+
+		Args:
+			prompt (str): Per-request prompt
+			session (aiohttp.ClientSession): Session to send the request on
+
+		Returns:
+			str: Model response text
+
+		Raises:
+			aiohttp.ClientError, asyncio.TimeoutError, ValueError: As raised
+				by the HTTP request or JSON decoding
+		"""
+		async with session.post(
+				self.generate_url, json=self.build_payload(prompt)
+		) as response:
+			response.raise_for_status()
+			data = await response.json()
+			return data.get('response', 'No advice returned.')
+
+	async def generate_json(self, prompt, session, is_complete):
+		"""
+		Generate a JSON object for prompt, stopping as soon as it is complete.
+
+		Uses Ollama's JSON format mode with streaming. After each chunk that
+		could close the object the partial output is parsed, and once
+		is_complete accepts it the stream is closed, which makes Ollama stop
+		generating instead of padding up to num_predict.
+
+		Args:
+			prompt (str): Per-request prompt
+			session (aiohttp.ClientSession): Session to send the request on
+			is_complete (callable): Returns True for a parsed object that has
+									every required field
+
+		Returns:
+			dict: The parsed object
+
+		Raises:
+			ValueError: If the model output is not a JSON object
+			aiohttp.ClientError, asyncio.TimeoutError: As raised by the request
+		"""
+		payload = self.build_payload(prompt, stream=True, format="json")
+		buffer = ""
+		async with session.post(self.generate_url, json=payload) as response:
+			response.raise_for_status()
+			async for line in response.content:
+				if not line.strip():
+					continue
+				chunk = json.loads(line)
+				token = chunk.get("response", "")
+				buffer += token
+
+				if "}" in token or chunk.get("done"):
+					try:
+						parsed = json.loads(buffer)
+					except ValueError:
+						parsed = None
+					if isinstance(parsed, dict) and (
+							is_complete(parsed) or chunk.get("done")):
+						return parsed
+
+				if chunk.get("done"):
+					break
+
+		raise ValueError("LLM output was not a JSON object")
+
+	def generate_sync(self, prompt, timeout=20):
+		"""Blocking variant of generate() using requests."""
+		import requests
+
+		response = requests.post(
+				self.generate_url, json=self.build_payload(prompt),
+				timeout=timeout
+		)
+		response.raise_for_status()
+		data = response.json()
+		return data.get('response', 'No advice returned.')
+
+	def warm_up(self, timeout=120):
+		"""
+		Load the model and evaluate the system prompt once.
+
+		Blocking; intended to run on a background thread at app startup.
+		Model load can take a while on first start, hence the long timeout.
+
+		Returns:
+			bool: True if the model is loaded
+		"""
+		import requests
+
+		with self._warm_lock:
+			if self._warm:
+				return True
+			try:
+				response = requests.post(
+						self.generate_url, json=self._priming_payload(),
+						timeout=timeout
+				)
+				response.raise_for_status()
+			except requests.exceptions.RequestException as e:
+				logger.warning(f"LLM warm-up failed: {e}")
+				return False
+
+			self._warm = True
+			logger.info(f"LLM model {self.model} warmed up")
+			return True
+
+	def warm_up_in_background(self):
+		"""Start warm_up() on a daemon thread and return immediately."""
+		thread = threading.Thread(
+				target=self.warm_up, name="llm-warm-up", daemon=True
+		)
+		thread.start()
+		return thread
+
+	def reset(self):
+		"""Warm up again on the next warm_up(), e.g. after a model change."""
+		self._warm = False
@@ -0,0 +1,90 @@
+import asyncio
+
+import aiohttp
+
+from route_logic.cache import get_location_key
+from route_logic.pipeline import CONTEXT_FIELDS, DEFAULT_BUDGET, \
+	FetchPipeline, default_context
+
+# Maximum number of locations fetched from the upstream APIs at once
+MAX_CONCURRENT_FETCHES = 5
+
+
+async def get_location_advice(
+		lat, lon, session=None, budget=DEFAULT_BUDGET, fields=CONTEXT_FIELDS
+		):
+	"""
+	Build the UV, weather and advice context for a single location.
+
+	Args:
+		lat (float): Latitude coordinate
+		lon (float): Longitude coordinate
+		session (aiohttp.ClientSession, optional): Existing aiohttp session.
+												   If None, creates a new one.
+		budget (float): Total time budget in seconds
+		fields (tuple): Context fields the caller needs; stages feeding only
+						other fields are skipped
+
+	Returns:
+		dict: Context with the same keys as the home page template
+	"""
+	result = await FetchPipeline(
+			lat, lon, budget, session, fields=fields
+	).run()
+	return result.context
+
+
+async def get_multiple_location_advice(
+		locations, concurrent_limit=MAX_CONCURRENT_FETCHES,
+		budget=DEFAULT_BUDGET, fields=CONTEXT_FIELDS
+		):
+	"""
+	Build advice contexts for several locations concurrently.
+
+	Duplicate coordinates (after cache-key rounding) are fetched once and the
+	result is shared between every position that asked for them. All
+	locations share one time budget.
+
+	Args:
+		locations (list): List of (lat, lon) tuples
+		concurrent_limit (int): Maximum number of concurrent location fetches
+		budget (float): Total time budget in seconds for the whole batch
+		fields (tuple): Context fields the caller needs (see
+						get_location_advice)
+
+	Returns:
+		list: One context dict per input location, in the same order
+	"""
+	semaphore = asyncio.Semaphore(concurrent_limit)
+	unique = {}
+	for lat, lon in locations:
+		unique.setdefault(get_location_key(lat, lon), (lat, lon))
+
+	loop = asyncio.get_running_loop()
+	deadline = loop.time() + budget
+
+	async def fetch_location(session, lat, lon):
+		async with semaphore:
+			remaining = max(0.0, deadline - loop.time())
+			return await get_location_advice(
+					lat, lon, session, remaining, fields
+			)
+
+	timeout = aiohttp.ClientTimeout(total=budget)
+	async with aiohttp.ClientSession(timeout=timeout) as session:
+		keys = list(unique)
+		results = await asyncio.gather(
+				*(fetch_location(session, *unique[key]) for key in keys),
+				return_exceptions=True
+		)
+
+	by_key = {}
+	for key, result in zip(keys, results):
+		if isinstance(result, Exception):
+			result = default_context()
+			result[
+				"advice"] = "Could not fetch weather data. Please try again later."
+		by_key[key] = result
+
+	return [dict(by_key[get_location_key(lat, lon)]) for lat, lon in
+	        locations]
@@ -0,0 +1,283 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+# Correlation ID of the request being served. Set by the app for every
+# request; asyncio tasks and advice jobs started from the request inherit it.
+request_id = contextvars.ContextVar("request_id", default=None)
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# Number of recent enqueue/write timings kept for the stats
+TIMING_WINDOW = 1024
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+	"message", "asctime", "request_id"
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def parse_levels(spec):
+	"""
+	Parse per-module levels, e.g. "route_logic.bot_advice=DEBUG,werkzeug=WARNING".
+
+	Returns:
+		dict: Logger name -> level name
+	"""
+	levels = {}
+	for item in (spec or "").split(","):
+		name, _, level = item.partition("=")
+		if name.strip() and level.strip():
+			levels[name.strip()] = level.strip().upper()
+	return levels
+
+
+class JsonFormatter(logging.Formatter):
+	"""
+	One JSON object per line: ts, level, logger, message, request_id, any
+	fields passed with extra=, and the formatted traceback if there is one.
+	"""
+
+	def format(self, record):
+		entry = {
+			"ts":      time.strftime(
+					"%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)
+			) + f".{int(record.msecs):03d}Z",
+			"level":   record.levelname,
+			"logger":  record.name,
+			"message": record.getMessage(),
+		}
+		if getattr(record, "request_id", None):
+			entry["request_id"] = record.request_id
+		for key, value in vars(record).items():
+			if key not in _RECORD_ATTRS:
+				entry[key] = value
+		if record.exc_info:
+			entry["exc_info"] = self.formatException(record.exc_info)
+		if record.stack_info:
+			entry["stack_info"] = self.formatStack(record.stack_info)
+		return json.dumps(entry, default=str)
+
+
+class LoggingStats:
+	"""
+	Counters and timings for the logging pipeline: time spent on the calling
+	thread per record (enqueue) and on the listener thread (write).
+	"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._enqueue_times = deque(maxlen=TIMING_WINDOW)
+		self._write_times = deque(maxlen=TIMING_WINDOW)
+		self._counts = dict.fromkeys(
+				("enqueued", "written", "dropped", "sampled_out"), 0
+		)
+
+	def count(self, outcome):
+		with self._lock:
+			self._counts[outcome] += 1
+
+	def enqueued(self, seconds):
+		with self._lock:
+			self._counts["enqueued"] += 1
+			self._enqueue_times.append(seconds)
+
+	def written(self, seconds):
+		with self._lock:
+			self._counts["written"] += 1
+			self._write_times.append(seconds)
+
+	def snapshot(self):
+		with self._lock:
+			stats = dict(self._counts)
+			enqueue_times = list(self._enqueue_times)
+			write_times = list(self._write_times)
+
+		for name, times in (("enqueue", enqueue_times), ("write", write_times)):
+			stats[f"{name}_mean_us"] = (
+					sum(times) / len(times) * 1e6 if times else 0.0)
+			stats[f"{name}_max_us"] = max(times, default=0.0) * 1e6
+		return stats
+
+
+class RequestIdFilter(logging.Filter):
+	"""Stamp records with the current request_id on the calling thread."""
+
+	def filter(self, record):
+		record.request_id = request_id.get()
+		return True
+
+
+class DebugSampler(logging.Filter):
+	"""
+	Let through a fraction (rate) of DEBUG records, so verbose modules can be
+	left at DEBUG under load. INFO and above always pass.
+	"""
+
+	def __init__(self, rate, stats):
+		super().__init__()
+		self.rate = rate
+		self.stats = stats
+
+	def filter(self, record):
+		if record.levelno > logging.DEBUG or self.rate >= 1:
+			return True
+		if random.random() < self.rate:
+			return True
+		self.stats.count("sampled_out")
+		return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+	"""
+	QueueHandler that never blocks the caller: a full queue drops the record
+	(counted in the stats), and formatting is left to the listener thread.
+	"""
+
+	def __init__(self, log_queue, stats):
+		super().__init__(log_queue)
+		self.stats = stats
+
+	def prepare(self, record):
+		# Merge the arguments now, since they may change after we return;
+		# exc_info is kept and formatted on the listener thread
+		record = copy.copy(record)
+		record.msg = record.getMessage()
+		record.args = None
+		return record
+
+	def emit(self, record):
+		started = time.perf_counter()
+		try:
+			self.queue.put_nowait(self.prepare(record))
+		except queue.Full:
+			self.stats.count("dropped")
+			return
+		except Exception:
+			self.handleError(record)
+			return
+		self.stats.enqueued(time.perf_counter() - started)
+
+
+class _TimedListener(logging.handlers.QueueListener):
+
+	def __init__(self, log_queue, handler, stats):
+		super().__init__(log_queue, handler, respect_handler_level=True)
+		self.stats = stats
+
+	def handle(self, record):
+		started = time.perf_counter()
+		super().handle(record)
+		self.stats.written(time.perf_counter() - started)
+
+
+class StructuredLogging:
+	"""
+	Process-wide logging set up so that request threads and event loops only
+	pay for putting a record on a queue.
+
+	configure() replaces the root handlers with a NonBlockingQueueHandler.
+	One background listener thread formats records (JSON lines by default)
+	and writes them to the stream. Records carry the request_id of the
+	request that logged them, DEBUG records can be sampled, and levels are
+	set per module through standard logger names.
+
+	Usage:
+		structured_logging.configure("INFO", {"route_logic.bot_advice": "DEBUG"})
+		logger = logging.getLogger(__name__)
+		logger.info("Fetched", extra={"stage": "uv", "seconds": 0.2})
+		structured_logging.stats()
+	"""
+
+	def __init__(self):
+		self._stats = LoggingStats()
+		self._queue = None
+		self._handler = None
+		self._listener = None
+		self._sampler = None
+
+	def configure(
+			self, level="INFO", module_levels=None, fmt="json",
+			debug_sample_rate=1.0, queue_size=DEFAULT_QUEUE_SIZE, stream=None
+			):
+		"""
+		Install the queue handler on the root logger and start the listener.
+		Calling configure() again replaces the previous setup.
+
+		Args:
+			level (str): Root level
+			module_levels (dict): Logger name -> level
+			fmt (str): "json" or "text"
+			debug_sample_rate (float): Fraction of DEBUG records kept
+			queue_size (int): Records that may wait for the listener
+			stream: Output stream, stderr by default
+		"""
+		self.shutdown()
+
+		output = logging.StreamHandler(stream or sys.stderr)
+		if fmt == "json":
+			output.setFormatter(JsonFormatter())
+		else:
+			output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+		self._queue = queue.Queue(maxsize=queue_size)
+		self._sampler = DebugSampler(debug_sample_rate, self._stats)
+		self._handler = NonBlockingQueueHandler(self._queue, self._stats)
+		self._handler.addFilter(RequestIdFilter())
+		self._handler.addFilter(self._sampler)
+
+		root = logging.getLogger()
+		for handler in list(root.handlers):
+			root.removeHandler(handler)
+		root.addHandler(self._handler)
+		root.setLevel(level.upper())
+		for name, module_level in (module_levels or {}).items():
+			logging.getLogger(name).setLevel(module_level)
+
+		self._listener = _TimedListener(self._queue, output, self._stats)
+		self._listener.start()
+
+	def shutdown(self):
+		"""Flush queued records and stop the listener thread."""
+		if self._listener is None:
+			return
+		logging.getLogger().removeHandler(self._handler)
+		self._listener.stop()
+		self._listener = None
+
+	def stats(self):
+		"""
+		Snapshot of the logging metrics.
+
+		Returns:
+			dict: enqueued/written/dropped/sampled_out counters since start,
+				  queue_length, queue_capacity, debug_sample_rate, and mean/max
+				  microseconds per record on the calling thread (enqueue) and
+				  the listener thread (write) over the last TIMING_WINDOW
+				  records
+		"""
+		stats = self._stats.snapshot()
+		stats.update(
+				{
+					"queue_length":      self._queue.qsize() if self._queue else 0,
+					"queue_capacity":    self._queue.maxsize if self._queue else 0,
+					"debug_sample_rate": self._sampler.rate if self._sampler else 1.0,
+				}
+		)
+		return stats
+
+
+# Logging setup used by the app, configured by create_app()
+structured_logging = StructuredLogging()
+atexit.register(structured_logging.shutdown)
@@ -0,0 +1,427 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from route_logic import solar, uv_model
+from route_logic.advice import get_clothing_advice
+from route_logic.advice_table import lookup_precomputed_advice
+from route_logic.advice_worker import PRIORITY_INTERACTIVE, advice_pool
+from route_logic.bot_advice import StructuredAdvice, \
+	get_structured_advice_async
+from route_logic.cache import get_spatial_key, location_cache
+from route_logic.cache_stats import cache_stats
+from route_logic.sharding import shard_router
+from route_logic.uv_service import get_uv_data
+from route_logic.weather_service import FORECAST_TTL, FORECAST_VERSION, \
+	fetch_forecast_async, weather_at
+
+# Default total time budget for one pipeline run in seconds
+DEFAULT_BUDGET = 10.0
+
+# Smallest total timeout for a session the pipeline creates. Stage calls are
+# bounded by the budget anyway; with no budget left none are made, and
+# aiohttp reads total=0 as "no timeout".
+MIN_SESSION_TIMEOUT = 1.0
+
+# How long each stage's result stays cached (seconds). AI advice is keyed on
+# its exact inputs, so it can be reused far longer than the upstream data.
+# The weather stage caches a multi-day forecast, read for the current hour.
+STAGE_TTLS = {
+	"uv":           300,
+	"weather":      FORECAST_TTL,
+	"robot_advice": 6 * 60 * 60,
+}
+
+# Cache key prefixes for stages not keyed under their own name
+STAGE_KEY_PREFIXES = {
+	"weather":      "forecast",
+	"robot_advice": "robot",
+}
+
+# Stage outcomes reported in PipelineResult.stages
+STAGE_FETCHED = "fetched"
+STAGE_CACHED = "cached"
+STAGE_PRECOMPUTED = "precomputed"
+STAGE_ESTIMATED = "estimated"
+STAGE_SKIPPED = "skipped"
+STAGE_TIMEOUT = "timeout"
+STAGE_FAILED = "failed"
+
+# Fields every advice context contains, in the order they are documented
+CONTEXT_FIELDS = (
+	"uv_index", "advice", "cloud_index", "location_name", "weather_main",
+	"weather_description", "weather_icon", "robot_advice", "is_nighttime",
+	"uv_source", "from_cache"
+)
+
+
+def default_context():
+	"""Return the context used when no upstream data could be fetched."""
+	return {
+		"uv_index":            None, "advice": "No data available.",
+		"cloud_index":         None, "location_name": None,
+		"weather_main":        None, "weather_description": None,
+		"weather_icon":        None, "robot_advice": None,
+		"is_nighttime":        False, "uv_source": None,
+		"from_cache":          False
+	}
+
+
+def is_valid_uv(uv_data):
+	"""Check that a get_uv_data result holds at least one UV value."""
+	return bool(uv_data) and (uv_data.get("clear_sky_max") is not None or
+	                          uv_data.get("cloudy_sky_max") is not None)
+
+
+def is_valid_advice(advice):
+	"""Check that get_structured_advice_async produced validated advice."""
+	return advice is not None
+
+
+def is_valid_forecast(forecast):
+	"""Check that fetch_forecast_async produced a forecast with steps."""
+	return isinstance(forecast, dict) and (forecast.get("v") == FORECAST_VERSION
+	                                       and bool(forecast.get("hours")))
+
+
+@dataclass
+class PipelineResult:
+	"""
+	Outcome of a FetchPipeline run.
+
+	Attributes:
+		context (dict): Template context with the keys in CONTEXT_FIELDS
+		stages (dict): Stage name -> one of the STAGE_* outcomes
+		durations (dict): Stage name -> seconds spent waiting on the stage
+		elapsed (float): Total wall-clock seconds for the run
+		node (str): Shard owner that ran the stages, None for this node
+	"""
+	context: dict
+	stages: dict = field(default_factory=dict)
+	durations: dict = field(default_factory=dict)
+	elapsed: float = 0.0
+	node: str = None
+
+	@property
+	def complete(self):
+		"""True when no stage timed out or failed, so the result can be cached."""
+		return not any(
+				status in (STAGE_TIMEOUT, STAGE_FAILED) for status in
+				self.stages.values()
+		)
+
+	@property
+	def from_cache(self):
+		"""True when every stage that ran was served without an upstream call."""
+		ran = [status for status in self.stages.values() if
+		       status != STAGE_SKIPPED]
+		return bool(ran) and all(
+				status in (STAGE_CACHED, STAGE_PRECOMPUTED, STAGE_ESTIMATED)
+				for status in ran
+		)
+
+
+class FetchPipeline:
+	"""
+	Fetch UV, weather and AI advice for one location within a time budget.
+
+	Independent stages (UV and weather) run concurrently, dependent stages
+	(AI advice) start as soon as their inputs are ready, and every stage
+	runs at most once. Each stage is looked up in the location cache first,
+	keyed on a grid cell sized for that kind of data.
+	When the deadline passes, outstanding stages are abandoned and the
+	result is built from whatever finished, so a slow upstream costs at
+	most the budget rather than multiplying page latency.
+
+	Locations owned by another node (see ShardRouter) are fetched from that
+	node instead, unless forward is False. If the owner cannot be reached
+	the stages run here with the remaining budget.
+
+	Stages whose output the caller does not need are skipped: without
+	"robot_advice" in fields, no table lookup or advice job is made.
+
+	Usage:
+		result = await FetchPipeline(lat, lon, budget=5).run()
+		result.context   # template context
+		result.stages    # {"uv": "cached", "weather": "fetched", ...}
+	"""
+
+	def __init__(
+			self, lat, lon, budget=DEFAULT_BUDGET, session=None,
+			cache=location_cache, priority=PRIORITY_INTERACTIVE, forward=True,
+			fields=CONTEXT_FIELDS
+			):
+		self.lat = lat
+		self.lon = lon
+		self.budget = budget
+		self.session = session
+		self.cache = cache
+		self.priority = priority
+		self.forward = forward
+		self.fields = fields
+		self.stages = {}
+		self.durations = {}
+		self.node = None
+		self._deadline = None
+
+	def cache_key(self, stage):
+		"""
+		Location cache key for a stage, keyed on the stage's spatial grid
+		cell (see SPATIAL_RESOLUTIONS) rather than the exact coordinates.
+		"""
+		prefix = STAGE_KEY_PREFIXES.get(stage, stage)
+		return f"{prefix}:{get_spatial_key(stage, self.lat, self.lon)}"
+
+	def remaining(self):
+		"""Seconds left before the deadline (never negative)."""
+		return max(0.0, self._deadline - time.monotonic())
+
+	async def _stage(self, name, cache_key, fetch, is_valid):
+		"""
+		Run one stage: serve it from cache, or await fetch() within the
+		remaining budget and cache the result if is_valid accepts it.
+
+		Returns:
+			The stage result, or None if it timed out, failed or was invalid
+		"""
+		cached = await self.cache.get_async(cache_key)
+		cache_stats.record(name, cache_key, cached is not None)
+		if cached is not None:
+			self.stages[name] = STAGE_CACHED
+			self.durations[name] = 0.0
+			return cached
+
+		remaining = self.remaining()
+		if remaining <= 0:
+			self.stages[name] = STAGE_TIMEOUT
+			self.durations[name] = 0.0
+			return None
+
+		started = time.monotonic()
+		try:
+			result = await asyncio.wait_for(fetch(), timeout=remaining)
+		except asyncio.TimeoutError:
+			self.stages[name] = STAGE_TIMEOUT
+			result = None
+		except Exception:
+			self.stages[name] = STAGE_FAILED
+			result = None
+		else:
+			if is_valid(result):
+				self.stages[name] = STAGE_FETCHED
+				await self.cache.set_async(cache_key, result, STAGE_TTLS[name])
+			else:
+				self.stages[name] = STAGE_FAILED
+				result = None
+		finally:
+			self.durations[name] = time.monotonic() - started
+
+		return result
+
+	def _skip(self, name):
+		self.stages[name] = STAGE_SKIPPED
+		self.durations[name] = 0.0
+
+	async def run(self):
+		"""
+		Execute the pipeline once.
+
+		Returns:
+			PipelineResult: Context plus per-stage outcomes and timings
+		"""
+		started = time.monotonic()
+		self._deadline = started + self.budget
+
+		# Night is decided locally, so nighttime requests need no upstream calls
+		if solar.is_nighttime(self.lat, self.lon):
+			context = await self._night_context()
+		else:
+			close_session = self.session is None
+			if self.session is None:
+				self.session = aiohttp.ClientSession(
+						timeout=aiohttp.ClientTimeout(
+								total=max(self.budget, MIN_SESSION_TIMEOUT)
+						)
+				)
+
+			try:
+				context = await self._run_remote() if self.forward else None
+				if context is None:
+					context = await self._run_stages()
+			finally:
+				# Only close session if we created it
+				if close_session:
+					await self.session.close()
+					self.session = None
+
+		result = PipelineResult(
+				context=context, stages=dict(self.stages),
+				durations=dict(self.durations),
+				elapsed=time.monotonic() - started, node=self.node
+		)
+		context["from_cache"] = result.from_cache
+		return result
+
+	async def _run_remote(self):
+		"""
+		Fetch the location from its shard owner.
+
+		Returns:
+			dict: The owner's context, or None when this node owns the
+				  location, no budget is left to forward it, or the owner did
+				  not answer in time
+		"""
+		owner = shard_router.owner(self.lat, self.lon)
+		if owner is None:
+			return None
+
+		# Out of time: the local stages serve whatever is cached
+		remaining = self.remaining()
+		if remaining <= 0:
+			return None
+
+		payload = await shard_router.fetch(
+				owner, self.lat, self.lon, remaining, self.session, self.fields
+		)
+		if payload is None:
+			return None
+
+		self.stages.update(payload["stages"])
+		self.durations.update(payload["durations"])
+		self.node = owner
+		return payload["context"]
+
+	async def _night_context(self):
+		"""
+		Build the nighttime context without any upstream call, showing the
+		location and weather only if they are already cached.
+		"""
+		context = default_context()
+		context.update(
+				{
+					"is_nighttime": True,
+					"advice":       "It's nighttime! No UV protection needed.",
+					"robot_advice": "Enjoy your evening! UV levels are not a concern during nighttime hours."
+				}
+		)
+
+		forecast = await self.cache.get_async(self.cache_key("weather"))
+		weather = None if forecast is None else weather_at(forecast)
+		if weather is not None:
+			self.stages["weather"] = STAGE_CACHED
+			self.durations["weather"] = 0.0
+			context.update(
+					{
+						"location_name":       weather.location_name,
+						"weather_main":        weather.weather_main,
+						"weather_description": weather.weather_description,
+						"weather_icon":        weather.weather_icon,
+					}
+			)
+		else:
+			self._skip("weather")
+
+		self._skip("uv")
+		self._skip("robot_advice")
+		return context
+
+	async def _run_stages(self):
+		lat, lon, session = self.lat, self.lon, self.session
+
+		# Where even the clear-sky maximum stays below PREFILTER_MAX_UVI the
+		# advice is "Low UV" whatever NIWA says, so skip the NIWA call
+		prefiltered = uv_model.daily_max_uvi(
+				lat, lon
+		) < uv_model.PREFILTER_MAX_UVI
+		if prefiltered:
+			self.stages["uv"] = STAGE_ESTIMATED
+			self.durations["uv"] = 0.0
+			uv_stage = asyncio.sleep(0, result=None)
+		else:
+			uv_stage = self._stage(
+					"uv", self.cache_key("uv"),
+					lambda: get_uv_data(session, lat, lon), is_valid_uv
+			)
+
+		uv_data, forecast = await asyncio.gather(
+				uv_stage, self._stage(
+						"weather", self.cache_key("weather"),
+						lambda: fetch_forecast_async(lat, lon, session),
+						is_valid_forecast
+				)
+		)
+
+		# Conditions for the current hour, from the cached forecast
+		weather = None if forecast is None else weather_at(forecast)
+
+		context = default_context()
+
+		if weather is None:
+			context[
+				"advice"] = "Could not fetch weather data. Please try again later."
+			self._skip("robot_advice")
+			return context
+
+		context.update(
+				{
+					"cloud_index":         weather.cloud_index,
+					"location_name":       weather.location_name,
+					"weather_main":        weather.weather_main,
+					"weather_description": weather.weather_description,
+					"weather_icon":        weather.weather_icon,
+				}
+		)
+
+		if uv_data is None:
+			# NIWA unavailable or pre-filtered: use the local clear-sky model
+			# with OpenWeatherMap's cloud cover
+			uv_data = uv_model.estimate_uv_data(lat, lon, weather.cloud_index)
+			context["uv_source"] = "estimate"
+		else:
+			context["uv_source"] = "niwa"
+
+		sunny_max = uv_data.get("clear_sky_max")
+		cloudy_max = uv_data.get("cloudy_sky_max")
+		uv_index = cloudy_max if weather.cloud_index >= 50 else sunny_max
+
+		context.update(
+				{
+					"uv_index": uv_index,
+					"advice":   get_clothing_advice(uv_index, weather),
+				}
+		)
+
+		if uv_index is None or "robot_advice" not in self.fields:
+			self._skip("robot_advice")
+			return context
+
+		# The offline table covers most conditions with no inference cost
+		precomputed = lookup_precomputed_advice(
+				uv_index, weather.weather_main, weather.weather_description
+		)
+		if precomputed is not None:
+			self.stages["robot_advice"] = STAGE_PRECOMPUTED
+			self.durations["robot_advice"] = 0.0
+			context["robot_advice"] = precomputed.format()
+			return context
+
+		# Inference runs on the advice workers; timing out here cancels the job
+		robot_advice = await self._stage(
+				"robot_advice",
+				f"{self.cache_key('robot_advice')}:{uv_index}:"
+				f"{weather.weather_main}:{weather.weather_description}",
+				lambda: advice_pool.run(
+						get_structured_advice_async, uv_index, lat, lon,
+						weather.weather_main, weather.weather_description,
+						priority=self.priority, session=session
+				), is_valid_advice
+		)
+
+		# Only validated advice is cached; otherwise show the rule-based advice
+		if robot_advice is not None:
+			context["robot_advice"] = StructuredAdvice(*robot_advice).format()
+		else:
+			context["robot_advice"] = context["advice"]
+		return context
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+import time
+
+from route_logic.cache import get_location_key
+from route_logic.live_updates import location_updates
+from route_logic.pipeline import DEFAULT_BUDGET, FetchPipeline
+
+logger = logging.getLogger(__name__)
+
+# Seconds a finished prefetch stays available to the request that follows it
+PREFETCH_RETENTION = 30
+
+# Extra seconds callers wait beyond the budget for a prefetch to finish
+JOIN_GRACE = 1.0
+
+
+class Prefetcher:
+	"""
+	Starts location fetches in the background ahead of the page that needs
+	them.
+
+	/set_location calls start() as soon as the new coordinates arrive, so
+	the upstream and LLM work overlaps the client's round trip. Fetches for
+	the same location cell are deduplicated: while one is running, or for
+	PREFETCH_RETENTION seconds after it finished, start() and pending()
+	return its future and the following page request joins it instead of
+	fetching again. Finished results are also published to live-update
+	subscribers.
+
+	Fetches run on one background event loop thread, started on first use.
+
+	Usage:
+		future = prefetcher.start(lat, lon)
+		result = prefetcher.join(lat, lon)   # PipelineResult or None
+	"""
+
+	def __init__(self, budget=DEFAULT_BUDGET):
+		self.budget = budget
+		self._lock = threading.Lock()
+		self._fetches = {}
+		self._loop = None
+
+	def configure(self, budget):
+		self.budget = budget
+
+	def _ensure_loop(self):
+		with self._lock:
+			if self._loop is None:
+				self._loop = asyncio.new_event_loop()
+				threading.Thread(
+						target=self._loop.run_forever, name="prefetch",
+						daemon=True
+				).start()
+			return self._loop
+
+	def _expire(self, now):
+		"""Drop finished fetches older than PREFETCH_RETENTION (lock held)."""
+		for key, (future, finished_at) in list(self._fetches.items()):
+			if finished_at is not None and now - finished_at > PREFETCH_RETENTION:
+				del self._fetches[key]
+
+	def start(self, lat, lon):
+		"""
+		Start fetching lat/lon unless a fetch for its cell is running or
+		recently finished.
+
+		Returns:
+			concurrent.futures.Future: Resolves to the PipelineResult
+		"""
+		key = get_location_key(lat, lon)
+		loop = self._ensure_loop()
+		with self._lock:
+			self._expire(time.monotonic())
+			if key in self._fetches:
+				return self._fetches[key][0]
+
+			future = asyncio.run_coroutine_threadsafe(
+					FetchPipeline(lat, lon, budget=self.budget).run(), loop
+			)
+			self._fetches[key] = (future, None)
+
+		future.add_done_callback(
+				lambda done: self._finished(key, lat, lon, done)
+		)
+		return future
+
+	def _finished(self, key, lat, lon, future):
+		with self._lock:
+			if self._fetches.get(key, (None,))[0] is future:
+				self._fetches[key] = (future, time.monotonic())
+
+		if future.cancelled():
+			return
+		error = future.exception()
+		if error is not None:
+			logger.error(f"Prefetch for {key} failed: {error}")
+			return
+		result = future.result()
+		location_updates.publish(lat, lon, result.context, result.complete)
+
+	def pending(self, lat, lon):
+		"""Return the running or recently finished fetch for lat/lon, or None."""
+		with self._lock:
+			self._expire(time.monotonic())
+			entry = self._fetches.get(get_location_key(lat, lon))
+		return None if entry is None else entry[0]
+
+	def join(self, lat, lon, timeout=None):
+		"""
+		Wait for the prefetch of lat/lon.
+
+		Returns:
+			PipelineResult, or None if there is no prefetch, it failed, or it
+			did not finish within timeout (defaults to the budget plus
+			JOIN_GRACE)
+		"""
+		future = self.pending(lat, lon)
+		if future is None:
+			return None
+		if timeout is None:
+			timeout = self.budget + JOIN_GRACE
+		try:
+			return future.result(timeout=timeout)
+		except Exception as err:
+			logger.warning(f"Prefetch not used: {err!r}")
+			return None
+
+	async def join_async(self, lat, lon, timeout=None):
+		"""Coroutine version of join() for callers on an event loop."""
+		future = self.pending(lat, lon)
+		if future is None:
+			return None
+		if timeout is None:
+			timeout = self.budget + JOIN_GRACE
+		try:
+			# Shielded: timing out here must not cancel the shared fetch
+			return await asyncio.wait_for(
+					asyncio.shield(asyncio.wrap_future(future)), timeout
+			)
+		except Exception as err:
+			logger.warning(f"Prefetch not used: {err!r}")
+			return None
+
+
+# Prefetcher used by the page routes, configured by create_app()
+prefetcher = Prefetcher()
@@ -0,0 +1,313 @@
+import bisect
+import hashlib
+import hmac
+import logging
+import threading
+import urllib.error
+import urllib.request
+
+import aiohttp
+
+from route_logic.cache import SPATIAL_RESOLUTIONS, get_spatial_key
+
+logger = logging.getLogger(__name__)
+
+# Points each node gets on the ring; more points spread cells more evenly
+DEFAULT_VNODES = 128
+
+# Internal endpoints every node serves (see app/api/api_routes.py)
+INTERNAL_LOCATION_PATH = "/api/internal/location"
+INTERNAL_HEALTH_PATH = "/api/internal/health"
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+# Seconds between health checks of peer nodes, and the timeout for each
+DEFAULT_HEALTH_INTERVAL = 10
+HEALTH_TIMEOUT = 2
+
+# Share of the caller's remaining budget handed to the owner, leaving the
+# rest for the network round trip
+OWNER_BUDGET_SHARE = 0.9
+
+
+def _hash(value):
+	return int.from_bytes(
+			hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+	)
+
+
+def shard_key(lat, lon):
+	"""
+	Ring key for lat/lon: the coarsest stage cache cell containing it.
+
+	Every stage caches on a grid cell from the same origin, so while each
+	resolution is a multiple of the finer ones (as the defaults are) all
+	stage cells of a location fall inside one shard cell, and each cached
+	UV, weather and advice entry has exactly one owner.
+	"""
+	kind = max(SPATIAL_RESOLUTIONS, key=SPATIAL_RESOLUTIONS.get)
+	return f"{kind}:{get_spatial_key(kind, lat, lon)}"
+
+
+def parse_nodes(spec):
+	"""Split a comma-separated list of node base URLs."""
+	return [node.strip().rstrip("/") for node in (spec or "").split(",") if
+	        node.strip()]
+
+
+class HashRing:
+	"""
+	Consistent hash ring of node base URLs.
+
+	Each node is placed at vnodes points; a key belongs to the first node
+	point at or after the key's hash. Adding or removing a node only moves
+	the keys between its points and their predecessors, about 1/N of all
+	keys, so the other nodes keep their cached cells.
+	"""
+
+	def __init__(self, nodes=(), vnodes=DEFAULT_VNODES):
+		self.nodes = frozenset(nodes)
+		points = sorted(
+				(_hash(f"{node}#{index}"), node) for node in self.nodes for
+				index in range(vnodes)
+		)
+		self._hashes = [point for point, _ in points]
+		self._owners = [node for _, node in points]
+
+	def owner(self, key):
+		"""Node owning key, or None for an empty ring."""
+		if not self._hashes:
+			return None
+		index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+		return self._owners[index]
+
+
+class ShardRouter:
+	"""
+	Assigns shard cells (see shard_key) to app nodes and fetches non-local
+	cells from their owner.
+
+	Every node is configured with the same node list, so all of them build
+	the same ring. The fetch pipeline asks owner() before doing any upstream
+	work. Only the owning node calls NIWA, OpenWeather and the LLM for a
+	cell, keeps it in its caches and refreshes it; the others request the
+	finished result from the owner's internal endpoint. Upstream traffic
+	therefore stays the same however many nodes there are.
+
+	Peers that fail a request or a health check are taken off the ring
+	until they answer again, and set_nodes() changes the membership at
+	runtime. Either way only the cells of the affected node move.
+
+	With no peers configured (the default, and what tests use) the router
+	runs in single-process mode: every cell is local and no HTTP is made.
+
+	Usage:
+		shard_router.configure("http://10.0.0.1:5000",
+		                       ["http://10.0.0.1:5000", "http://10.0.0.2:5000"])
+		owner = shard_router.owner(lat, lon)   # None when this node owns it
+		payload = await shard_router.fetch(owner, lat, lon, budget, session)
+	"""
+
+	def __init__(self):
+		self.self_url = None
+		self.token = None
+		self.health_interval = DEFAULT_HEALTH_INTERVAL
+		self._lock = threading.Lock()
+		self._members = frozenset()
+		self._down = set()
+		self._ring = HashRing()
+		self._checker = None
+		self._stopped = threading.Event()
+		self._counts = dict.fromkeys(
+				("local", "forwarded", "forward_failed", "served"), 0
+		)
+
+	@property
+	def enabled(self):
+		return bool(self._members - {self.self_url})
+
+	def configure(
+			self, self_url=None, nodes=(), token=None,
+			health_interval=DEFAULT_HEALTH_INTERVAL
+			):
+		"""
+		Join the ring. self_url is this node's base URL as its peers reach it,
+		and token the secret guarding the internal endpoints; both are
+		required whenever nodes lists other nodes.
+
+		Raises:
+			ValueError: If nodes are given without self_url or token
+		"""
+		nodes = [node.rstrip("/") for node in nodes]
+		if nodes and not self_url:
+			raise ValueError("SHARD_SELF_URL is required when SHARD_NODES is set")
+		if nodes and not token:
+			raise ValueError("SHARD_TOKEN is required when SHARD_NODES is set")
+		self.self_url = self_url.rstrip("/") if self_url else None
+		self.token = token
+		self.health_interval = health_interval
+		self.set_nodes(nodes)
+
+		if self.enabled and self._checker is None:
+			self._checker = threading.Thread(
+					target=self._check_peers, name="shard-health", daemon=True
+			)
+			self._checker.start()
+
+	def set_nodes(self, nodes):
+		"""
+		Replace the ring membership, e.g. when a node joins or leaves the
+		deployment. This node always stays a member.
+
+		Returns:
+			list: The new members
+		"""
+		members = set(node.rstrip("/") for node in nodes)
+		if members and self.self_url:
+			members.add(self.self_url)
+		with self._lock:
+			self._members = frozenset(members)
+			self._down &= self._members
+			self._rebuild()
+		logger.info(
+				"Shard ring updated", extra={
+					"members": sorted(self._members), "down": sorted(self._down)
+				}
+		)
+		return sorted(self._members)
+
+	def _rebuild(self):
+		# Lock held; readers use whichever ring object they picked up
+		self._ring = HashRing(self._members - self._down)
+
+	def _set_down(self, node, down):
+		with self._lock:
+			if node not in self._members or (node in self._down) == down:
+				return
+			if down:
+				self._down.add(node)
+			else:
+				self._down.discard(node)
+			self._rebuild()
+		if down:
+			logger.warning("Shard node down, rebalancing", extra={"node": node})
+		else:
+			logger.info("Shard node back, rebalancing", extra={"node": node})
+
+	def _count(self, outcome):
+		with self._lock:
+			self._counts[outcome] += 1
+
+	def owner(self, lat, lon):
+		"""
+		Node owning the shard cell (see shard_key) of lat/lon.
+
+		Returns:
+			str: The owner's base URL, or None when this node owns the cell
+		"""
+		if not self.enabled:
+			return None
+		owner = self._ring.owner(shard_key(lat, lon))
+		if owner is None or owner == self.self_url:
+			self._count("local")
+			return None
+		return owner
+
+	def token_valid(self, sent):
+		"""
+		Whether sent equals the configured token, compared in constant time.
+		Always False without a token.
+		"""
+		if not self.token:
+			return False
+		return hmac.compare_digest((sent or "").encode(), self.token.encode())
+
+	def served(self):
+		"""Count a cell fetched on behalf of a peer."""
+		self._count("served")
+
+	async def fetch(self, owner, lat, lon, budget, session, fields=None):
+		"""
+		Ask owner for its pipeline result for lat/lon, limited to the
+		stages needed for fields when given.
+
+		Returns:
+			dict: The owner's result (context, stages, durations, elapsed),
+				  or None if the owner could not be reached in time or there
+				  is no budget to ask it. An owner that refuses connections
+				  is taken off the ring.
+		"""
+		# aiohttp reads total=0 as "no timeout", so never forward without time
+		if budget <= 0:
+			return None
+
+		params = {
+			"lat": str(lat), "lon": str(lon),
+			"budget": str(round(budget * OWNER_BUDGET_SHARE, 3))
+		}
+		if fields is not None:
+			params["fields"] = ",".join(fields)
+		headers = {INTERNAL_TOKEN_HEADER: self.token} if self.token else {}
+		try:
+			async with session.get(
+					owner + INTERNAL_LOCATION_PATH, params=params,
+					headers=headers,
+					timeout=aiohttp.ClientTimeout(total=budget)
+			) as response:
+				response.raise_for_status()
+				result = (await response.json())["result"]
+		except aiohttp.ClientConnectionError as err:
+			self._count("forward_failed")
+			logger.warning(
+					f"Shard owner unreachable: {err}", extra={"node": owner}
+			)
+			self._set_down(owner, True)
+			return None
+		except Exception as err:
+			self._count("forward_failed")
+			logger.warning(
+					f"Shard owner fetch failed: {err!r}", extra={"node": owner}
+			)
+			return None
+
+		self._count("forwarded")
+		return result
+
+	def _check_peers(self):
+		while not self._stopped.wait(self.health_interval):
+			for node in self._members - {self.self_url}:
+				self._set_down(node, not self._is_healthy(node))
+
+	def _is_healthy(self, node):
+		request = urllib.request.Request(node + INTERNAL_HEALTH_PATH)
+		if self.token:
+			request.add_header(INTERNAL_TOKEN_HEADER, self.token)
+		try:
+			with urllib.request.urlopen(request, timeout=HEALTH_TIMEOUT) as response:
+				return response.status == 200
+		except (urllib.error.URLError, OSError):
+			return False
+
+	def stats(self):
+		"""
+		Snapshot of the ring and forwarding counters.
+
+		Returns:
+			dict: self, members, down, enabled, and counts of cells served
+				  locally, forwarded to owners, failed forwards and cells
+				  served for peers since start
+		"""
+		with self._lock:
+			stats = dict(self._counts)
+			stats.update(
+					{
+						"self":    self.self_url,
+						"members": sorted(self._members),
+						"down":    sorted(self._down),
+					}
+			)
+		stats["enabled"] = self.enabled
+		return stats
+
+
+# Router consulted by the fetch pipeline, configured by create_app()
+shard_router = ShardRouter()
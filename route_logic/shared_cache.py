@@ -0,0 +1,287 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+	import fcntl
+except ImportError:
+	# Windows: no POSIX byte-range locks, the shared tier is unavailable
+	fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"UVSHMC01"
+
+# File header: magic, slot count, record size
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+
+# Record header: seq, key length, reserved, key hash, expires_at, value
+# length, reserved. seq is a seqlock counter - odd while a write is running.
+RECORD = struct.Struct("<IHHQdII")
+
+# Default table geometry: 4096 records of 2 KB (8 MB total)
+DEFAULT_SLOTS = 4096
+DEFAULT_RECORD_SIZE = 2048
+
+# Records per set. A key may live in any way of the set its hash selects.
+WAYS = 4
+
+# Number of in-process locks writers stripe over (cross-process exclusion
+# comes from fcntl range locks on the set being written)
+LOCK_STRIPES = 64
+
+# Reads retried this many times when they race a writer before counting as a miss
+MAX_READ_RETRIES = 3
+
+
+def key_hash(key):
+	"""Stable 64-bit hash of key, identical in every worker process."""
+	return int.from_bytes(
+			hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+	) or 1
+
+
+class SharedMemoryCache:
+	"""
+	Fixed-size cache in a memory-mapped file shared by all worker processes.
+
+	Every gunicorn worker maps the same file, so an entry fetched by one
+	worker is immediately visible to the others and the table's memory is
+	paid once no matter how many workers run. The table is a set-associative
+	array of fixed-size records: a key hashes to a set of WAYS records and
+	replaces an expired or the soonest-expiring record in that set.
+
+	Reads take no locks. Each record carries a seqlock counter that writers
+	make odd while they update the record; readers retry when the counter
+	changed under them. Writers serialize per set with an in-process striped
+	lock plus an fcntl byte-range lock on the set.
+
+	Values must be JSON-serializable and fit in a record together with their
+	key; larger values are not stored here and fall through to slower tiers.
+
+	The table geometry is part of the file name, so processes configured
+	with different sizes (e.g. during a rolling deploy) use separate files.
+	A file is never resized once created: shrinking a file that another
+	process has mapped kills that process with SIGBUS.
+
+	Args:
+		path (str): Backing file, preferably on tmpfs (e.g. /dev/shm); the
+					geometry is appended, e.g. path + ".4096x2048"
+		slots (int): Number of records, rounded down to a multiple of WAYS
+		record_size (int): Bytes per record including its header
+
+	Raises:
+		RuntimeError: If fcntl is unavailable or the file holds something
+					  other than a table of this geometry
+	"""
+
+	def __init__(self, path, slots=DEFAULT_SLOTS, record_size=DEFAULT_RECORD_SIZE):
+		if fcntl is None:
+			raise RuntimeError("Shared memory cache requires POSIX fcntl locks")
+
+		self.sets = max(1, slots // WAYS)
+		self.slots = self.sets * WAYS
+		self.record_size = record_size
+		self.path = f"{path}.{self.slots}x{record_size}"
+		self.max_payload = record_size - RECORD.size
+		self.size = HEADER_SIZE + self.slots * record_size
+		self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+		self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+		try:
+			fcntl.lockf(self._fd, fcntl.LOCK_EX)
+			try:
+				self._init_file()
+			finally:
+				fcntl.lockf(self._fd, fcntl.LOCK_UN)
+		except BaseException:
+			os.close(self._fd)
+			raise
+
+	def _init_file(self):
+		"""Map the table, creating it if the file is new."""
+		size = os.fstat(self._fd).st_size
+		if size == 0:
+			os.ftruncate(self._fd, self.size)
+		elif size != self.size:
+			raise RuntimeError(
+					f"{self.path} is {size} bytes, expected {self.size}"
+			)
+
+		self._mm = mmap.mmap(self._fd, self.size)
+		header = HEADER.unpack_from(self._mm, 0)
+		if header[0] == bytes(len(MAGIC)):
+			# New file, or its creator died before writing the header
+			HEADER.pack_into(self._mm, 0, MAGIC, self.slots, self.record_size)
+		elif header != (MAGIC, self.slots, self.record_size):
+			self._mm.close()
+			raise RuntimeError(f"{self.path} is not a matching cache table")
+
+	def _offset(self, slot):
+		return HEADER_SIZE + slot * self.record_size
+
+	def _read_slot(self, slot, hashed, encoded_key):
+		"""
+		Seqlock read of one slot.
+
+		Returns:
+			(expires_at, value) if the slot holds encoded_key, else None
+		"""
+		offset = self._offset(slot)
+		for _ in range(MAX_READ_RETRIES):
+			seq, key_len, _, slot_hash, expires_at, value_len, _ = \
+				RECORD.unpack_from(self._mm, offset)
+			if seq & 1:
+				continue
+			if slot_hash != hashed or key_len != len(encoded_key):
+				return None
+
+			start = offset + RECORD.size
+			payload = self._mm[start:start + key_len + value_len]
+
+			if RECORD.unpack_from(self._mm, offset)[0] != seq:
+				continue
+			if payload[:key_len] != encoded_key:
+				return None
+			return expires_at, payload[key_len:]
+		return None
+
+	def get_entry(self, key):
+		"""
+		Return (expires_at, value) for key, or None if missing or expired.
+		"""
+		encoded_key = key.encode()
+		hashed = key_hash(key)
+		first = (hashed % self.sets) * WAYS
+		now = time.time()
+
+		for slot in range(first, first + WAYS):
+			entry = self._read_slot(slot, hashed, encoded_key)
+			if entry is None:
+				continue
+
+			expires_at, raw_value = entry
+			if expires_at <= now:
+				return None
+			try:
+				return expires_at, json.loads(raw_value)
+			except ValueError:
+				return None
+		return None
+
+	def get(self, key, default=None):
+		"""Return the cached value for key, or default if missing or expired."""
+		entry = self.get_entry(key)
+		return default if entry is None else entry[1]
+
+	def _write(self, key, encoded_value, expires_at):
+		"""
+		Store encoded_value under key, or clear key when encoded_value is None.
+		"""
+		encoded_key = key.encode()
+		hashed = key_hash(key)
+		set_index = hashed % self.sets
+		first = set_index * WAYS
+		set_start = self._offset(first)
+		set_length = WAYS * self.record_size
+
+		with self._locks[set_index % LOCK_STRIPES]:
+			fcntl.lockf(self._fd, fcntl.LOCK_EX, set_length, set_start)
+			try:
+				now = time.time()
+				target = None
+				oldest = None
+				for slot in range(first, first + WAYS):
+					_, key_len, _, slot_hash, slot_expires, _, _ = \
+						RECORD.unpack_from(self._mm, self._offset(slot))
+					if slot_hash == hashed and key_len == len(encoded_key):
+						target = slot
+						break
+					if target is None and (slot_hash == 0 or slot_expires <= now):
+						target = slot
+					if oldest is None or slot_expires < oldest[0]:
+						oldest = (slot_expires, slot)
+
+				if encoded_value is None:
+					if target is not None and RECORD.unpack_from(
+							self._mm, self._offset(target)
+					)[3] == hashed:
+						self._store(target, 0, b"", b"", 0.0)
+					return
+
+				if target is None:
+					target = oldest[1]
+				self._store(
+						target, hashed, encoded_key, encoded_value, expires_at
+				)
+			finally:
+				fcntl.lockf(self._fd, fcntl.LOCK_UN, set_length, set_start)
+
+	def _store(self, slot, hashed, encoded_key, encoded_value, expires_at):
+		"""Write one record, bumping its seqlock around the update."""
+		offset = self._offset(slot)
+		seq = RECORD.unpack_from(self._mm, offset)[0]
+		struct.pack_into("<I", self._mm, offset, (seq + 1) & 0xFFFFFFFF)
+
+		start = offset + RECORD.size
+		payload = encoded_key + encoded_value
+		self._mm[start:start + len(payload)] = payload
+		RECORD.pack_into(
+				self._mm, offset, (seq + 1) & 0xFFFFFFFF, len(encoded_key), 0,
+				hashed, expires_at, len(encoded_value), 0
+		)
+		struct.pack_into("<I", self._mm, offset, (seq + 2) & 0xFFFFFFFF)
+
+	def set(self, key, value, ttl):
+		"""
+		Store value under key for ttl seconds. Values too large for a record
+		are skipped.
+		"""
+		try:
+			encoded_value = json.dumps(value, separators=(',', ':')).encode()
+		except (TypeError, ValueError) as err:
+			logger.error(f"Shared cache cannot encode {key}: {err}")
+			return
+
+		if len(key.encode()) + len(encoded_value) > self.max_payload:
+			return
+		self._write(key, encoded_value, time.time() + ttl)
+
+	def delete(self, key):
+		"""Remove key from the cache if present."""
+		self._write(key, None, 0.0)
+
+	def clear(self):
+		"""Remove every entry from the cache."""
+		# fcntl locks belong to the process, so unlocking the whole file also
+		# drops any set lock another thread holds. Holding every stripe lock
+		# first means no other thread here is inside _write().
+		for lock in self._locks:
+			lock.acquire()
+		try:
+			fcntl.lockf(self._fd, fcntl.LOCK_EX)
+			try:
+				for slot in range(self.slots):
+					self._store(slot, 0, b"", b"", 0.0)
+			finally:
+				fcntl.lockf(self._fd, fcntl.LOCK_UN)
+		finally:
+			for lock in self._locks:
+				lock.release()
+
+	def __len__(self):
+		now = time.time()
+		count = 0
+		for slot in range(self.slots):
+			_, _, _, slot_hash, expires_at, _, _ = RECORD.unpack_from(
+					self._mm, self._offset(slot)
+			)
+			if slot_hash and expires_at > now:
+				count += 1
+		return count
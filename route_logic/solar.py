@@ -0,0 +1,179 @@
+import math
+import time
+from typing import NamedTuple, Optional
+
+# Sun centre elevation at sunrise/sunset: refraction plus the solar radius
+HORIZON_ELEVATION = -0.833
+
+SECONDS_PER_DAY = 86400
+
+# Julian date of the Unix epoch and of the J2000.0 epoch
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+
+
+class SunTimes(NamedTuple):
+	"""
+	Sunrise, solar noon and sunset for one location and day as Unix
+	timestamps. sunrise and sunset are None during polar day or night.
+	"""
+	sunrise: Optional[float]
+	solar_noon: float
+	sunset: Optional[float]
+
+
+def _solar_terms(timestamp):
+	"""
+	Declination (degrees) and equation of time (minutes) at timestamp, using
+	the NOAA solar position equations (accurate to about a minute for
+	dates between 1800 and 2100).
+	"""
+	jc = (timestamp / SECONDS_PER_DAY + UNIX_EPOCH_JD - J2000_JD) / 36525
+
+	mean_long = math.radians(
+			(280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360
+	)
+	mean_anom = math.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+	eccentricity = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+	centre = (math.sin(mean_anom) * (
+			1.914602 - jc * (0.004817 + 0.000014 * jc)) + math.sin(
+			2 * mean_anom
+	) * (0.019993 - 0.000101 * jc) + math.sin(3 * mean_anom) * 0.000289)
+
+	omega = math.radians(125.04 - 1934.136 * jc)
+	apparent_long = math.radians(
+			math.degrees(mean_long) + centre - 0.00569 - 0.00478 * math.sin(
+					omega
+			)
+	)
+	mean_obliquity = 23 + (26 + (21.448 - jc * (
+			46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+	obliquity = math.radians(mean_obliquity + 0.00256 * math.cos(omega))
+
+	declination = math.degrees(
+			math.asin(math.sin(obliquity) * math.sin(apparent_long))
+	)
+
+	y = math.tan(obliquity / 2) ** 2
+	equation_of_time = 4 * math.degrees(
+			y * math.sin(2 * mean_long) - 2 * eccentricity * math.sin(
+					mean_anom
+			) + 4 * eccentricity * y * math.sin(mean_anom) * math.cos(
+					2 * mean_long
+			) - 0.5 * y * y * math.sin(
+					4 * mean_long
+			) - 1.25 * eccentricity ** 2 * math.sin(2 * mean_anom)
+	)
+	return declination, equation_of_time
+
+
+def _elevation(lat, lon, timestamp, declination, equation_of_time):
+	"""Solar elevation in degrees given the sun's terms at timestamp."""
+	utc_minutes = (timestamp % SECONDS_PER_DAY) / 60
+	true_solar_minutes = (utc_minutes + equation_of_time + 4 * lon) % 1440
+	hour_angle = math.radians(true_solar_minutes / 4 - 180)
+
+	lat_rad = math.radians(lat)
+	decl_rad = math.radians(declination)
+	cos_zenith = math.sin(lat_rad) * math.sin(decl_rad) + math.cos(
+			lat_rad
+	) * math.cos(decl_rad) * math.cos(hour_angle)
+	return 90 - math.degrees(math.acos(max(-1.0, min(1.0, cos_zenith))))
+
+
+def solar_elevation(lat, lon, timestamp=None):
+	"""
+	Geometric elevation of the sun's centre above the horizon.
+
+	Args:
+		lat (float): Latitude in degrees (south negative)
+		lon (float): Longitude in degrees (west negative)
+		timestamp (float, optional): Unix timestamp, defaults to now
+
+	Returns:
+		float: Elevation in degrees (negative when the sun is below the horizon)
+	"""
+	if timestamp is None:
+		timestamp = time.time()
+	return _elevation(lat, lon, timestamp, *_solar_terms(timestamp))
+
+
+def sun_times(lat, lon, timestamp=None):
+	"""
+	Sunrise, solar noon and sunset for the local solar day containing
+	timestamp.
+
+	Args:
+		lat (float): Latitude in degrees
+		lon (float): Longitude in degrees
+		timestamp (float, optional): Unix timestamp, defaults to now
+
+	Returns:
+		SunTimes: Unix timestamps; sunrise/sunset are None when the sun
+				  does not cross the horizon that day
+	"""
+	if timestamp is None:
+		timestamp = time.time()
+
+	# UTC midnight of the local mean solar date (lon * 240 s per degree)
+	local_day = math.floor((timestamp + lon * 240) / SECONDS_PER_DAY)
+	day_start = local_day * SECONDS_PER_DAY
+
+	# Estimate noon, then refine with the sun's position at that noon
+	solar_noon = day_start + (720 - 4 * lon) * 60
+	declination, equation_of_time = _solar_terms(solar_noon)
+	solar_noon = day_start + (720 - 4 * lon - equation_of_time) * 60
+
+	lat_rad = math.radians(lat)
+	decl_rad = math.radians(declination)
+	cos_hour_angle = (math.cos(math.radians(90 - HORIZON_ELEVATION)) / (
+			math.cos(lat_rad) * math.cos(decl_rad)) - math.tan(
+			lat_rad
+	) * math.tan(decl_rad))
+
+	if not -1 <= cos_hour_angle <= 1:
+		return SunTimes(None, solar_noon, None)
+
+	half_day = math.degrees(math.acos(cos_hour_angle)) * 4 * 60
+	return SunTimes(solar_noon - half_day, solar_noon, solar_noon + half_day)
+
+
+def is_nighttime(lat, lon, timestamp=None):
+	"""True when the sun is below the horizon at the location."""
+	return solar_elevation(lat, lon, timestamp) < HORIZON_ELEVATION
+
+
+def solar_elevations(lats, lons, timestamps=None):
+	"""
+	Batched solar_elevation over parallel sequences of locations.
+
+	Args:
+		lats (sequence): Latitudes in degrees
+		lons (sequence): Longitudes in degrees
+		timestamps (sequence or float, optional): One timestamp per location,
+			a single timestamp for all of them, or None for now
+
+	Returns:
+		list: Elevation in degrees for each location
+	"""
+	if timestamps is None or isinstance(timestamps, (int, float)):
+		timestamps = [time.time() if timestamps is None else timestamps] * len(
+				lats
+		)
+
+	# Locations sharing a timestamp share the (comparatively costly) solar terms
+	terms = {}
+	elevations = []
+	for lat, lon, timestamp in zip(lats, lons, timestamps):
+		if timestamp not in terms:
+			terms[timestamp] = _solar_terms(timestamp)
+		elevations.append(_elevation(lat, lon, timestamp, *terms[timestamp]))
+	return elevations
+
+
+def sun_times_batch(lats, lons, timestamp=None):
+	"""Batched sun_times for parallel sequences of locations."""
+	if timestamp is None:
+		timestamp = time.time()
+	return [sun_times(lat, lon, timestamp) for lat, lon in zip(lats, lons)]
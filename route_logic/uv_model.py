@@ -0,0 +1,306 @@
+import argparse
+import math
+import os
+import time
+
+from route_logic import solar
+
+# Empirical clear-sky UV index fit (Madronich, 2007):
+#   UVI = UVI_SCALE * mu0 ** MU_EXPONENT * (ozone / 300) ** OZONE_EXPONENT
+# where mu0 is the cosine of the solar zenith angle and ozone is in Dobson units
+UVI_SCALE = 12.5
+MU_EXPONENT = 2.42
+OZONE_EXPONENT = -1.23
+REFERENCE_OZONE = 300.0
+
+# Fractional UV increase per kilometre of altitude
+ALTITUDE_FACTOR_PER_KM = 0.08
+
+# Earth-sun distance variation (perihelion around 3 January)
+ECCENTRICITY_AMPLITUDE = 0.033
+
+# Cloud modification factor CMF = 1 - CLOUD_A * (cover / 100) ** CLOUD_B
+# (Kasten & Czeplak)
+CLOUD_A = 0.75
+CLOUD_B = 3.4
+
+# Skip the NIWA call when the clear-sky daily maximum cannot reach this UVI;
+# the advice is "Low UV" whatever NIWA would say
+PREFILTER_MAX_UVI = 1.0
+
+# Approximate zonal-mean total ozone climatology in Dobson units, by
+# latitude band centre (rows) and month (columns, January first). Smoothed
+# from satellite-era (TOMS/OMI) monthly means; accurate to roughly 5-10%,
+# which is ample for a fallback estimate.
+OZONE_LATITUDES = (-85, -75, -65, -55, -45, -35, -25, -15, -5, 5, 15, 25,
+                   35, 45, 55, 65, 75, 85)
+OZONE_CLIMATOLOGY = (
+	(265, 270, 265, 255, 250, 245, 235, 210, 170, 165, 200, 240),  # 85S
+	(275, 285, 280, 270, 265, 260, 250, 225, 190, 185, 215, 255),  # 75S
+	(300, 300, 295, 295, 300, 310, 320, 310, 270, 265, 285, 300),  # 65S
+	(310, 300, 295, 300, 315, 335, 350, 360, 355, 345, 330, 315),  # 55S
+	(300, 290, 285, 290, 300, 315, 330, 345, 350, 340, 325, 310),  # 45S
+	(285, 280, 275, 275, 280, 290, 300, 310, 315, 310, 300, 290),  # 35S
+	(265, 260, 255, 255, 260, 265, 270, 280, 285, 285, 280, 270),  # 25S
+	(255, 250, 250, 250, 250, 255, 260, 265, 270, 270, 265, 260),  # 15S
+	(250, 250, 250, 250, 250, 255, 255, 260, 265, 265, 260, 255),  # 5S
+	(250, 250, 255, 260, 260, 260, 260, 260, 260, 255, 250, 250),  # 5N
+	(255, 260, 265, 275, 275, 275, 270, 270, 265, 260, 255, 255),  # 15N
+	(270, 280, 290, 300, 300, 295, 290, 285, 280, 275, 270, 270),  # 25N
+	(310, 325, 335, 340, 335, 325, 310, 300, 290, 285, 290, 300),  # 35N
+	(345, 365, 375, 375, 365, 350, 330, 315, 300, 295, 305, 325),  # 45N
+	(365, 390, 405, 400, 385, 365, 345, 325, 305, 300, 315, 340),  # 55N
+	(370, 405, 430, 425, 400, 370, 345, 325, 305, 295, 310, 340),  # 65N
+	(375, 410, 440, 440, 410, 370, 340, 315, 295, 285, 300, 340),  # 75N
+	(380, 410, 445, 445, 415, 370, 335, 310, 290, 280, 300, 345),  # 85N
+)
+
+# Mid-month day of year for each climatology column
+MID_MONTH_DAYS = (15, 46, 74, 105, 135, 166, 196, 227, 258, 288, 319, 349)
+
+
+def _day_of_year(timestamp):
+	return time.gmtime(timestamp).tm_yday
+
+
+def ozone_column(lat, timestamp=None):
+	"""
+	Climatological total ozone column, interpolated in latitude and time.
+
+	Args:
+		lat (float): Latitude in degrees
+		timestamp (float, optional): Unix timestamp, defaults to now
+
+	Returns:
+		float: Total ozone in Dobson units
+	"""
+	if timestamp is None:
+		timestamp = time.time()
+
+	# Bracketing mid-month columns, wrapping December -> January
+	day = _day_of_year(timestamp)
+	for month in range(12):
+		start = MID_MONTH_DAYS[month]
+		end = MID_MONTH_DAYS[month + 1] if month < 11 else \
+			MID_MONTH_DAYS[0] + 365
+		if start <= day < end:
+			break
+	else:
+		month, start, end = 11, MID_MONTH_DAYS[11] - 365, MID_MONTH_DAYS[0]
+	next_month = (month + 1) % 12
+	month_weight = (day - start) / (end - start)
+
+	# Fractional latitude band index, clamped to the table
+	lat = max(OZONE_LATITUDES[0], min(OZONE_LATITUDES[-1], lat))
+	band = min(int((lat - OZONE_LATITUDES[0]) // 10), len(OZONE_LATITUDES) - 2)
+	lat_weight = (lat - OZONE_LATITUDES[band]) / 10
+
+	def at(row):
+		return OZONE_CLIMATOLOGY[row][month] * (
+				1 - month_weight) + OZONE_CLIMATOLOGY[row][
+			next_month] * month_weight
+
+	return at(band) * (1 - lat_weight) + at(band + 1) * lat_weight
+
+
+def clear_sky_uvi_from_elevation(elevation, ozone, altitude_m=0, timestamp=None):
+	"""
+	Clear-sky UV index for a given solar elevation and ozone column.
+
+	Args:
+		elevation (float): Solar elevation in degrees
+		ozone (float): Total ozone in Dobson units
+		altitude_m (float): Altitude above sea level in metres
+		timestamp (float, optional): Used for the Earth-sun distance correction
+
+	Returns:
+		float: UV index (0 when the sun is below the horizon)
+	"""
+	if elevation <= 0:
+		return 0.0
+	if timestamp is None:
+		timestamp = time.time()
+
+	mu0 = math.sin(math.radians(elevation))
+	distance_factor = 1 + ECCENTRICITY_AMPLITUDE * math.cos(
+			2 * math.pi * (_day_of_year(timestamp) - 3) / 365
+	)
+	altitude_factor = 1 + ALTITUDE_FACTOR_PER_KM * max(altitude_m, 0) / 1000
+	return (UVI_SCALE * mu0 ** MU_EXPONENT * (
+			ozone / REFERENCE_OZONE) ** OZONE_EXPONENT * distance_factor * altitude_factor)
+
+
+def clear_sky_uvi(lat, lon, timestamp=None, altitude_m=0):
+	"""
+	Instantaneous clear-sky UV index at a location.
+
+	Args:
+		lat (float): Latitude in degrees
+		lon (float): Longitude in degrees
+		timestamp (float, optional): Unix timestamp, defaults to now
+		altitude_m (float): Altitude above sea level in metres
+
+	Returns:
+		float: Estimated UV index
+	"""
+	if timestamp is None:
+		timestamp = time.time()
+	return clear_sky_uvi_from_elevation(
+			solar.solar_elevation(lat, lon, timestamp),
+			ozone_column(lat, timestamp), altitude_m, timestamp
+	)
+
+
+def clear_sky_uvi_batch(lats, lons, timestamps=None, altitudes=None):
+	"""
+	Batched clear_sky_uvi over parallel sequences of locations.
+
+	Args:
+		lats (sequence): Latitudes in degrees
+		lons (sequence): Longitudes in degrees
+		timestamps (sequence or float, optional): Per-location timestamps, a
+			single timestamp for all locations, or None for now
+		altitudes (sequence, optional): Altitudes in metres, default sea level
+
+	Returns:
+		list: Estimated UV index for each location
+	"""
+	if timestamps is None or isinstance(timestamps, (int, float)):
+		timestamps = [time.time() if timestamps is None else timestamps] * len(
+				lats
+		)
+	if altitudes is None:
+		altitudes = [0] * len(lats)
+
+	elevations = solar.solar_elevations(lats, lons, timestamps)
+	return [clear_sky_uvi_from_elevation(
+			elevation, ozone_column(lat, timestamp), altitude, timestamp
+	) for lat, elevation, timestamp, altitude in
+		zip(lats, elevations, timestamps, altitudes)]
+
+
+def daily_max_uvi(lat, lon, timestamp=None, altitude_m=0):
+	"""
+	Clear-sky UV index at solar noon of the local day, comparable to NIWA's
+	clear_sky_max.
+	"""
+	noon = solar.sun_times(lat, lon, timestamp).solar_noon
+	return clear_sky_uvi(lat, lon, noon, altitude_m)
+
+
+def cloud_modification_factor(cloud_cover):
+	"""Fraction of clear-sky UV reaching the ground under cloud_cover percent."""
+	cover = max(0.0, min(100.0, cloud_cover or 0)) / 100
+	return 1 - CLOUD_A * cover ** CLOUD_B
+
+
+def estimate_uv_data(lat, lon, cloud_cover=None, timestamp=None, altitude_m=0):
+	"""
+	Local stand-in for get_uv_data().
+
+	Args:
+		lat (float): Latitude in degrees
+		lon (float): Longitude in degrees
+		cloud_cover (float, optional): Cloud cover percent from OpenWeatherMap;
+			without it the cloudy-sky value equals the clear-sky value
+		timestamp (float, optional): Unix timestamp, defaults to now
+		altitude_m (float): Altitude above sea level in metres
+
+	Returns:
+		dict: clear_sky_max and cloudy_sky_max rounded to one decimal, like
+			  get_uv_data()
+	"""
+	clear_max = daily_max_uvi(lat, lon, timestamp, altitude_m)
+	cloudy_max = clear_max * cloud_modification_factor(cloud_cover)
+	return {
+		"clear_sky_max":  round(clear_max, 1),
+		"cloudy_sky_max": round(cloudy_max, 1)
+	}
+
+
+def accuracy_report(samples):
+	"""
+	Compare estimated clear-sky daily maxima with observed NIWA values.
+
+	Args:
+		samples (iterable): (lat, lon, timestamp, niwa_clear_sky_max) tuples
+
+	Returns:
+		dict: count, bias (mean estimate - NIWA), mae, rmse and
+			  mean_relative_error, or just count 0 when there are no samples
+	"""
+	errors = []
+	relative = []
+	for lat, lon, timestamp, observed in samples:
+		if observed is None:
+			continue
+		error = daily_max_uvi(lat, lon, timestamp) - observed
+		errors.append(error)
+		if observed > 0:
+			relative.append(abs(error) / observed)
+
+	if not errors:
+		return {"count": 0}
+
+	return {
+		"count":               len(errors),
+		"bias":                sum(errors) / len(errors),
+		"mae":                 sum(abs(error) for error in errors) / len(errors),
+		"rmse":                math.sqrt(
+				sum(error * error for error in errors) / len(errors)
+		),
+		"mean_relative_error": sum(relative) / len(relative) if relative else None,
+	}
+
+
+def niwa_samples_from_cache(disk_cache, uv_ttl):
+	"""
+	Yield (lat, lon, timestamp, clear_sky_max) for every NIWA result held in
+	the persistent cache (including expired rows not yet purged).
+
+	Args:
+		disk_cache (DiskCache): Persistent cache written by the fetch pipeline
+		uv_ttl (float): TTL the UV entries were stored with, used to recover
+						the fetch time from their expiry
+	"""
+	for key, value, expires_at in disk_cache.items("uv:"):
+		try:
+			lat, lon = (float(part) for part in key[3:].split("_"))
+		except ValueError:
+			continue
+		if isinstance(value, dict):
+			yield lat, lon, expires_at - uv_ttl, value.get("clear_sky_max")
+
+
+def main(argv=None):
+	from route_logic.disk_cache import DiskCache
+	from route_logic.pipeline import STAGE_TTLS
+
+	parser = argparse.ArgumentParser(
+			description="Report clear-sky UV estimator accuracy against cached NIWA data"
+	)
+	parser.add_argument(
+			"--db", default=os.getenv("CACHE_DB_PATH", os.path.join(
+					"instance", "upstream_cache.sqlite3"
+			))
+	)
+	args = parser.parse_args(argv)
+
+	report = accuracy_report(
+			niwa_samples_from_cache(DiskCache(args.db), STAGE_TTLS["uv"])
+	)
+	if not report["count"]:
+		print(f"No cached NIWA results in {args.db}")
+		return 1
+
+	print(f"Samples:             {report['count']}")
+	print(f"Bias (est - NIWA):   {report['bias']:+.2f} UVI")
+	print(f"Mean absolute error: {report['mae']:.2f} UVI")
+	print(f"RMSE:                {report['rmse']:.2f} UVI")
+	if report["mean_relative_error"] is not None:
+		print(f"Mean relative error: {report['mean_relative_error']:.0%}")
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
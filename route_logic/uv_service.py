@@ -1,11 +1,14 @@
 import os
 import asyncio
+import logging
 import aiohttp
 from typing import Dict, Optional
 
 DEFAULT_LOCATION = {"lat": -36.8485, "long": 174.7633}
 NIWA_API_URL = "https://api.niwa.co.nz/uv/data"
 
+logger = logging.getLogger(__name__)
+
 
 def extract_max_uv_value(product):
 	"""Helper function to extract max UV value from a product."""
@@ -18,13 +21,17 @@ def extract_max_uv_value(product):
 	return max(uv_values) if uv_values else None
 
 
-async def get_uv_data(session: Optional[aiohttp.ClientSession] = None) -> Dict[
-	str, Optional[float]]:
+async def get_uv_data(
+		session: Optional[aiohttp.ClientSession] = None,
+		lat: Optional[float] = None, lon: Optional[float] = None
+		) -> Dict[str, Optional[float]]:
 	"""
 	Asynchronously fetch UV data from NIWA API.
 
 	Args:
 		session: Optional aiohttp session. If None, creates a new one.
+		lat: Optional latitude. Defaults to DEFAULT_LOCATION.
+		lon: Optional longitude. Defaults to DEFAULT_LOCATION.
 
 	Returns:
 		Dictionary with clear_sky_max and cloudy_sky_max UV values
@@ -32,7 +39,8 @@ async def get_uv_data(session: Optional[aiohttp.ClientSession] = None) -> Dict[
 	niwa_key = os.getenv("NIWA_KEY")
 
 	params = {
-		"lat": DEFAULT_LOCATION["lat"], "long": DEFAULT_LOCATION["long"]
+		"lat":  DEFAULT_LOCATION["lat"] if lat is None else lat,
+		"long": DEFAULT_LOCATION["long"] if lon is None else lon
 	}
 
 	headers = {
@@ -72,7 +80,7 @@ async def get_uv_data(session: Optional[aiohttp.ClientSession] = None) -> Dict[
 			}
 
 	except Exception as e:
-		print(f"Error fetching UV data: {e}")
+		logger.error(f"Error fetching UV data: {e}")
 		return {
 			"clear_sky_max": None, "cloudy_sky_max": None
 		}
@@ -121,7 +129,7 @@ async def get_multiple_uv_data(
 		processed_results = []
 		for i, result in enumerate(results):
 			if isinstance(result, Exception):
-				print(f"Error for location {locations[i]}: {result}")
+				logger.error(f"Error for location {locations[i]}: {result}")
 				processed_results.append(
 						{
 							"clear_sky_max": None, "cloudy_sky_max": None,
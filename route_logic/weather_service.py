@@ -1,14 +1,167 @@
 import os
+import time
 import aiohttp
 import asyncio
 import logging
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
 
-OWM_API_URL = "https://api.openweathermap.org/data/2.5/weather"
+logger = logging.getLogger(__name__)
 
+OWM_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
 
-async def is_cloudy_async(lat=-36.8485, lon=174.7633, session=None):
+# How long a fetched forecast is used before it is fetched again (seconds):
+# four OpenWeatherMap calls per location cell per day
+FORECAST_TTL = 6 * 60 * 60
+
+# Spacing of OpenWeatherMap's forecast steps (seconds)
+FORECAST_STEP = 3 * 60 * 60
+
+# Bump when the layout returned by Forecast.to_data() changes
+FORECAST_VERSION = 1
+
+
+class WeatherRecord(NamedTuple):
+	"""Weather for one location and time."""
+	cloud_index: int
+	location_name: str
+	weather_main: str
+	weather_description: str
+	weather_icon: str
+	sunrise: int
+	sunset: int
+
+
+class Forecast:
+	"""
+	Multi-hour forecast for one location in compact array form.
+
+	OpenWeatherMap's 5 day / 3 hour forecast (around 15 KB of JSON) is
+	reduced to what the app shows: the hour offset of each step from the
+	first, cloud cover per step, and per step an index into a table of the
+	distinct (main, description, icon) conditions. to_data() gives a
+	JSON-ready dict of well under 1 KB, small enough for one shared cache
+	slot, and at() answers for now or any time the forecast covers.
+	"""
+
+	def __init__(
+			self, location_name, sunrise, sunset, start, hours, clouds, codes,
+			conditions
+			):
+		self.location_name = location_name
+		self.sunrise = sunrise
+		self.sunset = sunset
+		self.start = start
+		self.hours = array("H", hours)
+		self.clouds = array("B", clouds)
+		self.codes = array("B", codes)
+		self.conditions = [tuple(condition) for condition in conditions]
+
+	@classmethod
+	def from_payload(cls, payload):
+		"""
+		Build a forecast from an OpenWeatherMap /forecast response.
+
+		Raises:
+			ValueError: If the response holds no forecast steps
+		"""
+		steps = payload.get("list") or []
+		if not steps:
+			raise ValueError("Forecast response has no steps")
+
+		start = steps[0]["dt"]
+		hours, clouds, codes = [], [], []
+		conditions, index = [], {}
+		for step in steps:
+			weather_data = (step.get("weather") or [{}])[0]
+			condition = (
+				weather_data.get("main", "Unknown"),
+				weather_data.get("description", "No description"),
+				weather_data.get("icon", "Unknown")
+			)
+			if condition not in index:
+				index[condition] = len(conditions)
+				conditions.append(condition)
+
+			hours.append((step["dt"] - start) // 3600)
+			clouds.append(max(0, min(100, int(step.get("clouds", {}).get("all", 0)))))
+			codes.append(index[condition])
+
+		city = payload.get("city", {})
+		return cls(
+				city.get("name", "Unknown Location"), city.get("sunrise", 0),
+				city.get("sunset", 0), start, hours, clouds, codes, conditions
+		)
+
+	@classmethod
+	def from_data(cls, data):
+		"""
+		Rebuild a forecast from to_data() output.
+
+		Raises:
+			ValueError: If data is not a forecast in the current layout
+		"""
+		if not isinstance(data, dict) or data.get("v") != FORECAST_VERSION:
+			raise ValueError("Not a current forecast")
+		return cls(
+				data["name"], data["sunrise"], data["sunset"], data["start"],
+				data["hours"], data["clouds"], data["codes"], data["conditions"]
+		)
+
+	def to_data(self):
+		return {
+			"v":          FORECAST_VERSION, "name": self.location_name,
+			"sunrise":    self.sunrise, "sunset": self.sunset,
+			"start":      self.start, "hours": self.hours.tolist(),
+			"clouds":     self.clouds.tolist(), "codes": self.codes.tolist(),
+			"conditions": [list(condition) for condition in self.conditions],
+		}
+
+	def at(self, when=None):
+		"""
+		Weather for the forecast step covering when.
+
+		Args:
+			when (float, optional): Unix time; defaults to now. Times up to
+				one step before the first step use the first step, since
+				OpenWeatherMap starts the forecast at the next step boundary.
+
+		Returns:
+			WeatherRecord, or None if when is outside the forecast
+		"""
+		when = time.time() if when is None else when
+		offset = when - self.start
+		if offset < -FORECAST_STEP or offset >= self.hours[-1] * 3600 + FORECAST_STEP:
+			return None
+
+		step = max(0, bisect_right(self.hours, offset / 3600) - 1)
+		weather_main, weather_description, weather_icon = self.conditions[
+			self.codes[step]]
+		return WeatherRecord(
+				self.clouds[step], self.location_name, weather_main,
+				weather_description, weather_icon, self.sunrise, self.sunset
+		)
+
+
+def weather_at(data, when=None):
+	"""
+	Weather at when (default now) from a forecast in to_data() form, as
+	returned by fetch_forecast_async() and kept in the location cache.
+
+	Returns:
+		WeatherRecord, or None if data is not a current forecast or does not
+		cover when
+	"""
+	try:
+		return Forecast.from_data(data).at(when)
+	except (KeyError, TypeError, ValueError):
+		return None
+
+
+async def fetch_forecast_async(lat=-36.8485, lon=174.7633, session=None):
 	"""
-	Asynchronously fetch weather data from OpenWeatherMap API.
+	Asynchronously fetch the 5 day / 3 hour forecast from OpenWeatherMap.
 
 	Args:
 		lat (float): Latitude coordinate (defaults to Auckland: -36.8485)
@@ -17,21 +170,14 @@ async def is_cloudy_async(lat=-36.8485, lon=174.7633, session=None):
 												   If None, creates a new one.
 
 	Returns:
-		tuple: (cloud_index, location_name, weather_main, weather_description,
-				weather_icon, sunrise, sunset) containing:
-			- cloud_index (int): Cloud coverage percentage (0-100)
-			- location_name (str): Name of the location
-			- weather_main (str): Main weather condition (e.g., "Clear", "Rain")
-			- weather_description (str): Detailed weather description
-			- weather_icon (str): Weather icon code from OpenWeatherMap
-			- sunrise (int): Sunrise time as Unix timestamp
-			- sunset (int): Sunset time as Unix timestamp
+		dict: The forecast in compact form (Forecast.to_data()), ready to
+			  cache; read it with weather_at()
 		None: If API call fails or encounters an error
 	"""
 	open_weather_key = os.getenv("OPEN_WEATHER_KEY")
 
 	if not open_weather_key:
-		logging.error(
+		logger.error(
 			"OpenWeatherMap API key not found in environment variables"
 			)
 		return None
@@ -46,46 +192,42 @@ async def is_cloudy_async(lat=-36.8485, lon=174.7633, session=None):
 		session = aiohttp.ClientSession()
 
 	try:
-		async with session.get(OWM_API_URL, params=params) as response:
+		async with session.get(OWM_FORECAST_URL, params=params) as response:
 			response.raise_for_status()
 			payload = await response.json()
-
-			# Extract cloud coverage percentage
-			cloud_index = payload.get("clouds", {}).get("all", 0)
-			location_name = payload.get("name", "Unknown Location")
-
-			# Extract weather information
-			weather_data = payload.get("weather", [{}])[0]
-			weather_main = weather_data.get("main", "Unknown")
-			weather_description = weather_data.get(
-				"description", "No description"
-				)
-			weather_icon = weather_data.get("icon", "Unknown")
-
-			# Extract sunrise/sunset data for day/night detection
-			sys_data = payload.get("sys", {})
-			sunrise = sys_data.get("sunrise", 0)
-			sunset = sys_data.get("sunset", 0)
-
-			return (
-			cloud_index, location_name, weather_main, weather_description,
-			weather_icon, sunrise, sunset)
+			return Forecast.from_payload(payload).to_data()
 
 	except aiohttp.ClientResponseError as http_err:
-		logging.error(
+		logger.error(
 				f"HTTP error occurred: {http_err}. Status: {http_err.status}, "
 				f"Message: {http_err.message}"
 		)
 	except aiohttp.ClientConnectionError as conn_err:
-		logging.error(f"Connection error occurred: {conn_err}")
+		logger.error(f"Connection error occurred: {conn_err}")
 	except asyncio.TimeoutError as timeout_err:
-		logging.error(f"Timeout error occurred: {timeout_err}")
+		logger.error(f"Timeout error occurred: {timeout_err}")
 	except Exception as err:
-		logging.error(f"Unexpected error occurred: {err}")
+		logger.error(f"Unexpected error occurred: {err}")
 
 	finally:
 		# Only close session if we created it
 		if close_session:
 			await session.close()
 
-	return None
\ No newline at end of file
+	return None
+
+
+async def is_cloudy_async(lat=-36.8485, lon=174.7633, session=None):
+	"""
+	Asynchronously fetch the current weather (the forecast step covering
+	now). The fetch pipeline caches the whole forecast instead; use this
+	for one-off lookups.
+
+	Returns:
+		WeatherRecord: Cloud coverage percentage (0-100), location name,
+			main condition (e.g. "Clear", "Rain"), description, icon code,
+			and sunrise/sunset as Unix timestamps
+		None: If API call fails or encounters an error
+	"""
+	forecast = await fetch_forecast_async(lat, lon, session)
+	return None if forecast is None else weather_at(forecast)
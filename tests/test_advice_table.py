@@ -0,0 +1,138 @@
+import struct
+
+import pytest
+
+from route_logic import advice_table
+from route_logic.advice_table import CONDITIONS, HEADER, INDEX_ENTRY, \
+	UV_BUCKETS, AdviceTable, bucket_uv, load_advice_table, uv_bucket, \
+	write_table
+from route_logic.bot_advice import StructuredAdvice
+
+CLOUDS = CONDITIONS.index(("Clouds", "broken clouds"))
+
+
+@pytest.mark.parametrize(
+		"uv_index, bucket", [
+			(0, 0), (-1.0, 0), (0.24, 0), (0.26, 1), (6.2, 12), (11.5, 23),
+			(12, 24), (20, 24),
+		]
+)
+def test_uv_bucket(uv_index, bucket):
+	assert uv_bucket(uv_index) == bucket
+
+
+def test_bucket_uv_round_trip():
+	for bucket in range(UV_BUCKETS):
+		assert uv_bucket(bucket_uv(bucket)) == bucket
+
+
+def advice_for(bucket, condition):
+	return StructuredAdvice(
+			f"UV {bucket_uv(bucket)}", f"Dress for {CONDITIONS[condition][1]}",
+			"SPF 50"
+	)
+
+
+@pytest.fixture
+def table_path(tmp_path):
+	# Every cell filled except bucket 3 under broken clouds
+	cells = [
+		None if (bucket, condition) == (3, CLOUDS) else advice_for(
+				bucket, condition
+		) for bucket in range(UV_BUCKETS) for condition in
+		range(len(CONDITIONS))
+	]
+	path = str(tmp_path / "advice_table.bin")
+	write_table(path, cells)
+	return path
+
+
+def test_table_round_trip(table_path):
+	table = AdviceTable.open(table_path)
+	try:
+		for bucket in range(UV_BUCKETS):
+			for condition, (main, description) in enumerate(CONDITIONS):
+				if (bucket, condition) == (3, CLOUDS):
+					continue
+				assert table.lookup(
+						bucket_uv(bucket), main, description
+				) == advice_for(bucket, condition)
+	finally:
+		table.close()
+
+
+def test_lookup_buckets_uv_and_ignores_case(table_path):
+	table = AdviceTable.open(table_path)
+	try:
+		assert table.lookup(6.2, "CLOUDS", "Broken Clouds") == advice_for(
+				12, CLOUDS
+		)
+	finally:
+		table.close()
+
+
+def test_lookup_misses(table_path):
+	table = AdviceTable.open(table_path)
+	try:
+		assert table.lookup(1.5, "Clouds", "broken clouds") is None
+		assert table.lookup(6.0, "Clouds", "purple clouds") is None
+		assert table.lookup(None, "Clouds", "broken clouds") is None
+		assert table.lookup(6.0, "", "broken clouds") is None
+	finally:
+		table.close()
+
+
+def test_stale_table_is_rejected(table_path):
+	with open(table_path, "r+b") as f:
+		header = bytearray(f.read(HEADER.size))
+		# Corrupt the grid hash (after the magic and version fields)
+		struct.pack_into("<Q", header, 12, 0)
+		f.seek(0)
+		f.write(header)
+
+	with pytest.raises(ValueError, match="stale"):
+		AdviceTable.open(table_path)
+
+
+def test_other_file_is_rejected(tmp_path):
+	path = tmp_path / "not_a_table.bin"
+	path.write_bytes(b"\0" * 64)
+	with pytest.raises(ValueError):
+		AdviceTable.open(str(path))
+
+
+INDEX_END = HEADER.size + UV_BUCKETS * len(CONDITIONS) * INDEX_ENTRY.size
+
+
+@pytest.mark.parametrize("size", [HEADER.size - 1, HEADER.size, INDEX_END - 1])
+def test_truncated_table_is_rejected(table_path, size):
+	with open(table_path, "r+b") as f:
+		f.truncate(size)
+	with pytest.raises(ValueError):
+		AdviceTable.open(table_path)
+
+
+def test_truncated_pool_is_rejected(table_path):
+	with open(table_path, "r+b") as f:
+		f.seek(0, 2)
+		f.truncate(f.tell() - 1)
+	with pytest.raises(ValueError, match="out of bounds"):
+		AdviceTable.open(table_path)
+
+
+def test_index_entry_pointing_into_the_index_is_rejected(table_path):
+	with open(table_path, "r+b") as f:
+		f.seek(HEADER.size)
+		f.write(INDEX_ENTRY.pack(0, 10))
+	with pytest.raises(ValueError, match="out of bounds"):
+		AdviceTable.open(table_path)
+
+
+def test_corrupt_table_is_not_loaded(table_path, monkeypatch):
+	monkeypatch.setattr(advice_table, "_advice_table", None)
+	with open(table_path, "r+b") as f:
+		f.truncate(INDEX_END - 1)
+	assert not load_advice_table(table_path)
+	assert advice_table.lookup_precomputed_advice(
+			6.2, "Clouds", "broken clouds"
+	) is None
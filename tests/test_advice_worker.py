@@ -0,0 +1,131 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from route_logic.advice_worker import PRIORITY_WARMING, AdviceQueueFull, \
+	AdviceWorkerPool
+
+
+class Blocker:
+	"""Coroutine function that runs until released, recording each call."""
+
+	def __init__(self):
+		self.started = threading.Event()
+		self.released = threading.Event()
+		self.calls = []
+
+	async def __call__(self, name, session=None):
+		self.calls.append(name)
+		self.started.set()
+		while not self.released.is_set():
+			await asyncio.sleep(0.005)
+		return name
+
+
+async def echo(value, session=None):
+	return value
+
+
+async def fail(session=None):
+	raise RuntimeError("model unavailable")
+
+
+def wait_until(predicate, timeout=2):
+	deadline = time.monotonic() + timeout
+	while not predicate():
+		assert time.monotonic() < deadline, "timed out"
+		time.sleep(0.005)
+
+
+@pytest.fixture
+def pool():
+	pool = AdviceWorkerPool()
+	pool.start(workers=1, queue_size=2)
+	yield pool
+	pool.shutdown()
+
+
+@pytest.fixture
+def blocker():
+	blocker = Blocker()
+	yield blocker
+	blocker.released.set()
+
+
+def test_run_without_workers_awaits_directly():
+	assert asyncio.run(AdviceWorkerPool().run(echo, "direct")) == "direct"
+
+
+def test_jobs_return_results(pool):
+	assert pool.submit(echo, 1).future.result(timeout=2) == 1
+	assert asyncio.run(pool.run(echo, 2)) == 2
+
+
+def test_cancel_queued_job(pool, blocker):
+	pool.submit(blocker, "first")
+	assert blocker.started.wait(2)
+
+	queued = pool.submit(blocker, "queued")
+	queued.cancel()
+	assert queued.future.cancelled()
+
+	blocker.released.set()
+	pool.shutdown()
+	assert blocker.calls == ["first"]
+	assert pool.stats()["cancelled"] == 1
+
+
+def test_cancel_running_job(pool, blocker):
+	job = pool.submit(blocker, "running")
+	assert blocker.started.wait(2)
+
+	job.cancel()
+	with pytest.raises(concurrent.futures.CancelledError):
+		job.future.result(timeout=2)
+	assert pool.stats()["cancelled"] == 1
+	assert pool.stats()["running"] == 0
+	# The worker is free for the next job
+	assert pool.submit(echo, "next").future.result(timeout=2) == "next"
+
+
+def test_caller_timeout_cancels_job(pool, blocker):
+	async def page_load():
+		return await asyncio.wait_for(pool.run(blocker, "slow"), 0.05)
+
+	with pytest.raises(asyncio.TimeoutError):
+		asyncio.run(page_load())
+	wait_until(lambda: pool.stats()["cancelled"] == 1)
+
+
+def test_full_queue_rejects_jobs(pool, blocker):
+	pool.submit(blocker, "running")
+	assert blocker.started.wait(2)
+	pool.submit(blocker, "queued 1", priority=PRIORITY_WARMING)
+	pool.submit(blocker, "queued 2", priority=PRIORITY_WARMING)
+
+	with pytest.raises(AdviceQueueFull):
+		pool.submit(echo, "rejected")
+	stats = pool.stats()
+	assert stats["rejected"] == 1
+	assert stats["submitted"] == 3
+	assert stats["queue_length"] == stats["queue_capacity"] == 2
+
+
+def test_stats_count_outcomes(pool):
+	assert pool.submit(echo, "ok").future.result(timeout=2) == "ok"
+	with pytest.raises(RuntimeError):
+		pool.submit(fail).future.result(timeout=2)
+
+	stats = pool.stats()
+	assert stats["workers"] == 1
+	assert (stats["submitted"], stats["completed"], stats["failed"]) == (2, 1, 1)
+	assert stats["running"] == stats["queue_length"] == 0
+	assert 0 <= stats["wait_mean"] <= stats["wait_max"]
+
+
+def test_submit_requires_started_pool():
+	with pytest.raises(RuntimeError):
+		AdviceWorkerPool().submit(echo, 1)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from app.api import api_routes
+from app.api.api_routes import MAX_BATCH_LOCATIONS, json_response, \
+	parse_fields, parse_locations
+from route_logic.pipeline import CONTEXT_FIELDS
+
+
+def test_single_location():
+	assert parse_locations({"lat": -36.8485, "lon": 174.7633}) == [
+		(-36.8485, 174.7633)
+	]
+
+
+def test_single_location_from_query_strings():
+	assert parse_locations({"lat": "-41.3", "lon": "174.78"}) == [
+		(-41.3, 174.78)
+	]
+
+
+def test_batch_of_objects_and_pairs():
+	data = {"locations": [{"lat": -36.8, "lon": 174.7}, [-43.5, 172.6]]}
+	assert parse_locations(data) == [(-36.8, 174.7), (-43.5, 172.6)]
+
+
+def test_batch_from_query_string():
+	assert parse_locations({"locations": "-36.8,174.7; -43.5,172.6;"}) == [
+		(-36.8, 174.7), (-43.5, 172.6)
+	]
+
+
+@pytest.mark.parametrize(
+		"data", [
+			{}, {"lat": -36.8}, {"lat": "north", "lon": 174.7},
+			{"lat": 91, "lon": 0}, {"lat": 0, "lon": -181},
+			{"locations": []}, {"locations": ""}, {"locations": {"lat": 1}},
+			{"locations": [[1, 2, 3]]}, {"locations": ["1,2"]},
+			{"locations": "1,2,3"}, {"lat": [1], "lon": 0},
+			{"lat": {"x": 1}, "lon": 0},
+		]
+)
+def test_invalid_locations(data):
+	with pytest.raises(ValueError):
+		parse_locations(data)
+
+
+def test_batch_size_is_limited():
+	locations = [[0, 0]] * MAX_BATCH_LOCATIONS
+	assert len(parse_locations({"locations": locations})) == MAX_BATCH_LOCATIONS
+
+	with pytest.raises(ValueError, match="Too many"):
+		parse_locations({"locations": locations + [[0, 0]]})
+
+
+def test_fields_default_to_all():
+	assert parse_fields({}) == CONTEXT_FIELDS
+	assert parse_fields({"fields": ""}) == CONTEXT_FIELDS
+
+
+def test_fields_from_list_or_string():
+	assert parse_fields({"fields": ["uv_index", "advice"]}) == (
+		"uv_index", "advice"
+	)
+	assert parse_fields({"fields": " uv_index, advice ,"}) == (
+		"uv_index", "advice"
+	)
+
+
+def test_unknown_fields_are_rejected():
+	with pytest.raises(ValueError, match="password"):
+		parse_fields({"fields": "uv_index,password"})
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_response_with_and_without_orjson(monkeypatch, use_orjson):
+	if use_orjson:
+		pytest.importorskip("orjson")
+	else:
+		monkeypatch.setattr(api_routes, "orjson", None)
+
+	payload = {"status": "success", "results": [
+		{"lat": -36.8, "lon": 174.7, "uv_index": None, "location_name": "Tāmaki"}
+	]}
+	response = json_response(payload, 201)
+	assert response.status_code == 201
+	assert response.mimetype == "application/json"
+	body = response.get_data()
+	assert json.loads(body) == payload
+	assert b", " not in body and b": " not in body
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from route_logic import bot_advice
+from route_logic.bot_advice import MAX_FIELD_LENGTH, StructuredAdvice, \
+	configure_structured_output, parse_advice_text, validate_advice
+
+VALID = {
+	"uv_summary":     "UV is high at 8.",
+	"clothing":       "Wear a long-sleeved shirt and a wide-brimmed hat.",
+	"sun_protection": "Apply SPF 50 sunscreen every two hours.",
+}
+
+TEXT = """UV Summary: UV is high at 8.
+Clothing: Wear a long-sleeved shirt and a wide-brimmed hat.
+Sun Protection: Apply SPF 50 sunscreen every two hours."""
+
+
+def test_valid_advice():
+	assert validate_advice(VALID) == StructuredAdvice(*VALID.values())
+
+
+def test_whitespace_is_collapsed():
+	advice = validate_advice(dict(VALID, clothing="  Wear\n a   hat. "))
+	assert advice.clothing == "Wear a hat."
+
+
+def test_longest_field_is_accepted():
+	assert validate_advice(dict(VALID, clothing="x" * MAX_FIELD_LENGTH))
+
+
+@pytest.mark.parametrize(
+		"data", [
+			None, "UV Summary: high", ["uv_summary", "clothing"],
+			{"uv_summary": "High", "clothing": "Hat"},
+			dict(VALID, clothing=""), dict(VALID, clothing=" \n\t "),
+			dict(VALID, clothing=None), dict(VALID, clothing=42),
+			dict(VALID, clothing=["Hat", "Shirt"]),
+			dict(VALID, sun_protection="x" * (MAX_FIELD_LENGTH + 1)),
+		]
+)
+def test_malformed_advice_is_rejected(data):
+	assert validate_advice(data) is None
+
+
+def test_parse_advice_text():
+	assert parse_advice_text(TEXT) == StructuredAdvice(*VALID.values())
+
+
+def test_parse_ignores_other_lines():
+	text = "Here is your advice:\n\n" + TEXT + "\nStay safe!"
+	assert parse_advice_text(text) == StructuredAdvice(*VALID.values())
+
+
+@pytest.mark.parametrize(
+		"text", [
+			None, "", "Error: LLM request timed out",
+			"Error connecting to local LLM: HTTP 500",
+			"\n".join(TEXT.splitlines()[:2]),
+			TEXT.replace("Clothing: Wear", "Clothing:\nWear"),
+			TEXT.replace("Sun Protection:", "Sunscreen:"),
+			TEXT + " " + "very " * MAX_FIELD_LENGTH,
+		]
+)
+def test_malformed_text_is_rejected(text):
+	assert parse_advice_text(text) is None
+
+
+def test_free_text_generation_when_structured_output_is_off(monkeypatch):
+	monkeypatch.setattr(bot_advice, "STRUCTURED_OUTPUT", True)
+
+	async def free_text(*args):
+		return TEXT
+
+	monkeypatch.setattr(bot_advice, "get_dynamic_advice_async", free_text)
+	configure_structured_output(False)
+	advice = asyncio.run(
+			bot_advice.get_structured_advice_async(
+					8, None, None, "Clear", "clear sky", session=object()
+			)
+	)
+	assert advice == StructuredAdvice(*VALID.values())
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from route_logic.live_updates import EVENT_SNAPSHOT, EVENT_UPDATE, \
+	SUBSCRIBER_QUEUE_SIZE, LocationUpdates, SubscriberLimitReached
+from route_logic.pipeline import default_context
+
+LAT, LON = -36.8485, 174.7633
+
+
+def context(**fields):
+	data = default_context()
+	data.update({"location_name": "Auckland", "uv_index": 6.0})
+	data.update(fields)
+	return data
+
+
+@pytest.fixture
+def hub():
+	# Long refresh interval: the background refresher never fires in a test
+	return LocationUpdates(refresh_interval=3600, max_subscribers=2)
+
+
+def test_subscribers_are_capped(hub):
+	first = hub.subscribe(LAT, LON)
+	hub.subscribe(-41.3, 174.8)
+	with pytest.raises(SubscriberLimitReached):
+		hub.subscribe(LAT, LON)
+	assert hub.subscriber_count() == 2
+
+	hub.unsubscribe(first)
+	hub.subscribe(LAT, LON)
+	assert hub.subscriber_count(LAT, LON) == 1
+
+
+def test_first_event_is_a_snapshot_then_deltas(hub):
+	subscription = hub.subscribe(LAT, LON)
+	assert subscription.get(timeout=0) is None
+
+	assert hub.publish(LAT, LON, context()) == 1
+	event, data = subscription.get(timeout=0)
+	assert event == EVENT_SNAPSHOT
+	assert data["location_name"] == "Auckland"
+
+	assert hub.publish(LAT, LON, context()) == 0
+	hub.publish(LAT, LON, context(uv_index=7.5))
+	assert subscription.get(timeout=0) == (EVENT_UPDATE, {"uv_index": 7.5})
+
+
+def test_late_subscriber_gets_the_latest_snapshot(hub):
+	hub.subscribe(LAT, LON)
+	hub.publish(LAT, LON, context(uv_index=7.5))
+
+	late = hub.subscribe(LAT, LON)
+	event, data = late.get(timeout=0)
+	assert event == EVENT_SNAPSHOT
+	assert data["uv_index"] == 7.5
+
+
+def test_incomplete_result_still_gives_new_subscribers_a_snapshot(hub):
+	subscription = hub.subscribe(LAT, LON)
+	night = context(is_nighttime=True, uv_index=None)
+	assert hub.publish(LAT, LON, night, complete=False) == 1
+	event, data = subscription.get(timeout=0)
+	assert event == EVENT_SNAPSHOT
+	assert data["is_nighttime"]
+
+
+def test_incomplete_result_keeps_the_last_complete_snapshot(hub):
+	subscription = hub.subscribe(LAT, LON)
+	hub.publish(LAT, LON, context())
+	subscription.get(timeout=0)
+
+	assert hub.publish(LAT, LON, context(uv_index=None), complete=False) == 0
+	assert subscription.get(timeout=0) is None
+	assert hub.snapshot(LAT, LON)["uv_index"] == 6.0
+
+
+def test_subscriber_far_behind_is_resynced(hub):
+	subscription = hub.subscribe(LAT, LON)
+	# A snapshot plus one update more than the queue holds
+	for uv_index in range(SUBSCRIBER_QUEUE_SIZE + 1):
+		hub.publish(LAT, LON, context(uv_index=float(uv_index)))
+
+	# The backlog was replaced by the state at the overflow
+	event, data = subscription.get(timeout=0)
+	assert event == EVENT_SNAPSHOT
+	assert data["uv_index"] == float(SUBSCRIBER_QUEUE_SIZE)
+	assert subscription.get(timeout=0) is None
+
+
+def test_get_async_wakes_on_publish(hub):
+	subscription = hub.subscribe(LAT, LON)
+
+	async def listen():
+		loop = asyncio.get_running_loop()
+		loop.call_later(0.05, hub.publish, LAT, LON, context())
+		return await subscription.get_async(timeout=2)
+
+	assert asyncio.run(listen())[0] == EVENT_SNAPSHOT
+
+
+def test_unsubscribing_the_last_page_drops_the_snapshot(hub):
+	subscription = hub.subscribe(LAT, LON)
+	hub.publish(LAT, LON, context())
+	hub.unsubscribe(subscription)
+	assert hub.snapshot(LAT, LON) is None
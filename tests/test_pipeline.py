@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+import pytest
+
+from route_logic import pipeline
+from route_logic.bot_advice import StructuredAdvice
+from route_logic.pipeline import STAGE_CACHED, STAGE_FAILED, STAGE_FETCHED, \
+	STAGE_SKIPPED, STAGE_TIMEOUT, FetchPipeline
+from route_logic.weather_service import FORECAST_STEP, Forecast
+
+LAT, LON = -36.8485, 174.7633
+UV_DATA = {"clear_sky_max": 8.0, "cloudy_sky_max": 5.0}
+ADVICE = StructuredAdvice("High UV", "Wear a hat", "SPF 50")
+
+
+class StubCache:
+	"""Location cache stand-in holding entries in a dict."""
+
+	def __init__(self):
+		self.entries = {}
+
+	async def get_async(self, key):
+		return self.entries.get(key)
+
+	async def set_async(self, key, value, ttl=None):
+		self.entries[key] = value
+
+
+def forecast_data():
+	now = int(time.time())
+	return Forecast.from_payload(
+			{
+				"list": [
+					{
+						"dt":      now + index * FORECAST_STEP,
+						"clouds":  {"all": 20},
+						"weather": [{
+							"main": "Clear", "description": "clear sky",
+							"icon": "01d"
+						}],
+					} for index in range(-1, 4)
+				],
+				"city": {"name": "Auckland", "sunrise": now - 3600,
+				         "sunset": now + 36000},
+			}
+	).to_data()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+	"""Replace every upstream with a stub; records which stages ran."""
+	calls = []
+
+	async def uv(session, lat, lon):
+		calls.append("uv")
+		return UV_DATA
+
+	async def forecast(lat, lon, session):
+		calls.append("weather")
+		return forecast_data()
+
+	def lookup(uv_index, main, description):
+		calls.append("table")
+		return None
+
+	async def run_job(fn, *args, **kwargs):
+		calls.append("robot_advice")
+		return tuple(ADVICE)
+
+	monkeypatch.setattr(pipeline.solar, "is_nighttime", lambda lat, lon: False)
+	# Never pre-filter NIWA, whatever the season in Auckland
+	monkeypatch.setattr(pipeline.uv_model, "PREFILTER_MAX_UVI", 0)
+	monkeypatch.setattr(pipeline, "get_uv_data", uv)
+	monkeypatch.setattr(pipeline, "fetch_forecast_async", forecast)
+	monkeypatch.setattr(pipeline, "lookup_precomputed_advice", lookup)
+	monkeypatch.setattr(pipeline.advice_pool, "run", run_job)
+	return calls
+
+
+def run(**kwargs):
+	kwargs.setdefault("cache", StubCache())
+	kwargs.setdefault("forward", False)
+	return asyncio.run(FetchPipeline(LAT, LON, **kwargs).run())
+
+
+def test_all_stages_run_by_default(calls):
+	result = run(budget=2)
+	assert calls == ["uv", "weather", "table", "robot_advice"]
+	assert result.stages["robot_advice"] == STAGE_FETCHED
+	assert result.context["robot_advice"] == ADVICE.format()
+
+
+def test_advice_skipped_when_not_requested(calls):
+	result = run(budget=2, fields=("uv_index", "advice"))
+	assert calls == ["uv", "weather"]
+	assert result.stages["robot_advice"] == STAGE_SKIPPED
+	assert result.context["uv_index"] == 8.0
+
+
+def test_stage_over_budget_returns_partial_context(calls, monkeypatch):
+	async def slow_uv(session, lat, lon):
+		await asyncio.sleep(5)
+
+	monkeypatch.setattr(pipeline, "get_uv_data", slow_uv)
+	result = run(budget=0.2)
+
+	assert result.elapsed < 1
+	assert result.stages["uv"] == STAGE_TIMEOUT
+	assert result.stages["weather"] == STAGE_FETCHED
+	assert not result.complete
+	# Served from the weather stage and the local UV estimate
+	assert result.context["location_name"] == "Auckland"
+	assert result.context["uv_source"] == "estimate"
+
+
+def test_stage_exception_is_recorded_as_failed(calls, monkeypatch):
+	async def broken_forecast(lat, lon, session):
+		raise RuntimeError("OpenWeather down")
+
+	monkeypatch.setattr(pipeline, "fetch_forecast_async", broken_forecast)
+	result = run(budget=2)
+
+	assert result.stages["weather"] == STAGE_FAILED
+	assert result.stages["robot_advice"] == STAGE_SKIPPED
+	assert not result.complete
+	assert result.context["advice"].startswith("Could not fetch weather data")
+
+
+def test_invalid_stage_result_is_failed_and_not_cached(calls, monkeypatch):
+	async def empty_uv(session, lat, lon):
+		return {}
+
+	monkeypatch.setattr(pipeline, "get_uv_data", empty_uv)
+	cache = StubCache()
+	result = run(budget=2, cache=cache)
+
+	assert result.stages["uv"] == STAGE_FAILED
+	assert not any(key.startswith("uv") for key in cache.entries)
+
+
+def test_cached_stages_make_no_upstream_call(calls):
+	cache = StubCache()
+	run(budget=2, cache=cache)
+	calls.clear()
+
+	result = run(budget=2, cache=cache)
+	# Only the local table is consulted before the advice cache
+	assert calls == ["table"]
+	assert result.stages == {
+		"uv": STAGE_CACHED, "weather": STAGE_CACHED,
+		"robot_advice": STAGE_CACHED
+	}
+	assert result.from_cache
+
+
+def test_night_skips_upstream_stages(calls, monkeypatch):
+	monkeypatch.setattr(pipeline.solar, "is_nighttime", lambda lat, lon: True)
+	result = run(budget=2)
+
+	assert calls == []
+	assert result.stages == {
+		"uv": STAGE_SKIPPED, "weather": STAGE_SKIPPED,
+		"robot_advice": STAGE_SKIPPED
+	}
+	assert result.context["is_nighttime"]
+	assert result.context["location_name"] is None
+
+
+def test_night_shows_cached_weather(calls, monkeypatch):
+	monkeypatch.setattr(pipeline.solar, "is_nighttime", lambda lat, lon: True)
+	cache = StubCache()
+	pipe = FetchPipeline(LAT, LON, cache=cache, forward=False)
+	cache.entries[pipe.cache_key("weather")] = forecast_data()
+
+	result = asyncio.run(pipe.run())
+	assert calls == []
+	assert result.stages["weather"] == STAGE_CACHED
+	assert result.context["location_name"] == "Auckland"
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from route_logic import prefetch
+from route_logic.pipeline import STAGE_FETCHED, PipelineResult
+from route_logic.prefetch import PREFETCH_RETENTION, Prefetcher
+
+LAT, LON = -36.8485, 174.7633
+
+
+class Clock:
+	"""Stand-in for time.monotonic() that only moves when told to."""
+
+	def __init__(self):
+		self.now = 1000.0
+
+	def __call__(self):
+		return self.now
+
+
+class Upstream:
+	"""Records pipeline runs and holds them until released."""
+
+	def __init__(self):
+		self.released = threading.Event()
+		self.runs = []
+
+	def pipeline(self, lat, lon, budget):
+		"""FetchPipeline stand-in."""
+		upstream = self
+
+		class StubPipeline:
+			async def run(self):
+				upstream.runs.append((lat, lon))
+				while not upstream.released.is_set():
+					await asyncio.sleep(0.005)
+				return PipelineResult(
+						context={"uv_index": 6.0}, stages={"uv": STAGE_FETCHED}
+				)
+
+		return StubPipeline()
+
+
+def wait_until(predicate, timeout=2):
+	deadline = time.monotonic() + timeout
+	while not predicate():
+		assert time.monotonic() < deadline, "timed out"
+		time.sleep(0.005)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	clock = Clock()
+	monkeypatch.setattr(prefetch, "time", types.SimpleNamespace(monotonic=clock))
+	return clock
+
+
+@pytest.fixture
+def published(monkeypatch):
+	published = []
+	monkeypatch.setattr(
+			prefetch.location_updates, "publish",
+			lambda lat, lon, context, complete: published.append(context)
+	)
+	return published
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+	upstream = Upstream()
+	monkeypatch.setattr(prefetch, "FetchPipeline", upstream.pipeline)
+	yield upstream
+	upstream.released.set()
+
+
+@pytest.fixture
+def prefetcher(upstream, clock, published):
+	return Prefetcher(budget=2)
+
+
+def test_fetches_for_one_cell_are_shared(prefetcher, upstream):
+	future = prefetcher.start(LAT, LON)
+	# Same cell after rounding to four decimals
+	assert prefetcher.start(LAT + 0.00001, LON) is future
+	assert prefetcher.pending(LAT, LON) is future
+	assert prefetcher.pending(-41.3, 174.8) is None
+
+	upstream.released.set()
+	assert prefetcher.join(LAT, LON).context["uv_index"] == 6.0
+	assert upstream.runs == [(LAT, LON)]
+
+
+def test_join_without_prefetch_returns_none(prefetcher):
+	assert prefetcher.join(LAT, LON) is None
+	assert asyncio.run(prefetcher.join_async(LAT, LON)) is None
+
+
+def test_join_timeout_leaves_the_fetch_running(prefetcher, upstream):
+	future = prefetcher.start(LAT, LON)
+
+	started = time.monotonic()
+	assert prefetcher.join(LAT, LON, timeout=0.05) is None
+	assert time.monotonic() - started < 1
+	assert not future.done()
+
+	upstream.released.set()
+	assert prefetcher.join(LAT, LON, timeout=2) is not None
+
+
+def test_join_async_timeout_does_not_cancel_the_fetch(prefetcher, upstream):
+	future = prefetcher.start(LAT, LON)
+
+	assert asyncio.run(prefetcher.join_async(LAT, LON, timeout=0.05)) is None
+	assert not future.cancelled()
+
+	upstream.released.set()
+	result = asyncio.run(prefetcher.join_async(LAT, LON, timeout=2))
+	assert result.context["uv_index"] == 6.0
+
+
+def test_finished_result_is_published(prefetcher, upstream, published):
+	upstream.released.set()
+	prefetcher.start(LAT, LON)
+	wait_until(lambda: published)
+	assert published == [{"uv_index": 6.0}]
+
+
+def test_result_is_kept_for_the_retention_period(
+		prefetcher, upstream, clock, published
+		):
+	upstream.released.set()
+	future = prefetcher.start(LAT, LON)
+	# Published once the finish time is recorded
+	wait_until(lambda: published)
+
+	clock.now += PREFETCH_RETENTION - 1
+	assert prefetcher.pending(LAT, LON) is future
+	assert prefetcher.start(LAT, LON) is future
+
+	clock.now += 2
+	assert prefetcher.pending(LAT, LON) is None
+	assert prefetcher.start(LAT, LON) is not future
+	wait_until(lambda: len(upstream.runs) == 2)
+
+
+def test_running_fetch_never_expires(prefetcher, clock):
+	future = prefetcher.start(LAT, LON)
+	clock.now += PREFETCH_RETENTION * 10
+	assert prefetcher.pending(LAT, LON) is future
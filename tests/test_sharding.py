@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from route_logic.cache import get_spatial_key
+from route_logic.sharding import HashRing, ShardRouter, parse_nodes, shard_key
+
+NODES = ["http://10.0.0.1:5000", "http://10.0.0.2:5000", "http://10.0.0.3:5000"]
+KEYS = [f"robot_advice:{lat}.5_{lon}.5" for lat in range(-90, 90, 2) for lon in
+        range(-180, 180, 3)]
+
+
+def owners(ring):
+	return {key: ring.owner(key) for key in KEYS}
+
+
+def test_empty_ring_has_no_owner():
+	assert HashRing().owner("anything") is None
+
+
+def test_every_node_builds_the_same_ring():
+	assert owners(HashRing(NODES)) == owners(HashRing(reversed(NODES)))
+
+
+def test_keys_spread_over_all_nodes():
+	counts = {}
+	for node in owners(HashRing(NODES)).values():
+		counts[node] = counts.get(node, 0) + 1
+	assert set(counts) == set(NODES)
+	assert min(counts.values()) > len(KEYS) / len(NODES) / 2
+
+
+def test_adding_a_node_moves_about_one_nth_of_keys():
+	new_node = "http://10.0.0.4:5000"
+	before = owners(HashRing(NODES))
+	after = owners(HashRing(NODES + [new_node]))
+
+	moved = [key for key in KEYS if before[key] != after[key]]
+	assert all(after[key] == new_node for key in moved)
+	assert len(moved) / len(KEYS) == pytest.approx(1 / 4, abs=0.08)
+
+
+def test_removing_a_node_only_moves_its_keys():
+	before = owners(HashRing(NODES))
+	after = owners(HashRing(NODES[1:]))
+
+	for key in KEYS:
+		if before[key] != NODES[0]:
+			assert after[key] == before[key]
+		else:
+			assert after[key] in NODES[1:]
+
+
+def test_stage_cells_nest_in_one_shard_cell():
+	# Points spread over one UV cell, and so over several weather cells
+	points = [(-36.76 - i * 0.022, 174.51 + i * 0.021) for i in range(10)]
+	assert len({get_spatial_key("uv", *point) for point in points}) == 1
+	assert len({get_spatial_key("weather", *point) for point in points}) > 1
+
+	assert len({shard_key(*point) for point in points}) == 1
+	assert shard_key(-36.8, 174.7) != shard_key(-41.3, 174.7)
+
+
+def test_parse_nodes():
+	assert parse_nodes(" http://a:5000/, ,http://b:5000") == [
+		"http://a:5000", "http://b:5000"
+	]
+	assert parse_nodes(None) == []
+
+
+def test_router_requires_self_url_and_token_with_peers():
+	with pytest.raises(ValueError):
+		ShardRouter().configure(None, NODES, token="secret")
+	with pytest.raises(ValueError):
+		ShardRouter().configure(NODES[0], NODES)
+
+
+def test_router_without_peers_owns_everything():
+	router = ShardRouter()
+	router.configure()
+	assert not router.enabled
+	assert router.owner(-36.8, 174.7) is None
+
+
+def test_token_check():
+	router = ShardRouter()
+	assert not router.token_valid("")
+	router.token = "secret"
+	assert router.token_valid("secret")
+	assert not router.token_valid("secreT")
+	assert not router.token_valid(None)
+
+
+def test_fetch_without_budget_does_not_forward():
+	class NoSession:
+		def get(self, *args, **kwargs):
+			raise AssertionError("forwarded without budget")
+
+	router = ShardRouter()
+	for budget in (0, -0.5):
+		assert asyncio.run(
+				router.fetch(NODES[1], -36.8, 174.7, budget, NoSession())
+		) is None
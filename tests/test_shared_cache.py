@@ -0,0 +1,142 @@
+import os
+import struct
+
+import pytest
+
+from route_logic.shared_cache import RECORD, WAYS, SharedMemoryCache, key_hash
+
+pytestmark = pytest.mark.skipif(
+		os.name != "posix", reason="shared cache needs POSIX fcntl locks"
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "table.cache")
+
+
+def slot_of(cache, key):
+	"""Slot currently holding key."""
+	first = (key_hash(key) % cache.sets) * WAYS
+	for slot in range(first, first + WAYS):
+		if RECORD.unpack_from(cache._mm, cache._offset(slot))[3] == key_hash(key):
+			return slot
+	raise AssertionError(f"{key} is not stored")
+
+
+def test_entries_are_shared_between_instances(path):
+	writer = SharedMemoryCache(path, slots=64)
+	reader = SharedMemoryCache(path, slots=64)
+
+	writer.set("uv:-36.875_174.625", {"clear_sky_max": 7.5}, 60)
+
+	assert reader.get("uv:-36.875_174.625") == {"clear_sky_max": 7.5}
+	assert reader.path == writer.path == f"{path}.64x2048"
+
+
+def test_overwrite_and_delete(path):
+	cache = SharedMemoryCache(path, slots=64)
+	cache.set("key", 1, 60)
+	cache.set("key", 2, 60)
+	assert cache.get("key") == 2
+	assert len(cache) == 1
+
+	cache.delete("key")
+	assert cache.get("key") is None
+	assert len(cache) == 0
+
+
+def test_expired_entries_are_misses(path):
+	cache = SharedMemoryCache(path, slots=64)
+	cache.set("key", "value", -1)
+	assert cache.get("key") is None
+
+
+def test_values_too_large_for_a_record_are_skipped(path):
+	cache = SharedMemoryCache(path, slots=64, record_size=256)
+	cache.set("big", "x" * 512, 60)
+	assert cache.get("big") is None
+
+
+def test_write_leaves_seqlock_even_and_advanced(path):
+	cache = SharedMemoryCache(path, slots=64)
+	cache.set("key", "first", 60)
+	offset = cache._offset(slot_of(cache, "key"))
+	seq = RECORD.unpack_from(cache._mm, offset)[0]
+
+	cache.set("key", "second", 60)
+
+	assert seq % 2 == 0
+	assert RECORD.unpack_from(cache._mm, offset)[0] == seq + 2
+
+
+def test_record_being_written_reads_as_miss(path):
+	cache = SharedMemoryCache(path, slots=64)
+	cache.set("key", "value", 60)
+	offset = cache._offset(slot_of(cache, "key"))
+	seq = RECORD.unpack_from(cache._mm, offset)[0]
+
+	# A writer mid-update leaves the counter odd
+	struct.pack_into("<I", cache._mm, offset, seq + 1)
+	assert cache.get("key") is None
+
+	struct.pack_into("<I", cache._mm, offset, seq + 2)
+	assert cache.get("key") == "value"
+
+
+def test_full_set_replaces_soonest_expiring(path):
+	# One set: every key competes for the same WAYS records
+	cache = SharedMemoryCache(path, slots=WAYS)
+	for index in range(WAYS):
+		cache.set(f"key{index}", index, 100 + index * 10)
+
+	cache.set("new", "value", 500)
+
+	assert cache.get("key0") is None
+	assert cache.get("new") == "value"
+	assert [cache.get(f"key{index}") for index in range(1, WAYS)] == list(
+			range(1, WAYS)
+	)
+
+
+def test_set_holds_ways_live_entries(path):
+	cache = SharedMemoryCache(path, slots=WAYS)
+	cache.set("stale", "old", -1)
+	for index in range(WAYS):
+		cache.set(f"key{index}", index, 100 - index)
+
+	assert [cache.get(f"key{index}") for index in range(WAYS)] == list(
+			range(WAYS)
+	)
+
+
+def test_clear_empties_every_set(path):
+	cache = SharedMemoryCache(path, slots=64)
+	for index in range(20):
+		cache.set(f"key{index}", index, 60)
+
+	cache.clear()
+
+	assert len(cache) == 0
+	assert cache.get("key0") is None
+
+
+def test_other_geometry_uses_its_own_file(path):
+	small = SharedMemoryCache(path, slots=64)
+	small.set("key", "value", 60)
+
+	large = SharedMemoryCache(path, slots=128)
+
+	assert large.path != small.path
+	assert large.get("key") is None
+	assert small.get("key") == "value"
+
+
+def test_file_of_wrong_size_is_refused(path):
+	cache = SharedMemoryCache(path, slots=64)
+	cache._mm.close()
+	with open(cache.path, "r+b") as f:
+		f.truncate(1000)
+
+	with pytest.raises(RuntimeError):
+		SharedMemoryCache(path, slots=64)
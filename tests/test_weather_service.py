@@ -0,0 +1,83 @@
+import pytest
+
+from route_logic.weather_service import FORECAST_STEP, Forecast, \
+	WeatherRecord, weather_at
+
+START = 1_790_000_000
+CONDITIONS = [
+	("Clear", "clear sky", "01d"), ("Clouds", "broken clouds", "04d"),
+	("Rain", "light rain", "10d"),
+]
+
+
+def payload(steps=8):
+	return {
+		"list": [
+			{
+				"dt":      START + index * FORECAST_STEP,
+				"clouds":  {"all": index * 10},
+				"weather": [dict(
+						zip(("main", "description", "icon"),
+						    CONDITIONS[index % len(CONDITIONS)])
+				)],
+			} for index in range(steps)
+		],
+		"city": {"name": "Auckland", "sunrise": START - 3600, "sunset": START + 36000},
+	}
+
+
+@pytest.fixture
+def forecast():
+	return Forecast.from_payload(payload())
+
+
+def test_payload_is_reduced_to_compact_arrays(forecast):
+	assert list(forecast.hours) == [index * 3 for index in range(8)]
+	assert list(forecast.clouds) == [index * 10 for index in range(8)]
+	assert forecast.conditions == CONDITIONS
+	assert list(forecast.codes) == [index % 3 for index in range(8)]
+
+
+def test_at_returns_the_step_covering_when(forecast):
+	assert forecast.at(START) == WeatherRecord(
+			0, "Auckland", "Clear", "clear sky", "01d", START - 3600, START + 36000
+	)
+	assert forecast.at(START + FORECAST_STEP - 1).cloud_index == 0
+	assert forecast.at(START + FORECAST_STEP).cloud_index == 10
+	assert forecast.at(START + 2 * FORECAST_STEP + 60).weather_main == "Rain"
+
+
+def test_at_uses_first_step_just_before_the_forecast(forecast):
+	assert forecast.at(START - FORECAST_STEP + 1).cloud_index == 0
+	assert forecast.at(START - FORECAST_STEP - 1) is None
+
+
+def test_at_covers_one_step_past_the_last(forecast):
+	last = START + 7 * FORECAST_STEP
+	assert forecast.at(last + FORECAST_STEP - 1).cloud_index == 70
+	assert forecast.at(last + FORECAST_STEP) is None
+
+
+def test_cloud_cover_is_clamped():
+	data = payload(1)
+	data["list"][0]["clouds"]["all"] = 150
+	assert Forecast.from_payload(data).at(START).cloud_index == 100
+
+
+def test_data_round_trip(forecast):
+	restored = Forecast.from_data(forecast.to_data())
+	for when in range(START, START + 8 * FORECAST_STEP, FORECAST_STEP // 2):
+		assert restored.at(when) == forecast.at(when)
+
+
+def test_empty_payload_is_rejected():
+	with pytest.raises(ValueError):
+		Forecast.from_payload({"list": []})
+
+
+def test_weather_at_rejects_other_data(forecast):
+	data = forecast.to_data()
+	assert weather_at(data, START) == forecast.at(START)
+	assert weather_at(dict(data, v=0), START) is None
+	assert weather_at({"cloud_index": 20}, START) is None
+	assert weather_at(None, START) is None